@@ -0,0 +1,87 @@
+"""
+Сравнение глубоких страниц архива: курсор против OFFSET.
+
+Запуск:
+    python -m benchmarks.archive_pagination --rows 1000000 --pages 1 10000
+"""
+import argparse
+import random
+from datetime import date, timedelta
+
+from benchmarks.utils import measure, setup_django, temporary_database
+
+
+def seed_news(connection, rows, batch_size=50000):
+    """Заполняет таблицу новостей пачками сырых INSERT."""
+    from django.utils import timezone
+
+    start = date(2000, 1, 1)
+    rnd = random.Random(0)
+    modified = timezone.now()
+    with connection.cursor() as cursor:
+        for offset in range(0, rows, batch_size):
+            batch = [
+                (
+                    f'Новость {index}',
+                    'Текст новости',
+                    start + timedelta(days=rnd.randrange(9000)),
+                    0,
+                    modified,
+                )
+                for index in range(offset, min(rows, offset + batch_size))
+            ]
+            cursor.executemany(
+                'INSERT INTO news_news (title, text, date, comment_count, '
+                'modified) VALUES (%s, %s, %s, %s, %s)',
+                batch,
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--pages', type=int, nargs='+', default=[1, 10000])
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+
+    from news.models import News
+    from news.pagination import KeysetPaginator
+
+    per_page = settings.NEWS_COUNT_ON_ARCHIVE_PAGE
+    with temporary_database() as connection:
+        seed_news(connection, args.rows)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        paginator = KeysetPaginator(
+            News.objects.all(), ('-date', '-id'), per_page
+        )
+        ordered = News.objects.order_by('-date', '-id')
+        print(f'Строк: {args.rows}, на странице: {per_page}')
+        print(f'{"страница":>10} {"курсор, мс":>22} {"OFFSET, мс":>22}')
+        for number in args.pages:
+            cursor = None
+            if number > 1:
+                last = ordered[(number - 1) * per_page - 1]
+                cursor = paginator.encode(last)
+            offset = (number - 1) * per_page
+
+            def keyset():
+                paginator.page(cursor)
+
+            def offset_page():
+                list(ordered[offset:offset + per_page])
+
+            keyset_median, keyset_p95 = measure(keyset, args.repeat)
+            offset_median, offset_p95 = measure(offset_page, args.repeat)
+            print(
+                f'{number:>10} '
+                f'{keyset_median:>10.2f} (p95 {keyset_p95:6.2f}) '
+                f'{offset_median:>10.2f} (p95 {offset_p95:6.2f})'
+            )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,203 @@
+"""
+Пропускная способность главной и страниц новостей под WSGI и под ASGI.
+
+Оба приложения вызываются в процессе, без сети, на одной и той же
+заполненной базе. Медленный клиент моделируется задержкой при отдаче
+тела ответа: WSGI-поток всё это время занят, а ASGI-воркер ждёт её
+в event loop и обслуживает других. Медленная база моделируется
+задержкой внутри представления: её ASGI-воркер переживает параллельно,
+только если и представления, и вся цепочка middleware асинхронные,
+поэтому ASGI меряется с асинхронными представлениями и без них.
+
+Запуск:
+    python -m benchmarks.asgi_wsgi --news 1000 --clients 64 --requests 640
+"""
+import argparse
+import asyncio
+import importlib
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from benchmarks.archive_pagination import seed_news
+from benchmarks.utils import setup_django, temporary_database
+
+
+def seed_comments(connection, news_ids, per_news):
+    from django.contrib.auth import get_user_model
+
+    author = get_user_model().objects.create(username='Бенчмарк')
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            'INSERT INTO news_comment (news_id, author_id, text, created, '
+            "status) VALUES (%s, %s, %s, CURRENT_TIMESTAMP, 'approved')",
+            [
+                (news_id, author.pk, f'Комментарий {index}')
+                for news_id in news_ids
+                for index in range(per_news)
+            ],
+        )
+
+
+def make_paths(news_ids, count):
+    rnd = random.Random(0)
+    return [
+        '/' if rnd.random() < 0.2 else f'/news/{rnd.choice(news_ids)}/'
+        for _ in range(count)
+    ]
+
+
+def slow_down_views(delay):
+    """Добавляет задержку в обработку главной и страницы новости."""
+    from news.views import AnonymousPageCacheMixin
+
+    dispatch = AnonymousPageCacheMixin.dispatch
+
+    def slow_dispatch(view, request, *args, **kwargs):
+        time.sleep(delay)
+        return dispatch(view, request, *args, **kwargs)
+
+    AnonymousPageCacheMixin.dispatch = slow_dispatch
+
+
+def use_async_views(enabled):
+    """Переключает маршруты главной и новости, как NEWS_ASYNC_VIEWS."""
+    from django.conf import settings
+    from django.urls import clear_url_caches
+
+    settings.NEWS_ASYNC_VIEWS = enabled
+    # Корневой URLconf тоже перечитывается: вложенные резолверы
+    # запоминают маршруты news.urls при первом обращении.
+    for module in ('news.urls', settings.ROOT_URLCONF):
+        importlib.reload(importlib.import_module(module))
+    clear_url_caches()
+
+
+def run_wsgi(paths, clients, delay):
+    from django.core.handlers.wsgi import WSGIHandler
+
+    application = WSGIHandler()
+
+    def request(path):
+        environ = {
+            'REQUEST_METHOD': 'GET',
+            'PATH_INFO': path,
+            'QUERY_STRING': '',
+            'SERVER_NAME': 'localhost',
+            'SERVER_PORT': '80',
+            'SERVER_PROTOCOL': 'HTTP/1.1',
+            'wsgi.input': BytesIO(),
+            'wsgi.url_scheme': 'http',
+        }
+        statuses = []
+        body = application(environ, lambda status, headers: statuses.append(
+            status
+        ))
+        b''.join(body)
+        body.close()
+        time.sleep(delay)
+        return statuses[0]
+
+    with ThreadPoolExecutor(max_workers=clients) as executor:
+        return list(executor.map(request, paths))
+
+
+def run_asgi(paths, clients, delay):
+    from django.core.asgi import get_asgi_application
+
+    application = get_asgi_application()
+
+    async def request(path, semaphore):
+        statuses = []
+
+        async def receive():
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                statuses.append(message['status'])
+            elif not message.get('more_body'):
+                await asyncio.sleep(delay)
+
+        scope = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': 'GET',
+            'scheme': 'http',
+            'path': path,
+            'raw_path': path.encode(),
+            'query_string': b'',
+            'root_path': '',
+            'headers': [(b'host', b'localhost')],
+            'server': ('localhost', 80),
+        }
+        async with semaphore:
+            await application(scope, receive, send)
+        return statuses[0]
+
+    async def main():
+        semaphore = asyncio.Semaphore(clients)
+        return await asyncio.gather(
+            *(request(path, semaphore) for path in paths)
+        )
+
+    return asyncio.run(main())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--news', type=int, default=1000)
+    parser.add_argument('--comments', type=int, default=5,
+                        help='Комментариев у каждой новости.')
+    parser.add_argument('--requests', type=int, default=640)
+    parser.add_argument('--clients', type=int, default=64,
+                        help='Одновременных клиентов.')
+    parser.add_argument('--wsgi-threads', type=int, default=8,
+                        help='Потоков у WSGI-воркера.')
+    parser.add_argument('--delay', type=float, default=0.2,
+                        help='Сколько секунд клиент читает ответ.')
+    parser.add_argument('--view-delay', type=float, default=0.05,
+                        help='Сколько секунд представление ждёт базу.')
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+
+    from news.models import News
+
+    # Кэш страниц спрятал бы разницу: каждый запрос должен идти в базу.
+    settings.NEWS_PAGE_CACHE_TIMEOUT = 0
+    settings.ALLOWED_HOSTS = ['localhost']
+    slow_down_views(args.view_delay)
+    with temporary_database() as connection:
+        seed_news(connection, args.news)
+        news_ids = list(News.objects.values_list('pk', flat=True))
+        seed_comments(connection, news_ids, args.comments)
+        News.objects.recount_comments()
+        paths = make_paths(news_ids, args.requests)
+
+        print(
+            f'Новостей: {args.news}, запросов: {args.requests}, '
+            f'клиентов: {args.clients}, задержка клиента: {args.delay} с, '
+            f'представления: {args.view_delay} с'
+        )
+        for name, run, concurrency, async_views in (
+            ('WSGI', run_wsgi, args.wsgi_threads, False),
+            ('ASGI, синхронные представления', run_asgi, args.clients, False),
+            ('ASGI, асинхронные представления', run_asgi, args.clients, True),
+        ):
+            use_async_views(async_views)
+            start = time.perf_counter()
+            statuses = run(paths, concurrency, args.delay)
+            elapsed = time.perf_counter() - start
+            errors = sum(status not in (200, '200 OK') for status in statuses)
+            print(
+                f'{name:<32}{len(paths) / elapsed:8.1f} запросов/с, '
+                f'ошибок: {errors}'
+            )
+
+
+if __name__ == '__main__':
+    main()
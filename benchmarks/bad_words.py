@@ -0,0 +1,65 @@
+"""
+Сравнение проверки запрещённых слов: линейный перебор против автомата.
+
+Запуск:
+    python -m benchmarks.bad_words --sizes 10 1000 10000 50000
+"""
+import argparse
+import random
+import time
+
+from benchmarks.utils import measure
+from news.moderation import BadWordsMatcher
+
+ALPHABET = 'абвгдежзийклмнопрстуфхцчшщыэюя'
+
+
+def random_word(rnd):
+    return ''.join(rnd.choice(ALPHABET) for _ in range(rnd.randint(5, 12)))
+
+
+def linear_search(words, text):
+    """Прежняя реализация CommentForm.clean_text."""
+    lowered_text = text.lower()
+    for word in words:
+        if word in lowered_text:
+            return word
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        '--sizes', type=int, nargs='+', default=[10, 1000, 10000, 50000]
+    )
+    parser.add_argument('--text-length', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    rnd = random.Random(0)
+    # Чистый текст из коротких «слов» с буквами, которых нет в словаре:
+    # обоим алгоритмам приходится просмотреть его целиком.
+    words_in_text = []
+    while sum(map(len, words_in_text)) < args.text_length:
+        words_in_text.append(
+            ''.join(rnd.choice('ьъё') for _ in range(rnd.randint(2, 8)))
+        )
+    text = ' '.join(words_in_text)
+
+    print(f'Длина текста: {len(text)} символов')
+    print(
+        f'{"слов":>8} {"сборка, мс":>12} '
+        f'{"перебор, мс":>12} {"автомат, мс":>12}'
+    )
+    for size in args.sizes:
+        words = [random_word(rnd) for _ in range(size)]
+        start = time.perf_counter()
+        matcher = BadWordsMatcher(words)
+        build = (time.perf_counter() - start) * 1000
+        linear, _ = measure(lambda: linear_search(words, text), args.repeat)
+        automaton, _ = measure(lambda: matcher.search(text), args.repeat)
+        print(f'{size:>8} {build:>12.2f} {linear:>12.3f} {automaton:>12.3f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+"""
+Сравнение микробенчмарков с сохранённым базовым замером.
+
+Замеры снимаются тестами с меткой benchmark:
+    pytest -m benchmark --benchmark-json=results.json
+
+и сравниваются с benchmarks/baselines/micro.json по медиане:
+    python -m benchmarks.compare results.json --tolerance 0.25
+
+Одиночный прогон на ноутбуке шумит на 10–20 %, поэтому можно передать
+несколько файлов: из них берётся медиана замеров каждого бенчмарка.
+
+Бенчмарк, ставший медленнее базового больше чем на tolerance, считается
+регрессией, и команда завершается с кодом 1. Абсолютные времена зависят
+от машины, поэтому перед сравнением на новом ноутбуке снимите базовый
+замер на старом коде и сохраните его флагом --update.
+"""
+import argparse
+import json
+import platform
+import statistics
+import sys
+from pathlib import Path
+
+BASELINE = Path(__file__).resolve().parent / 'baselines' / 'micro.json'
+
+
+def environment():
+    import django
+
+    return {
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'machine': platform.machine(),
+    }
+
+
+def write_results(path, results):
+    """Сохраняет замеры: имя бенчмарка -> медиана и p95 в миллисекундах."""
+    data = {
+        'environment': environment(),
+        'results': {
+            name: {'median_ms': round(median, 4), 'p95_ms': round(p95, 4)}
+            for name, (median, p95) in sorted(results.items())
+        },
+    }
+    Path(path).write_text(
+        json.dumps(data, indent=2, ensure_ascii=False) + '\n',
+        encoding='utf-8',
+    )
+
+
+def read_results(path):
+    return json.loads(Path(path).read_text(encoding='utf-8'))['results']
+
+
+def merge_results(runs):
+    """Медиана замеров каждого бенчмарка по нескольким прогонам."""
+    merged = {}
+    for name in sorted(set().union(*runs)):
+        values = [run[name] for run in runs if name in run]
+        merged[name] = {
+            key: statistics.median(value[key] for value in values)
+            for key in ('median_ms', 'p95_ms')
+        }
+    return merged
+
+
+def compare(baseline, current, tolerance):
+    """
+    Строки отчёта (имя, база, текущее, изменение, статус) по медианам.
+
+    Изменение — доля от базового значения; None, если базы нет.
+    """
+    rows = []
+    for name in sorted(set(baseline) | set(current)):
+        if name not in current:
+            rows.append((name, baseline[name]['median_ms'], None, None,
+                         'не запускался'))
+            continue
+        now = current[name]['median_ms']
+        if name not in baseline:
+            rows.append((name, None, now, None, 'новый'))
+            continue
+        base = baseline[name]['median_ms']
+        change = now / base - 1 if base else 0.0
+        status = 'РЕГРЕССИЯ' if change > tolerance else 'ok'
+        rows.append((name, base, now, change, status))
+    return rows
+
+
+def format_ms(value):
+    return f'{value:10.3f}' if value is not None else f'{"—":>10}'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('results', nargs='+',
+                        help='JSON с замерами из pytest, один или несколько.')
+    parser.add_argument('--baseline', default=str(BASELINE))
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='Допустимое замедление, доля от базы.')
+    parser.add_argument('--update', action='store_true',
+                        help='Записать замеры как новую базу.')
+    args = parser.parse_args()
+
+    current = merge_results([read_results(path) for path in args.results])
+    if args.update:
+        Path(args.baseline).parent.mkdir(parents=True, exist_ok=True)
+        write_results(args.baseline, {
+            name: (value['median_ms'], value['p95_ms'])
+            for name, value in current.items()
+        })
+        print(f'База обновлена: {args.baseline}')
+        return
+    rows = compare(read_results(args.baseline), current, args.tolerance)
+    if not rows:
+        sys.exit('Нет замеров для сравнения.')
+    width = max(len(name) for name, *_ in rows)
+    print(f'{"Бенчмарк":<{width}} {"база, мс":>10} {"сейчас, мс":>10} '
+          f'{"изменение":>10}  статус')
+    for name, base, now, change, status in rows:
+        change_text = f'{change:+10.1%}' if change is not None else f'{"":>10}'
+        print(f'{name:<{width}} {format_ms(base)} {format_ms(now)} '
+              f'{change_text}  {status}')
+    regressions = [row for row in rows if row[-1] == 'РЕГРЕССИЯ']
+    if regressions:
+        sys.exit(
+            f'Регрессий: {len(regressions)} (допуск {args.tolerance:.0%}).'
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,224 @@
+"""
+Одновременная запись комментариев и чтение страниц новостей на SQLite.
+
+Писатели отправляют комментарии, читатели открывают страницы новостей.
+Каждый клиент — отдельный поток, запросы идут через WSGIHandler без сети,
+база — файл на диске, как в работе. Профили из SQLITE_PROFILES
+сравниваются на одинаковых данных: с профилем по умолчанию читатели
+и писатели блокируют друг друга, а каждый запрос открывает соединение
+заново.
+
+Запуск:
+    python -m benchmarks.sqlite_concurrency --writers 4 --readers 8 --seconds 5
+"""
+import argparse
+import logging
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from io import BytesIO
+from pathlib import Path
+from urllib.parse import urlencode
+
+from benchmarks.archive_pagination import seed_news
+from benchmarks.asgi_wsgi import seed_comments
+from benchmarks.utils import setup_django, temporary_database
+
+
+class Results:
+    """Время ответов и ошибки одного вида запросов."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.timings = []
+        self.errors = 0
+
+    def add(self, timings, errors):
+        with self.lock:
+            self.timings.extend(timings)
+            self.errors += errors
+
+    def summary(self, seconds):
+        if not self.timings:
+            return 'нет ответов'
+        timings = sorted(self.timings)
+        p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+        return (
+            f'{len(timings) / seconds:7.1f}/с, '
+            f'медиана {statistics.median(timings):6.1f} мс, '
+            f'p95 {p95:6.1f} мс, ошибок {self.errors}'
+        )
+
+
+def make_environ(method, path, cookies='', body=b''):
+    environ = {
+        'REQUEST_METHOD': method,
+        'PATH_INFO': path,
+        'QUERY_STRING': '',
+        'SERVER_NAME': 'localhost',
+        'SERVER_PORT': '80',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'HTTP_COOKIE': cookies,
+        'wsgi.input': BytesIO(body),
+        'wsgi.url_scheme': 'http',
+    }
+    if body:
+        environ['CONTENT_TYPE'] = 'application/x-www-form-urlencoded'
+        environ['CONTENT_LENGTH'] = str(len(body))
+    return environ
+
+
+def call(application, environ):
+    statuses = []
+    response = application(
+        environ, lambda status, headers: statuses.append(status)
+    )
+    b''.join(response)
+    response.close()
+    return int(statuses[0].split()[0])
+
+
+def login_cookies(user):
+    """Куки сессии и CSRF, с которыми писатель отправляет формы."""
+    from django.conf import settings
+    from django.http import HttpRequest
+    from django.middleware.csrf import get_token
+    from django.test import Client
+
+    client = Client()
+    client.force_login(user)
+    request = HttpRequest()
+    token = get_token(request)
+    cookies = (
+        f'{settings.SESSION_COOKIE_NAME}='
+        f'{client.cookies[settings.SESSION_COOKIE_NAME].value}; '
+        f'{settings.CSRF_COOKIE_NAME}={request.META["CSRF_COOKIE"]}'
+    )
+    return cookies, token
+
+
+def run_client(application, deadline, results, seed, next_request):
+    """Шлёт запросы до deadline; соединения потока закрывает в конце."""
+    from django.db import connections
+
+    rnd = random.Random(seed)
+    timings = []
+    errors = 0
+    try:
+        while time.monotonic() < deadline:
+            environ, expected = next_request(rnd)
+            start = time.perf_counter()
+            status = call(application, environ)
+            timings.append((time.perf_counter() - start) * 1000)
+            errors += status != expected
+    finally:
+        connections.close_all()
+        results.add(timings, errors)
+
+
+def run_profile(args, profile):
+    from django.conf import settings
+    from django.contrib.auth import get_user_model
+    from django.core.handlers.wsgi import WSGIHandler
+    from django.urls import reverse
+
+    from news.models import News
+
+    settings.SQLITE_PRAGMAS = settings.SQLITE_PROFILES[profile]['PRAGMAS']
+    with tempfile.TemporaryDirectory() as directory, temporary_database(
+        name=str(Path(directory) / 'concurrency.sqlite3')
+    ) as connection:
+        connection.settings_dict['CONN_MAX_AGE'] = (
+            settings.SQLITE_PROFILES[profile]['CONN_MAX_AGE']
+        )
+        seed_news(connection, args.news)
+        news_ids = list(News.objects.values_list('pk', flat=True))
+        seed_comments(connection, news_ids, args.comments)
+        urls = [reverse('news:detail', args=(pk,)) for pk in news_ids]
+        News.objects.recount_comments()
+        writers = [
+            login_cookies(get_user_model().objects.create(
+                username=f'Писатель {index}'
+            ))
+            for index in range(args.writers)
+        ]
+        connection.close()
+
+        application = WSGIHandler()
+        reads, writes = Results(), Results()
+
+        def read(rnd):
+            return make_environ('GET', rnd.choice(urls)), 200
+
+        def writer(cookies, token):
+            def write(rnd):
+                body = urlencode({
+                    'text': f'Комментарий {rnd.random()}',
+                    'csrfmiddlewaretoken': token,
+                }).encode()
+                return make_environ(
+                    'POST', rnd.choice(urls), cookies, body
+                ), 302
+            return write
+
+        deadline = time.monotonic() + args.seconds
+        threads = [
+            threading.Thread(
+                target=run_client,
+                args=(application, deadline, reads, index, read),
+            )
+            for index in range(args.readers)
+        ] + [
+            threading.Thread(
+                target=run_client,
+                args=(
+                    application, deadline, writes, args.readers + index,
+                    writer(*cookies),
+                ),
+            )
+            for index, cookies in enumerate(writers)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    print(f'Профиль {profile}:')
+    print(f'  чтение страниц: {reads.summary(args.seconds)}')
+    print(f'  комментарии:    {writes.summary(args.seconds)}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--news', type=int, default=200)
+    parser.add_argument('--comments', type=int, default=20,
+                        help='Комментариев у каждой новости.')
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=5.0)
+    parser.add_argument('--profiles', nargs='+',
+                        default=['default', 'production'])
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+
+    unknown = set(args.profiles) - set(settings.SQLITE_PROFILES)
+    if unknown:
+        sys.exit(f'Неизвестные профили: {", ".join(sorted(unknown))}')
+    # Каждый запрос должен идти в базу, а ошибки — только считаться.
+    settings.NEWS_PAGE_CACHE_TIMEOUT = 0
+    settings.DEBUG = False
+    logging.getLogger('django.request').setLevel(logging.CRITICAL)
+    print(
+        f'Новостей: {args.news}, читателей: {args.readers}, '
+        f'писателей: {args.writers}, {args.seconds} с на профиль'
+    )
+    for profile in args.profiles:
+        run_profile(args, profile)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+"""Общие помощники для бенчмарков: настройка Django и временная база."""
+import os
+import statistics
+import time
+from contextlib import contextmanager
+
+import django
+
+
+def setup_django(settings_module='yanews.settings'):
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+    django.setup()
+
+
+@contextmanager
+def temporary_database(verbosity=0, name=None):
+    """
+    Создаёт тестовую базу с применёнными миграциями и удаляет её после.
+
+    Рабочая db.sqlite3 при этом не затрагивается. По умолчанию SQLite
+    создаёт базу в памяти; name задаёт файл, если важна работа с диском.
+    """
+    from django.db import connection
+
+    old_name = connection.settings_dict['NAME']
+    old_test_name = connection.settings_dict['TEST']['NAME']
+    if name is not None:
+        connection.settings_dict['TEST']['NAME'] = name
+    connection.creation.create_test_db(verbosity=verbosity)
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=verbosity)
+        connection.settings_dict['TEST']['NAME'] = old_test_name
+
+
+def measure(func, repeat=20, warmup=3):
+    """Возвращает медиану и p95 времени вызова func в миллисекундах."""
+    for _ in range(warmup):
+        func()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+    return statistics.median(timings), p95
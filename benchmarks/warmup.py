@@ -0,0 +1,117 @@
+"""
+Первый запрос нового воркера с прогревом и без него.
+
+Каждый запуск — новый процесс с настройками yanews.settings_production,
+как воркер gunicorn после старта: он загружает yanews.wsgi, с прогревом
+или без (WARM_UP_ON_START), и отправляет через WSGIHandler первый
+и второй запрос к главной и к странице новости. Время загрузки
+включает прогрев, поэтому видно, сколько он стоит и сколько экономит
+первому посетителю. База — файл SQLite с новостями и комментариями.
+
+Запуск:
+    python -m benchmarks.warmup --runs 10
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.archive_pagination import seed_news
+from benchmarks.asgi_wsgi import seed_comments
+from benchmarks.sqlite_concurrency import call, make_environ
+from benchmarks.utils import setup_django
+
+MODES = {'холодный': '0', 'прогретый': '1'}
+STAGES = ('загрузка', 'главная 1', 'главная 2', 'новость 1', 'новость 2')
+
+
+def worker():
+    """Тело дочернего процесса: печатает замеры в формате JSON."""
+    start = time.perf_counter()
+    from yanews.wsgi import application
+
+    timings = [(time.perf_counter() - start) * 1000]
+    for path in ('/', '/', sys.argv[2], sys.argv[2]):
+        start = time.perf_counter()
+        status = call(application, make_environ('GET', path))
+        timings.append((time.perf_counter() - start) * 1000)
+        if status != 200:
+            sys.exit(f'{path}: ответ {status}')
+    print(json.dumps(timings))
+
+
+def prepare(news, comments):
+    """Создаёт файл базы с миграциями и данными; возвращает адрес новости."""
+    from django.core.management import call_command
+    from django.db import connection
+    from django.urls import reverse
+
+    from news.models import News
+
+    call_command('migrate', verbosity=0)
+    seed_news(connection, news)
+    news_ids = list(News.objects.values_list('pk', flat=True))
+    seed_comments(connection, news_ids, comments)
+    News.objects.recount_comments()
+    connection.close()
+    return reverse('news:detail', args=(news_ids[0],))
+
+
+def run(mode, database, detail_url):
+    # Свой каталог кэша на запуск: иначе процесс получил бы страницы,
+    # закэшированные предыдущим, и первый запрос не дошёл бы до шаблонов.
+    cache_dir = tempfile.mkdtemp(dir=Path(database).parent)
+    result = subprocess.run(
+        [sys.executable, '-m', 'benchmarks.warmup', '--worker', detail_url],
+        env={
+            **os.environ,
+            'DJANGO_SETTINGS_MODULE': 'yanews.settings_production',
+            'SECRET_KEY': 'benchmark',
+            'CACHE_DIR': cache_dir,
+            'DATABASE_NAME': database,
+            'WARM_UP_ON_START': MODES[mode],
+        },
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(result.stdout.splitlines()[-1])
+
+
+def main():
+    if sys.argv[1:2] == ['--worker']:
+        worker()
+        return
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--runs', type=int, default=10,
+                        help='Сколько процессов запустить в каждом режиме.')
+    parser.add_argument('--news', type=int, default=100)
+    parser.add_argument('--comments', type=int, default=20,
+                        help='Комментариев у каждой новости.')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        database = str(Path(directory) / 'warmup.sqlite3')
+        os.environ['DATABASE_NAME'] = database
+        setup_django()
+        detail_url = prepare(args.news, args.comments)
+        results = {mode: [] for mode in MODES}
+        # Режимы чередуются, чтобы фоновая нагрузка досталась обоим.
+        for _ in range(args.runs):
+            for mode in MODES:
+                results[mode].append(run(mode, database, detail_url))
+    print(f'Медиана по {args.runs} процессам, мс')
+    print(f'{"":<12}' + ''.join(f'{stage:>12}' for stage in STAGES))
+    for mode, runs in results.items():
+        print(f'{mode:<12}' + ''.join(
+            f'{statistics.median(values):>12.1f}' for values in zip(*runs)
+        ))
+
+
+if __name__ == '__main__':
+    main()
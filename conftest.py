@@ -0,0 +1,45 @@
+"""
+Микробенчмарки под pytest, см. news/pytest_tests/test_benchmarks.py.
+
+Опция командной строки объявляется здесь: pytest читает её только
+из conftest.py в корне запуска.
+"""
+import gc
+
+import pytest
+
+from benchmarks.compare import write_results
+from benchmarks.utils import measure
+
+# Замеры за сессию: имя теста -> (медиана, p95) в миллисекундах.
+BENCHMARK_RESULTS = {}
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        '--benchmark-json',
+        help='Сохранить замеры тестов с меткой benchmark в JSON '
+             'для python -m benchmarks.compare.',
+    )
+
+
+def pytest_sessionfinish(session):
+    path = session.config.getoption('benchmark_json')
+    if path and BENCHMARK_RESULTS:
+        write_results(path, BENCHMARK_RESULTS)
+
+
+@pytest.fixture
+def microbenchmark(request):
+    """Замеряет функцию и запоминает результат под именем теста."""
+    def run(func, repeat=200, warmup=10):
+        # Как timeit: сборщик мусора не вмешивается в замер.
+        gc.collect()
+        gc.disable()
+        try:
+            result = measure(func, repeat=repeat, warmup=warmup)
+        finally:
+            gc.enable()
+        BENCHMARK_RESULTS[request.node.name] = result
+        return result
+    return run
@@ -1,6 +1,7 @@
 from django.contrib import admin
 
-from .models import Comment, News
+from .exporting import export_response
+from .models import BadWord, Comment, News
 
 
 class CommentInline(admin.StackedInline):
@@ -13,3 +14,24 @@ class NewsAdmin(admin.ModelAdmin):
     inlines = [
         CommentInline,
     ]
+    actions = ('export_jsonl', 'export_csv')
+
+    def save_formset(self, request, form, formset, change):
+        super().save_formset(request, form, formset, change)
+        if formset.model is Comment:
+            # В инлайне можно и добавить, и удалить, и сменить статус
+            # комментариев, поэтому счётчик пересчитывается одним UPDATE.
+            News.objects.filter(pk=form.instance.pk).recount_comments()
+
+    @admin.action(description='Выгрузить с комментариями в JSONL')
+    def export_jsonl(self, request, queryset):
+        return export_response(queryset, 'jsonl')
+
+    @admin.action(description='Выгрузить с комментариями в CSV')
+    def export_csv(self, request, queryset):
+        return export_response(queryset, 'csv')
+
+
+@admin.register(BadWord)
+class BadWordAdmin(admin.ModelAdmin):
+    search_fields = ('word',)
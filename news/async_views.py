@@ -0,0 +1,104 @@
+"""
+Асинхронные варианты главной и страницы новости для работы под ASGI.
+
+ORM в Django 3.2 синхронный, поэтому работа с базой и отрисовка шаблона
+выполняются в отдельном пуле потоков, а event loop тем временем
+обслуживает других клиентов: медленный клиент занимает корутину,
+а не поток воркера.
+"""
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import update_wrapper
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.views import generic
+
+from .views import NewsComment, NewsDetail, NewsList
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_db_executor():
+    """Пул потоков для запросов к базе, создаётся при первом обращении."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.NEWS_ASYNC_DB_THREADS,
+                    thread_name_prefix='news-db',
+                )
+    return _executor
+
+
+def _render_view(view, request, *args, **kwargs):
+    """
+    Выполняет синхронное представление целиком в потоке пула.
+
+    Соединения с базой у потоков пула свои, поэтому их жизненный цикл
+    повторяет обычный запрос: устаревшие закрываются до и после.
+    """
+    close_old_connections()
+    try:
+        response = view(request, *args, **kwargs)
+        if callable(getattr(response, 'render', None)):
+            response = response.render()
+        return response
+    finally:
+        close_old_connections()
+
+
+async def run_in_db_thread(view, request, *args, **kwargs):
+    return await sync_to_async(
+        _render_view, thread_sensitive=False, executor=get_db_executor()
+    )(view, request, *args, **kwargs)
+
+
+class AsyncView(generic.View):
+    """
+    Представление с async-обработчиками методов.
+
+    View в Django 3.2 сам их не поддерживает, поэтому as_view возвращает
+    корутинную функцию: по ней обработчик запросов понимает, что
+    представление асинхронное, и не уводит его в поток.
+    """
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+
+        async def async_view(request, *args, **kwargs):
+            response = view(request, *args, **kwargs)
+            if asyncio.iscoroutine(response):
+                response = await response
+            return response
+
+        return update_wrapper(async_view, view)
+
+
+class AsyncNewsList(AsyncView):
+    """Асинхронный вариант NewsList."""
+    view = staticmethod(NewsList.as_view())
+
+    async def get(self, request, *args, **kwargs):
+        return await run_in_db_thread(self.view, request, *args, **kwargs)
+
+
+class AsyncNewsDetailView(AsyncView):
+    """Асинхронный вариант NewsDetailView."""
+    detail_view = staticmethod(NewsDetail.as_view())
+    comment_view = staticmethod(NewsComment.as_view())
+
+    async def get(self, request, *args, **kwargs):
+        return await run_in_db_thread(
+            self.detail_view, request, *args, **kwargs
+        )
+
+    async def post(self, request, *args, **kwargs):
+        return await run_in_db_thread(
+            self.comment_view, request, *args, **kwargs
+        )
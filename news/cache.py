@@ -0,0 +1,84 @@
+import hashlib
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+
+COMMENT_FRAGMENT = 'comment'
+
+
+def comment_fragment_key(comment_pk):
+    """Ключ закэшированного блока комментария в detail.html."""
+    return make_template_fragment_key(
+        COMMENT_FRAGMENT, [comment_pk, settings.COMMENT_FRAGMENT_VERSION]
+    )
+
+
+def invalidate_comment_fragment(comment_pk):
+    cache.delete(comment_fragment_key(comment_pk))
+
+
+PAGE_CACHE_PREFIX = 'page'
+HOME_PAGE_SCOPE = 'home'
+
+
+def news_page_scope(news_pk):
+    return f'news:{news_pk}'
+
+
+def _generation_key(scope):
+    return f'{PAGE_CACHE_PREFIX}:{scope}:generation'
+
+
+def _purged_key(scope):
+    return f'{PAGE_CACHE_PREFIX}:{scope}:purged'
+
+
+def _page_generation(scope):
+    """
+    Текущее поколение страниц группы scope.
+
+    Поколение — случайная строка, а не счётчик: если кэш вытеснит ключ
+    поколения, старые страницы не оживут под тем же номером.
+    """
+    key = _generation_key(scope)
+    generation = cache.get(key)
+    if generation is None:
+        cache.add(key, uuid.uuid4().hex, None)
+        generation = cache.get(key)
+    return generation
+
+
+def page_cache_key(scope, request, params=()):
+    """
+    Ключ страницы: путь и только те GET-параметры, что читает страница.
+
+    Остальные параметры на содержимое не влияют, и произвольные ?x=N
+    не заводят новых записей в кэше.
+    """
+    query = [(name, request.GET.get(name)) for name in sorted(params)]
+    path = hashlib.md5(repr((request.path, query)).encode()).hexdigest()
+    return f'{PAGE_CACHE_PREFIX}:{scope}:{_page_generation(scope)}:{path}'
+
+
+def purge_pages(*scopes):
+    """
+    Сбрасывает все закэшированные страницы указанных групп.
+
+    На REPLICA_PIN_SECONDS группа остаётся отмеченной как сброшенная:
+    реплики за это время могут ещё не получить изменения, из-за которых
+    страницы сброшены.
+    """
+    cache.set_many(
+        {_generation_key(scope): uuid.uuid4().hex for scope in scopes},
+        None,
+    )
+    cache.set_many(
+        {_purged_key(scope): True for scope in scopes},
+        settings.REPLICA_PIN_SECONDS,
+    )
+
+
+def recently_purged(scope):
+    return cache.get(_purged_key(scope)) is not None
@@ -0,0 +1,70 @@
+import hashlib
+
+from django.conf import settings
+from django.views.decorators.http import condition
+
+from .models import News
+
+
+def _viewer(request):
+    """
+    Часть валидатора, зависящая от пользователя.
+
+    Без сессионной куки запрос анонимный, и база не нужна даже для
+    проверки пользователя.
+    """
+    if settings.SESSION_COOKIE_NAME not in request.COOKIES:
+        return None
+    return request.user.pk
+
+
+def home_page_validators(request, *args, **kwargs):
+    """Новости главной страницы и время последнего изменения среди них."""
+    rows = list(
+        News.objects.values_list(
+            'pk', 'modified', 'comment_count'
+        )[:settings.NEWS_COUNT_ON_HOME_PAGE]
+    )
+    last_modified = max((row[1] for row in rows), default=None)
+    return rows, last_modified
+
+
+def news_page_validators(request, pk, *args, **kwargs):
+    row = News.objects.filter(pk=pk).values_list(
+        'modified', 'comment_count'
+    ).first()
+    if row is None:
+        return None
+    return row, row[0]
+
+
+def conditional_page(validators):
+    """
+    Отвечает 304 Not Modified, если страница не менялась.
+
+    validators(request, *args, **kwargs) возвращает пару (данные для ETag,
+    время изменения) или None. Она считается одним лёгким запросом
+    и запоминается на запросе, чтобы ETag и Last-Modified не ходили
+    в базу дважды.
+    """
+    def get_validators(request, *args, **kwargs):
+        if not hasattr(request, '_page_validators'):
+            request._page_validators = validators(request, *args, **kwargs)
+        return request._page_validators
+
+    def etag(request, *args, **kwargs):
+        result = get_validators(request, *args, **kwargs)
+        if result is None:
+            return None
+        key = repr((request.get_full_path(), result[0], _viewer(request)))
+        return hashlib.md5(key.encode()).hexdigest()
+
+    def last_modified(request, *args, **kwargs):
+        # Страница вошедшего пользователя меняется и без правки новостей,
+        # поэтому для него полагаемся только на ETag.
+        if _viewer(request) is not None:
+            return None
+        result = get_validators(request, *args, **kwargs)
+        return None if result is None else result[1]
+
+    return condition(etag_func=etag, last_modified_func=last_modified)
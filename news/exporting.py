@@ -0,0 +1,146 @@
+"""
+Потоковая выгрузка новостей вместе с комментариями в JSONL или CSV.
+
+Новости и комментарии читаются двумя курсорами через iterator()
+в одном порядке по id новости и сливаются на ходу, поэтому в памяти
+одновременно держатся только одна пачка строк и комментарии одной новости.
+"""
+import csv
+import json
+import zlib
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+
+from .models import Comment
+
+CHUNK_SIZE = 2000
+# Сколько текста копить перед тем, как отдать его дальше.
+BLOCK_SIZE = 64 * 1024
+FORMATS = ('jsonl', 'csv')
+
+NEWS_FIELDS = ('id', 'title', 'text', 'date', 'comment_count')
+COMMENT_FIELDS = ('id', 'author__username', 'text', 'created', 'status')
+COMMENT_COLUMNS = ('id', 'author', 'text', 'created', 'status')
+CSV_HEADER = (
+    'news_id', 'title', 'text', 'date', 'comment_count',
+    'comment_id', 'comment_author', 'comment_text', 'comment_created',
+    'comment_status',
+)
+CONTENT_TYPES = {
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+    'csv': 'text/csv; charset=utf-8',
+}
+
+
+class _Line:
+    """Файлоподобный объект для csv.writer: возвращает строку как есть."""
+
+    def write(self, value):
+        return value
+
+
+class NewsExport:
+    """
+    Итератор по байтам выгрузки новостей из queryset.
+
+    Подходит и для записи в файл, и для StreamingHttpResponse.
+    """
+
+    def __init__(self, queryset, fmt='jsonl', compress=False,
+                 chunk_size=CHUNK_SIZE):
+        if fmt not in FORMATS:
+            raise ValueError(f'Неизвестный формат выгрузки: {fmt}.')
+        self.queryset = queryset
+        self.format = fmt
+        self.compress = compress
+        self.chunk_size = chunk_size
+        self.news_count = 0
+        self.comments_count = 0
+
+    @property
+    def content_type(self):
+        if self.compress:
+            return 'application/gzip'
+        return CONTENT_TYPES[self.format]
+
+    @property
+    def filename(self):
+        return f'news.{self.format}' + ('.gz' if self.compress else '')
+
+    def __iter__(self):
+        blocks = self._blocks()
+        if not self.compress:
+            return (block.encode() for block in blocks)
+        return self._gzip(blocks)
+
+    def iter_news(self):
+        """Пары из новости и списка её комментариев, словарями."""
+        news_rows = self.queryset.order_by('id').values(
+            *NEWS_FIELDS
+        ).iterator(chunk_size=self.chunk_size)
+        comment_rows = Comment.objects.filter(
+            news__in=self.queryset.order_by().values('id')
+        ).order_by('news_id', 'created', 'id').values(
+            'news_id', *COMMENT_FIELDS
+        ).iterator(chunk_size=self.chunk_size)
+        comment = next(comment_rows, None)
+        for news in news_rows:
+            comments = []
+            while comment is not None and comment['news_id'] <= news['id']:
+                if comment.pop('news_id') == news['id']:
+                    comment['author'] = comment.pop('author__username')
+                    comments.append(comment)
+                comment = next(comment_rows, None)
+            self.news_count += 1
+            self.comments_count += len(comments)
+            yield news, comments
+
+    def _lines(self):
+        if self.format == 'jsonl':
+            for news, comments in self.iter_news():
+                news['comments'] = comments
+                yield json.dumps(
+                    news, cls=DjangoJSONEncoder, ensure_ascii=False
+                ) + '\n'
+            return
+        writer = csv.writer(_Line())
+        yield writer.writerow(CSV_HEADER)
+        empty = dict.fromkeys(COMMENT_COLUMNS, '')
+        for news, comments in self.iter_news():
+            prefix = [news[name] for name in NEWS_FIELDS]
+            for comment in comments or [empty]:
+                yield writer.writerow(
+                    prefix + [comment[name] for name in COMMENT_COLUMNS]
+                )
+
+    def _blocks(self):
+        block = []
+        size = 0
+        for line in self._lines():
+            block.append(line)
+            size += len(line)
+            if size >= BLOCK_SIZE:
+                yield ''.join(block)
+                block = []
+                size = 0
+        if block:
+            yield ''.join(block)
+
+    def _gzip(self, blocks):
+        compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+        for block in blocks:
+            data = compressor.compress(block.encode())
+            if data:
+                yield data
+        yield compressor.flush()
+
+
+def export_response(queryset, fmt='jsonl', compress=False):
+    """Ответ, который отдаёт выгрузку по мере чтения из базы."""
+    export = NewsExport(queryset, fmt, compress)
+    response = StreamingHttpResponse(export, content_type=export.content_type)
+    response['Content-Disposition'] = (
+        f'attachment; filename="{export.filename}"'
+    )
+    return response
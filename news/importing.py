@@ -0,0 +1,149 @@
+"""
+Потоковое чтение новостей из больших JSON- и JSONL-файлов.
+
+Файл читается кусками, поэтому память не зависит от его размера.
+Принимаются и записи в формате фикстур ({"model": ..., "fields": {...}}),
+и плоские объекты с полями новости.
+"""
+import json
+
+from django.core.exceptions import ValidationError
+
+from .models import News
+
+CHUNK_SIZE = 64 * 1024
+IMPORTED_FIELDS = ('title', 'text', 'date')
+NEWS_MODEL_LABEL = 'news.news'
+
+
+class _Buffer:
+    """Прочитанная, но ещё не разобранная часть потока."""
+
+    def __init__(self, stream, chunk_size, text=''):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.text = text
+        self.position = 0
+        self.eof = False
+
+    def fill(self):
+        chunk = self.stream.read(self.chunk_size)
+        self.eof = not chunk
+        self.text = self.text[self.position:] + chunk
+        self.position = 0
+
+    def peek(self):
+        """Следующий значащий символ или пустая строка в конце потока."""
+        while True:
+            text = self.text
+            while self.position < len(text) and text[self.position].isspace():
+                self.position += 1
+            if self.position < len(text) or self.eof:
+                return text[self.position:self.position + 1]
+            self.fill()
+
+    def decode(self, decoder):
+        """
+        Разбирает очередное значение.
+
+        Значение могло не поместиться в прочитанный кусок, причём число
+        в конце буфера обрезается незаметно, поэтому всё, что доходит
+        до конца буфера, разбирается заново после чтения следующего куска.
+        """
+        while True:
+            try:
+                item, end = decoder.raw_decode(self.text, self.position)
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+                end = len(self.text)
+            if end < len(self.text) or self.eof:
+                self.position = end
+                return item
+            self.fill()
+
+
+def iter_json_array(stream, chunk_size=CHUNK_SIZE, buffer=''):
+    """Отдаёт элементы JSON-массива по одному, не читая файл целиком."""
+    decoder = json.JSONDecoder()
+    buffer = _Buffer(stream, chunk_size, buffer)
+    if buffer.peek() != '[':
+        raise ValueError('Ожидался JSON-массив.')
+    buffer.position += 1
+    while True:
+        char = buffer.peek()
+        if not char:
+            raise ValueError('Файл оборвался посреди массива.')
+        if char == ']':
+            return
+        if char == ',':
+            buffer.position += 1
+        else:
+            yield buffer.decode(decoder)
+
+
+def iter_json_lines(stream, chunk_size=CHUNK_SIZE, buffer=''):
+    """Отдаёт объекты из JSONL: по одному на непустую строку."""
+    while True:
+        lines = buffer.split('\n')
+        buffer = lines.pop()
+        for line in lines:
+            if line.strip():
+                yield json.loads(line)
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        buffer += chunk
+    if buffer.strip():
+        yield json.loads(buffer)
+
+
+def iter_records(stream, fmt='auto', chunk_size=CHUNK_SIZE):
+    """
+    Записи из потока в формате json или jsonl.
+
+    В режиме auto формат определяется по первому символу:
+    массив начинается с «[», всё остальное считается JSONL.
+    """
+    buffer = stream.read(chunk_size)
+    while buffer.isspace():
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        buffer += chunk
+    if fmt == 'auto':
+        fmt = 'json' if buffer.lstrip().startswith('[') else 'jsonl'
+    if fmt == 'json':
+        return iter_json_array(stream, chunk_size, buffer)
+    return iter_json_lines(stream, chunk_size, buffer)
+
+
+def clean_record(record):
+    """
+    Проверяет запись и возвращает словарь для News.
+
+    Поля проверяются валидаторами модели; при ошибке
+    бросается ValidationError.
+    """
+    if not isinstance(record, dict):
+        raise ValidationError('Запись должна быть объектом.')
+    if 'fields' in record:
+        if record.get('model', NEWS_MODEL_LABEL).lower() != NEWS_MODEL_LABEL:
+            raise ValidationError(f'Чужая модель: {record.get("model")}.')
+        record = record['fields']
+        if not isinstance(record, dict):
+            raise ValidationError('Поле fields должно быть объектом.')
+    cleaned = {}
+    errors = {}
+    for name in IMPORTED_FIELDS:
+        field = News._meta.get_field(name)
+        value = record.get(name)
+        if value is None and field.has_default():
+            value = field.get_default()
+        try:
+            cleaned[name] = field.clean(value, None)
+        except ValidationError as error:
+            errors[name] = error.messages
+    if errors:
+        raise ValidationError(errors)
+    return cleaned
@@ -0,0 +1,387 @@
+"""
+Нагрузочный прогон приложения через настоящий HTTP.
+
+Приложение из WSGI_APPLICATION поднимается в этом же процессе
+на ThreadedWSGIServer, как у runserver, или в нескольких форкнутых
+процессах на общем сокете, как у gunicorn с воркерами. Пул потоков
+шлёт запросы по смеси маршрутов или повторяет журнал запросов,
+а отчёт показывает пропускную способность, задержки и долю ошибок
+по каждому маршруту. Ошибкой считается ответ 4xx и 5xx или обрыв.
+
+Для запросов от имени пользователя заводятся новые пользователи
+loadtest_<метка прогона>_N с сессиями и собственными комментариями
+для правки и удаления; после прогона удаляются только они вместе со
+своими комментариями, чужие учётные записи прогон не трогает.
+
+Журнал для replay — JSONL, по запросу на строку:
+{"method": "POST", "path": "/news/1/", "data": {"text": "..."},
+"auth": true, "route": "comment"}. По умолчанию method — GET, auth —
+false, route — имя представления по URL. Запросы с auth отправляются
+с сессией и CSRF-токеном пользователя нагрузочного теста.
+"""
+import http.client
+import json
+import os
+import random
+import signal
+import threading
+import time
+import uuid
+from urllib.parse import urlencode, urlsplit
+
+from django.conf import settings
+from django.contrib.auth import (
+    BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY, get_user_model,
+)
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.servers.basehttp import (
+    ThreadedWSGIServer, WSGIRequestHandler, get_internal_wsgi_application,
+)
+from django.db import connections
+from django.http import HttpRequest
+from django.middleware.csrf import get_token
+from django.urls import Resolver404, resolve, reverse
+
+from .models import Comment, News
+
+DEFAULT_MIX = {
+    'home': 50,
+    'detail': 35,
+    'comment': 10,
+    'edit': 3,
+    'delete': 2,
+}
+USERNAME_PREFIX = 'loadtest_'
+# Сколько комментариев у каждого пользователя остаётся для правки.
+EDITABLE_COMMENTS = 5
+PERCENTILES = (50, 95, 99)
+REQUEST_TIMEOUT = 30
+
+
+def parse_mix(text):
+    """Разбирает смесь вида «home=50,detail=35» в словарь весов."""
+    mix = {}
+    for part in text.split(','):
+        route, _, weight = part.partition('=')
+        route = route.strip()
+        if route not in DEFAULT_MIX:
+            raise ValueError(f'Неизвестный маршрут: {route}')
+        mix[route] = float(weight)
+        if mix[route] < 0:
+            raise ValueError(f'Отрицательный вес у маршрута {route}')
+    if not any(mix.values()):
+        raise ValueError('Все веса смеси нулевые')
+    return mix
+
+
+def percentile(values, percent):
+    """Перцентиль по ближайшему рангу для отсортированного списка."""
+    rank = max(1, -(-len(values) * percent // 100))
+    return values[int(rank) - 1]
+
+
+class LoadRequest:
+
+    def __init__(self, route, path, method='GET', data=None, auth=False):
+        self.route = route
+        self.path = path
+        self.method = method.upper()
+        self.data = data or {}
+        self.auth = auth
+
+
+def read_replay(stream):
+    """Запросы из журнала JSONL; пустые строки пропускаются."""
+    requests = []
+    for number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+            path = record['path']
+        except (ValueError, KeyError, TypeError):
+            raise ValueError(f'Строка {number}: нужен объект с полем path')
+        route = record.get('route')
+        if route is None:
+            try:
+                route = resolve(urlsplit(path).path).view_name
+            except Resolver404:
+                route = 'unresolved'
+        requests.append(LoadRequest(
+            route,
+            path,
+            record.get('method', 'GET'),
+            record.get('data'),
+            record.get('auth', False),
+        ))
+    return requests
+
+
+class VirtualUser:
+    """Пользователь нагрузочного теста: куки сессии и CSRF-токен."""
+
+    def __init__(self, user):
+        self.user = user
+        session = SessionStore()
+        session[SESSION_KEY] = user._meta.pk.value_to_string(user)
+        session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+        session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+        session.create()
+        self.session_key = session.session_key
+        request = HttpRequest()
+        self.csrf_token = get_token(request)
+        self.cookies = (
+            f'{settings.SESSION_COOKIE_NAME}={session.session_key}; '
+            f'{settings.CSRF_COOKIE_NAME}={request.META["CSRF_COOKIE"]}'
+        )
+
+    def send(self, address, request):
+        """Отправляет запрос и возвращает код ответа."""
+        headers = {}
+        body = None
+        if request.auth:
+            headers['Cookie'] = self.cookies
+        if request.method != 'GET':
+            data = dict(request.data)
+            if request.auth:
+                data['csrfmiddlewaretoken'] = self.csrf_token
+            body = urlencode(data)
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        connection = http.client.HTTPConnection(
+            *address, timeout=REQUEST_TIMEOUT
+        )
+        try:
+            connection.request(request.method, request.path, body, headers)
+            response = connection.getresponse()
+            response.read()
+            return response.status
+        finally:
+            connection.close()
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+    """Не пишет в журнал строку на каждый запрос."""
+
+    def log_message(self, format, *args):
+        pass
+
+
+class Server:
+    """
+    Приложение на локальном порту.
+
+    При processes > 0 сокет открывается здесь, а запросы принимают
+    форкнутые процессы; иначе сервер работает в потоке этого процесса.
+    """
+
+    def __init__(self, processes=0, port=0):
+        self.processes = processes
+        self.httpd = ThreadedWSGIServer(
+            ('127.0.0.1', port), QuietRequestHandler
+        )
+        self.httpd.daemon_threads = True
+        self.httpd.set_app(get_internal_wsgi_application())
+        self.address = self.httpd.server_address[:2]
+        self.children = []
+        self.thread = None
+
+    def start(self):
+        if not self.processes:
+            self.thread = threading.Thread(
+                target=self.httpd.serve_forever, daemon=True
+            )
+            self.thread.start()
+            return
+        # Соединения с базой не должны достаться детям по наследству.
+        connections.close_all()
+        for _ in range(self.processes):
+            pid = os.fork()
+            if pid == 0:
+                try:
+                    self.httpd.serve_forever()
+                finally:
+                    os._exit(0)
+            self.children.append(pid)
+
+    def stop(self):
+        if self.thread is not None:
+            self.httpd.shutdown()
+            self.thread.join()
+        for pid in self.children:
+            os.kill(pid, signal.SIGTERM)
+            os.waitpid(pid, 0)
+        self.httpd.server_close()
+
+
+class RouteStats:
+
+    def __init__(self):
+        self.timings = []
+        self.errors = 0
+
+    def add(self, duration, ok):
+        self.timings.append(duration)
+        self.errors += not ok
+
+    def merge(self, other):
+        self.timings.extend(other.timings)
+        self.errors += other.errors
+
+    def summary(self, elapsed):
+        timings = sorted(self.timings)
+        return {
+            'requests': len(timings),
+            'rps': len(timings) / elapsed if elapsed else 0.0,
+            'error_rate': self.errors / len(timings) if timings else 0.0,
+            **{
+                f'p{percent}': percentile(timings, percent) * 1000
+                for percent in PERCENTILES
+            },
+        }
+
+
+class LoadTest:
+    """Готовит пользователей и данные, гоняет запросы и собирает замеры."""
+
+    def __init__(self, workers=8, requests=1000, mix=None, seed=0,
+                 replay=None):
+        self.workers = workers
+        self.requests = requests
+        self.mix = mix or DEFAULT_MIX
+        self.rnd = random.Random(seed)
+        self.replay = replay
+        # Метка прогона: имена не совпадают с уже заведёнными
+        # пользователями, даже если те названы так же, как loadtest_0.
+        self.username_prefix = f'{USERNAME_PREFIX}{uuid.uuid4().hex[:8]}_'
+        self.clients = []
+        self.plans = []
+
+    def prepare(self):
+        """Заводит пользователей и раскладывает запросы по потокам."""
+        user_model = get_user_model()
+        for index in range(self.workers):
+            user = user_model.objects.create(
+                username=f'{self.username_prefix}{index}'
+            )
+            self.clients.append(VirtualUser(user))
+        if self.replay is not None:
+            self.plans = [
+                self.replay[index::self.workers]
+                for index in range(self.workers)
+            ]
+            return
+        news_ids = list(News.objects.values_list('pk', flat=True))
+        if not news_ids:
+            raise ValueError('В базе нет новостей для нагрузочного теста')
+        shares = [
+            self.requests // self.workers
+            + (index < self.requests % self.workers)
+            for index in range(self.workers)
+        ]
+        self.plans = [
+            self.plan(client, news_ids, share)
+            for client, share in zip(self.clients, shares)
+        ]
+
+    def plan(self, client, news_ids, count):
+        routes = self.rnd.choices(
+            list(self.mix), weights=list(self.mix.values()), k=count
+        )
+        deletes = routes.count('delete')
+        Comment.objects.bulk_create(
+            Comment(
+                news_id=self.rnd.choice(news_ids),
+                author=client.user,
+                text=f'Комментарий нагрузочного теста {index}',
+            )
+            for index in range(deletes + EDITABLE_COMMENTS)
+        )
+        # SQLite в этой версии Django не возвращает id из bulk_create.
+        comments = list(
+            Comment.objects.filter(author=client.user).order_by('pk')
+        )
+        to_delete = iter(comments[:deletes])
+        editable = comments[deletes:]
+        plan = []
+        for number, route in enumerate(routes):
+            if route == 'home':
+                request = LoadRequest(route, reverse('news:home'))
+            elif route == 'detail':
+                request = LoadRequest(route, reverse(
+                    'news:detail', args=(self.rnd.choice(news_ids),)
+                ))
+            elif route == 'comment':
+                request = LoadRequest(
+                    route,
+                    reverse('news:detail', args=(self.rnd.choice(news_ids),)),
+                    'POST',
+                    {'text': f'Новый комментарий {number}'},
+                    auth=True,
+                )
+            elif route == 'edit':
+                request = LoadRequest(
+                    route,
+                    reverse('news:edit', args=(
+                        self.rnd.choice(editable).pk,
+                    )),
+                    'POST',
+                    {'text': f'Исправленный комментарий {number}'},
+                    auth=True,
+                )
+            else:
+                request = LoadRequest(
+                    route,
+                    reverse('news:delete', args=(next(to_delete).pk,)),
+                    'POST',
+                    auth=True,
+                )
+            plan.append(request)
+        return plan
+
+    def run(self, address):
+        """Выполняет все запросы; возвращает замеры и время прогона."""
+        results = [{} for _ in self.plans]
+
+        def work(client, plan, stats):
+            for request in plan:
+                start = time.perf_counter()
+                try:
+                    status = client.send(address, request)
+                except OSError:
+                    status = None
+                duration = time.perf_counter() - start
+                route_stats = stats.setdefault(request.route, RouteStats())
+                route_stats.add(
+                    duration, status is not None and status < 400
+                )
+
+        threads = [
+            threading.Thread(target=work, args=arguments)
+            for arguments in zip(self.clients, self.plans, results)
+        ]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        merged = {}
+        for stats in results:
+            for route, route_stats in stats.items():
+                merged.setdefault(route, RouteStats()).merge(route_stats)
+        return merged, elapsed
+
+    def cleanup(self):
+        """Удаляет пользователей теста с их комментариями и сессиями."""
+        users = get_user_model().objects.filter(
+            pk__in=[client.user.pk for client in self.clients]
+        )
+        news_ids = set(
+            Comment.objects.filter(author__in=users)
+            .values_list('news_id', flat=True)
+        )
+        SessionStore.get_model_class().objects.filter(
+            session_key__in=[client.session_key for client in self.clients]
+        ).delete()
+        users.delete()
+        News.objects.filter(pk__in=news_ids).recount_comments()
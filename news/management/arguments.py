@@ -0,0 +1,15 @@
+"""Типы аргументов командной строки для команд приложения."""
+
+
+def non_negative(value):
+    number = int(value)
+    if number < 0:
+        raise ValueError(value)
+    return number
+
+
+def positive(value):
+    number = int(value)
+    if number <= 0:
+        raise ValueError(value)
+    return number
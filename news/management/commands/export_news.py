@@ -0,0 +1,64 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from news.exporting import CHUNK_SIZE, FORMATS, NewsExport
+from news.models import News
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгружает новости вместе с комментариями в JSONL или CSV, '
+        'читая базу пачками.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '-o', '--output',
+            default='-',
+            help='Файл для выгрузки; по умолчанию stdout.',
+        )
+        parser.add_argument(
+            '--format',
+            choices=FORMATS,
+            default='jsonl',
+            help='Формат выгрузки.',
+        )
+        parser.add_argument(
+            '--gzip',
+            action='store_true',
+            help='Сжать выгрузку gzip.',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=CHUNK_SIZE,
+            help='Сколько строк читать из базы за раз.',
+        )
+
+    def handle(self, *args, **options):
+        export = NewsExport(
+            News.objects.all(),
+            options['format'],
+            compress=options['gzip'],
+            chunk_size=options['chunk_size'],
+        )
+        if options['output'] == '-':
+            self.write(export, sys.stdout.buffer)
+        else:
+            try:
+                output = open(options['output'], 'wb')
+            except OSError as error:
+                raise CommandError(f'Не удалось открыть файл: {error}')
+            with output:
+                self.write(export, output)
+        # В stdout может идти сама выгрузка, поэтому итог — в stderr.
+        self.stderr.write(self.style.SUCCESS(
+            f'Выгружено новостей: {export.news_count}, '
+            f'комментариев: {export.comments_count}.'
+        ))
+
+    def write(self, export, output):
+        for data in export:
+            output.write(data)
+        output.flush()
@@ -0,0 +1,114 @@
+import sys
+import time
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import reset_queries, transaction
+
+from news.cache import HOME_PAGE_SCOPE, purge_pages
+from news.importing import CHUNK_SIZE, clean_record, iter_records
+from news.management.arguments import positive
+from news.models import News
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает новости из JSON-массива или JSONL потоково и пачками, '
+        'пропуская некорректные записи и дубли по заголовку и дате.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            help='Файл с новостями или «-» для чтения из stdin.',
+        )
+        parser.add_argument(
+            '--format',
+            choices=('auto', 'json', 'jsonl'),
+            default='auto',
+            help='Формат файла; auto определяет его по первому символу.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=positive,
+            default=1000,
+            help='Сколько новостей вставлять за одну транзакцию.',
+        )
+
+    def handle(self, *args, **options):
+        self.verbosity = options['verbosity']
+        self.batch_size = options['batch_size']
+        self.seen = set()
+        self.created = self.duplicates = self.invalid = 0
+        started = time.perf_counter()
+        if options['path'] == '-':
+            self.load(sys.stdin, options['format'])
+        else:
+            try:
+                stream = open(options['path'], encoding='utf-8')
+            except OSError as error:
+                raise CommandError(f'Не удалось открыть файл: {error}')
+            with stream:
+                self.load(stream, options['format'])
+        if self.created:
+            purge_pages(HOME_PAGE_SCOPE)
+        elapsed = time.perf_counter() - started
+        total = self.created + self.duplicates + self.invalid
+        self.stdout.write(self.style.SUCCESS(
+            f'Загружено: {self.created}, дублей: {self.duplicates}, '
+            f'с ошибками: {self.invalid}. '
+            f'{total / elapsed if elapsed else 0:.0f} записей/с.'
+        ))
+
+    def load(self, stream, fmt):
+        batch = []
+        records = iter_records(stream, fmt, CHUNK_SIZE)
+        try:
+            for number, record in enumerate(records, start=1):
+                try:
+                    batch.append(clean_record(record))
+                except ValidationError as error:
+                    self.invalid += 1
+                    self.log(f'Запись {number} пропущена: {error}.', 2)
+                    continue
+                if len(batch) >= self.batch_size:
+                    self.save_batch(batch)
+                    batch = []
+        except (ValueError, UnicodeDecodeError) as error:
+            # Уже проверенные записи сохраняются и при ошибке разбора.
+            if batch:
+                self.save_batch(batch)
+            raise CommandError(f'Не удалось разобрать файл: {error}')
+        if batch:
+            self.save_batch(batch)
+
+    def save_batch(self, batch):
+        unique = {}
+        for row in batch:
+            key = (row['title'], row['date'])
+            if key in self.seen or key in unique:
+                self.duplicates += 1
+            else:
+                unique[key] = row
+        with transaction.atomic():
+            existing = set(
+                News.objects.filter(
+                    title__in={title for title, _ in unique},
+                    date__in={date for _, date in unique},
+                ).values_list('title', 'date')
+            )
+            new = [
+                News(**row) for key, row in unique.items()
+                if key not in existing
+            ]
+            News.objects.bulk_create(new, batch_size=self.batch_size)
+        # При DEBUG Django хранит тексты запросов, а они здесь огромные.
+        reset_queries()
+        self.seen.update(unique)
+        self.duplicates += len(unique) - len(new)
+        self.created += len(new)
+        self.log(f'Загружено новостей: {self.created}.', 2)
+
+    def log(self, message, verbosity=1):
+        if self.verbosity >= verbosity:
+            self.stdout.write(message)
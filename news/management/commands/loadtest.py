@@ -0,0 +1,107 @@
+import logging
+
+from django.core.management.base import BaseCommand, CommandError
+
+from news.loadtest import (
+    DEFAULT_MIX, PERCENTILES, LoadTest, Server, parse_mix, read_replay,
+)
+from news.management.arguments import non_negative, positive
+
+
+class Command(BaseCommand):
+    help = (
+        'Поднимает приложение на локальном порту и нагружает его смесью '
+        'запросов или запросами из журнала JSONL. Печатает пропускную '
+        'способность, перцентили задержки и долю ошибок по маршрутам.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests',
+            type=non_negative,
+            default=1000,
+            help='Сколько запросов отправить по смеси.',
+        )
+        parser.add_argument(
+            '--workers',
+            type=positive,
+            default=8,
+            help='Сколько клиентов шлёт запросы одновременно.',
+        )
+        parser.add_argument(
+            '--mix',
+            type=parse_mix,
+            default=DEFAULT_MIX,
+            help='Веса маршрутов, например home=50,detail=35,comment=10,'
+                 'edit=3,delete=2.',
+        )
+        parser.add_argument(
+            '--replay',
+            help='Журнал запросов JSONL вместо смеси.',
+        )
+        parser.add_argument(
+            '--processes',
+            type=int,
+            default=0,
+            help='Сколько процессов сервера форкнуть; 0 — один '
+                 'многопоточный сервер в этом процессе.',
+        )
+        parser.add_argument('--port', type=int, default=0)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        replay = None
+        if options['replay']:
+            try:
+                with open(options['replay'], encoding='utf-8') as stream:
+                    replay = read_replay(stream)
+            except (OSError, ValueError) as error:
+                raise CommandError(f'Не удалось прочитать журнал: {error}')
+        load = LoadTest(
+            workers=options['workers'],
+            requests=options['requests'],
+            mix=options['mix'],
+            seed=options['seed'],
+            replay=replay,
+        )
+        try:
+            load.prepare()
+        except ValueError as error:
+            load.cleanup()
+            raise CommandError(error)
+        server = Server(options['processes'], options['port'])
+        # Ошибки и так попадут в отчёт; трассировки — только с -v 2.
+        request_logger = logging.getLogger('django.request')
+        request_logger.disabled = options['verbosity'] < 2
+        server.start()
+        try:
+            stats, elapsed = load.run(server.address)
+        finally:
+            server.stop()
+            request_logger.disabled = False
+            load.cleanup()
+        self.report(stats, elapsed)
+
+    def report(self, stats, elapsed):
+        columns = ''.join(
+            f'{f"p{percent}, мс":>10}' for percent in PERCENTILES
+        )
+        self.stdout.write(
+            f'{"Маршрут":<20}{"запросов":>10}{"в секунду":>11}{columns}'
+            f'{"ошибок":>9}'
+        )
+        total = sum(len(route.timings) for route in stats.values())
+        for route, route_stats in sorted(stats.items()):
+            summary = route_stats.summary(elapsed)
+            percentiles = ''.join(
+                f'{summary[f"p{percent}"]:>10.1f}' for percent in PERCENTILES
+            )
+            self.stdout.write(
+                f'{route:<20}{summary["requests"]:>10}'
+                f'{summary["rps"]:>11.1f}{percentiles}'
+                f'{summary["error_rate"]:>9.1%}'
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Всего: {total} запросов за {elapsed:.1f} с, '
+            f'{total / elapsed if elapsed else 0:.1f} в секунду.'
+        ))
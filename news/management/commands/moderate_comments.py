@@ -0,0 +1,124 @@
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from news.cache import HOME_PAGE_SCOPE, news_page_scope, purge_pages
+from news.management.arguments import positive
+from news.models import Comment, News
+from news.moderation import get_bad_words_matcher, moderate_text
+
+EXECUTORS = {
+    'thread': ThreadPoolExecutor,
+    'process': ProcessPoolExecutor,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Фоновая модерация: проверяет комментарии в статусе «на модерации» '
+        'пачками и публикует или отклоняет их.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=positive,
+            default=100,
+            help='Сколько комментариев забирать из очереди за раз.',
+        )
+        parser.add_argument(
+            '--workers',
+            type=positive,
+            default=4,
+            help='Число потоков или процессов для проверки текстов.',
+        )
+        parser.add_argument(
+            '--executor',
+            choices=sorted(EXECUTORS),
+            default='process',
+            help='Пул для проверок: процессы для тяжёлых проверок текста, '
+                 'потоки для проверок, ждущих сеть.',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=1.0,
+            help='Пауза в секундах, когда очередь пуста.',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Разобрать очередь и завершиться.',
+        )
+
+    def handle(self, *args, **options):
+        self.verbosity = options['verbosity']
+        executor_class = EXECUTORS[options['executor']]
+        with executor_class(max_workers=options['workers']) as executor:
+            while True:
+                processed = self.moderate_batch(
+                    executor, options['batch_size'], options['workers']
+                )
+                if processed:
+                    continue
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+
+    def moderate_batch(self, executor, batch_size, workers):
+        batch = list(
+            Comment.objects.filter(
+                status=Comment.Status.PENDING
+            ).order_by('id').values_list('pk', 'news_id', 'text')[:batch_size]
+        )
+        if not batch:
+            return 0
+        check = partial(moderate_text, matcher=get_bad_words_matcher())
+        chunksize = max(1, len(batch) // workers)
+        reasons = list(
+            executor.map(check, [row[2] for row in batch], chunksize=chunksize)
+        )
+        approved = Counter()
+        rejected = Counter()
+        with transaction.atomic():
+            for (pk, news_id, text), reason in zip(batch, reasons):
+                status = (
+                    Comment.Status.APPROVED if reason is None
+                    else Comment.Status.REJECTED
+                )
+                # Комментарий могли удалить или поправить, пока шла
+                # проверка: тогда вердикт к нему уже не относится.
+                updated = Comment.objects.filter(
+                    pk=pk, status=Comment.Status.PENDING, text=text
+                ).update(status=status)
+                if not updated:
+                    continue
+                if reason is None:
+                    approved[news_id] += 1
+                else:
+                    rejected[news_id] += 1
+                    self.log(f'Комментарий {pk} отклонён: {reason}.', 2)
+            for news_id, count in approved.items():
+                News.objects.filter(pk=news_id).change_comment_count(count)
+            if rejected:
+                # Отклонённый комментарий пропадает со страницы автора.
+                News.objects.filter(pk__in=list(rejected)).touch()
+            if approved:
+                scopes = [news_page_scope(pk) for pk in approved]
+                transaction.on_commit(
+                    lambda: purge_pages(HOME_PAGE_SCOPE, *scopes)
+                )
+        self.log(
+            f'Проверено: {len(batch)}, опубликовано: '
+            f'{sum(approved.values())}, отклонено: '
+            f'{sum(rejected.values())}.'
+        )
+        return len(batch)
+
+    def log(self, message, verbosity=1):
+        if self.verbosity >= verbosity:
+            self.stdout.write(message)
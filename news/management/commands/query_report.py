@@ -0,0 +1,74 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from yanews.querylog import read_stats
+
+# Порядок сортировки: ключ по записи [число, всего, максимум, пример].
+ORDERINGS = {
+    'total': lambda entry: entry[1],
+    'count': lambda entry: entry[0],
+    'max': lambda entry: entry[2],
+    'mean': lambda entry: entry[1] / entry[0],
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Складывает статистику SQL всех воркеров из QUERY_LOG_DIR '
+        'и печатает самые дорогие отпечатки запросов с примером '
+        'параметров.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dir',
+            help='Каталог со статистикой; по умолчанию QUERY_LOG_DIR.',
+        )
+        parser.add_argument(
+            '--top',
+            type=int,
+            default=20,
+            help='Сколько отпечатков показать.',
+        )
+        parser.add_argument(
+            '--sort',
+            choices=ORDERINGS,
+            default='total',
+            help='По чему сортировать: суммарное время, число выполнений, '
+                 'наибольшее или среднее время.',
+        )
+
+    def handle(self, *args, **options):
+        directory = options['dir'] or settings.QUERY_LOG_DIR
+        if not directory:
+            raise CommandError(
+                'Каталог не задан: укажите --dir или QUERY_LOG_DIR.'
+            )
+        stats = read_stats(directory)
+        if not stats:
+            raise CommandError(f'В каталоге {directory} нет статистики SQL.')
+        order = ORDERINGS[options['sort']]
+        top = sorted(
+            stats.items(), key=lambda item: order(item[1]), reverse=True
+        )[:options['top']]
+        grand_total = sum(entry[1] for entry in stats.values())
+        self.stdout.write(
+            f'{"№":>3} {"выполнений":>10} {"всего, мс":>11} {"доля":>6} '
+            f'{"среднее, мс":>11} {"макс., мс":>10}'
+        )
+        for number, (sql, (count, total, longest, params)) in enumerate(
+            top, start=1
+        ):
+            share = total / grand_total if grand_total else 0.0
+            self.stdout.write(
+                f'{number:>3} {count:>10} {total * 1000:>11.1f} '
+                f'{share:>6.1%} {total / count * 1000:>11.2f} '
+                f'{longest * 1000:>10.1f}'
+            )
+            self.stdout.write(f'    {sql}')
+            self.stdout.write(f'    параметры: {params}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Отпечатков: {len(stats)}, выполнений: '
+            f'{sum(entry[0] for entry in stats.values())}, '
+            f'всего {grand_total:.2f} с.'
+        ))
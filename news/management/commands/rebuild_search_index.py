@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from news.models import News
+from news.search import rebuild_index, uses_fts
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает полнотекстовый индекс новостей и комментариев.'
+
+    def handle(self, *args, **options):
+        if not uses_fts(News):
+            raise CommandError('Полнотекстовый индекс есть только в SQLite.')
+        with transaction.atomic():
+            rebuild_index()
+        self.stdout.write(self.style.SUCCESS('Поисковый индекс перестроен.'))
@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F
+
+from news.management.arguments import positive
+from news.models import News
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчики комментариев у новостей.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=positive,
+            default=1000,
+            help='Сколько новостей проверять за один проход.',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        last_pk = 0
+        checked = repaired = 0
+        while True:
+            batch = list(
+                News.objects.filter(pk__gt=last_pk).order_by(
+                    'pk'
+                ).values_list('pk', flat=True)[:batch_size]
+            )
+            if not batch:
+                break
+            last_pk = batch[-1]
+            checked += len(batch)
+            with transaction.atomic():
+                broken = list(
+                    News.objects.filter(
+                        pk__in=batch
+                    ).with_actual_comment_count().exclude(
+                        comment_count=F('actual_comment_count')
+                    ).values_list('pk', flat=True)
+                )
+                if broken:
+                    repaired += News.objects.filter(
+                        pk__in=broken
+                    ).recount_comments()
+        self.stdout.write(self.style.SUCCESS(
+            f'Проверено новостей: {checked}, исправлено: {repaired}.'
+        ))
@@ -0,0 +1,87 @@
+import time
+from datetime import date
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from news.cache import HOME_PAGE_SCOPE, purge_pages
+from news.management.arguments import non_negative, positive
+from news.seeding import DatasetGenerator
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу синтетическими пользователями, новостями '
+        'и комментариями для нагрузочных тестов. Одинаковые --seed '
+        'и --until дают одинаковые данные.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=non_negative, default=1000)
+        parser.add_argument('--news', type=non_negative, default=10000)
+        parser.add_argument('--comments', type=non_negative, default=100000)
+        parser.add_argument('--seed', type=non_negative, default=0)
+        parser.add_argument(
+            '--until',
+            type=date.fromisoformat,
+            help='Дата самой свежей новости, ГГГГ-ММ-ДД; по умолчанию '
+                 'сегодня.',
+        )
+        parser.add_argument(
+            '--days',
+            type=non_negative,
+            default=3650,
+            help='За сколько дней до --until распределены новости.',
+        )
+        parser.add_argument(
+            '--skew',
+            type=float,
+            default=1.1,
+            help='Показатель распределения Ципфа для комментариев: '
+                 'чем больше, тем сильнее выделяются вирусные новости.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=positive,
+            default=10000,
+            help='Сколько строк генерировать и вставлять за раз. '
+                 'Все данные загружаются одной транзакцией.',
+        )
+
+    def handle(self, *args, **options):
+        if options['comments'] and not (options['users'] and options['news']):
+            raise CommandError(
+                'Для комментариев нужны --users и --news больше нуля.'
+            )
+        generator = DatasetGenerator(
+            seed=options['seed'],
+            until=options['until'],
+            days=options['days'],
+            skew=options['skew'],
+            batch_size=options['batch_size'],
+            progress=self.progress if options['verbosity'] >= 2 else None,
+        )
+        if get_user_model().objects.filter(
+            username__startswith=generator.username_prefix
+        ).exists():
+            raise CommandError(
+                f'Данные с --seed {options["seed"]} уже загружены: '
+                f'выберите другой seed.'
+            )
+        started = time.perf_counter()
+        approved = generator.generate(
+            options['users'], options['news'], options['comments']
+        )
+        purge_pages(HOME_PAGE_SCOPE)
+        elapsed = time.perf_counter() - started
+        total = options['users'] + options['news'] + options['comments']
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано пользователей: {options["users"]}, '
+            f'новостей: {options["news"]}, '
+            f'комментариев: {options["comments"]} '
+            f'(опубликовано {approved}). '
+            f'{total / elapsed if elapsed else 0:.0f} строк/с.'
+        ))
+
+    def progress(self, message):
+        self.stdout.write(message)
@@ -0,0 +1,37 @@
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class Command(BaseCommand):
+    help = (
+        'Копирует основную базу SQLite в файлы реплик из READ_REPLICAS. '
+        'Заменяет репликацию при локальной проверке маршрутизации.'
+    )
+
+    def handle(self, *args, **options):
+        if not settings.READ_REPLICAS:
+            raise CommandError(
+                'Реплики не настроены: задайте DATABASE_REPLICAS.'
+            )
+        aliases = (DEFAULT_DB_ALIAS, *settings.READ_REPLICAS)
+        for alias in aliases:
+            if connections[alias].vendor != 'sqlite':
+                raise CommandError(
+                    f'База {alias} не SQLite: реплики должна наполнять '
+                    f'репликация самой СУБД.'
+                )
+        primary = connections[DEFAULT_DB_ALIAS]
+        primary.ensure_connection()
+        for alias in settings.READ_REPLICAS:
+            # Открытое соединение реплики видело бы старый снимок.
+            connections[alias].close()
+            target = sqlite3.connect(connections[alias].settings_dict['NAME'])
+            try:
+                primary.connection.backup(target)
+            finally:
+                target.close()
+            if options['verbosity']:
+                self.stdout.write(f'Реплика {alias} обновлена.')
@@ -0,0 +1,228 @@
+"""
+Метрики приложения в текстовом формате Prometheus.
+
+Значения копятся в памяти процесса. Если задан METRICS_DIR, каждый
+процесс не чаще раза в METRICS_FLUSH_INTERVAL секунд сбрасывает их
+в свой файл, а /metrics складывает файлы всех воркеров: так счётчики
+не теряются, какой бы воркер ни ответил на запрос Prometheus.
+Все значения, включая корзины гистограмм, только растут, поэтому
+сложение по процессам даёт верный итог. Каталог стоит очищать
+при перезапуске сервиса, как и для prometheus_client.
+"""
+import json
+import time
+from collections import defaultdict
+
+from yanews.middleware import RequestMiddleware, request_execute_wrapper
+from yanews.process_files import ProcessFile
+
+FILE_PREFIX = 'metrics-'
+KNOWN_METHODS = frozenset(
+    ('GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS')
+)
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, float('inf'),
+)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, float('inf'))
+
+
+def _escape(value):
+    return (
+        str(value)
+        .replace('\\', '\\\\')
+        .replace('\n', '\\n')
+        .replace('"', '\\"')
+    )
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Registry(ProcessFile):
+    """Метрики процесса и их выгрузка в общий каталог."""
+    prefix = FILE_PREFIX
+    directory_setting = 'METRICS_DIR'
+    interval_setting = 'METRICS_FLUSH_INTERVAL'
+
+    def __init__(self):
+        self.metrics = {}
+        self.values = defaultdict(float)
+        super().__init__()
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def add(self, *samples):
+        """Прибавляет значения: samples — тройки (имя, метки, число)."""
+        with self.lock:
+            self._check_fork()
+            for sample, labels, amount in samples:
+                self.values[sample, labels] += amount
+        self.maybe_flush()
+
+    def _clear_data(self):
+        self.values.clear()
+
+    def _dump(self):
+        return json.dumps([
+            [sample, list(map(list, labels)), value]
+            for (sample, labels), value in self.values.items()
+        ])
+
+    def collect(self):
+        """Сумма значений всех процессов; свои берутся из памяти."""
+        with self.lock:
+            self._check_fork()
+            totals = defaultdict(float, self.values)
+            own = self.path().name if self.directory else None
+        if self.directory:
+            for path in self.paths():
+                if path.name == own:
+                    continue
+                try:
+                    data = json.loads(path.read_text())
+                except (OSError, ValueError):
+                    continue
+                for sample, labels, value in data:
+                    totals[sample, tuple(map(tuple, labels))] += value
+        return totals
+
+    def render(self):
+        """Все метрики в текстовом формате Prometheus."""
+        samples = defaultdict(list)
+        # Порядок добавления сохраняет порядок корзин гистограмм.
+        for (sample, labels), value in self.collect().items():
+            samples[sample].append((labels, value))
+        lines = []
+        for metric in self.metrics.values():
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.type}')
+            for sample in metric.samples():
+                for labels, value in samples.get(sample, ()):
+                    label_text = ','.join(
+                        f'{name}="{_escape(label)}"' for name, label in labels
+                    )
+                    lines.append(
+                        f'{sample}{{{label_text}}} {_format_value(value)}'
+                        if label_text
+                        else f'{sample} {_format_value(value)}'
+                    )
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+
+class Counter:
+    type = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        registry.register(self)
+
+    def _labels(self, labels):
+        return tuple((name, str(labels[name])) for name in self.labelnames)
+
+    def samples(self):
+        return (self.name,)
+
+    def inc(self, amount=1, **labels):
+        registry.add((self.name, self._labels(labels), amount))
+
+
+class Histogram(Counter):
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(),
+                 buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def samples(self):
+        return tuple(
+            f'{self.name}_{suffix}' for suffix in ('bucket', 'sum', 'count')
+        )
+
+    def observe(self, value, **labels):
+        labels = self._labels(labels)
+        # Пустые корзины тоже заводятся: так они идут в выдаче по порядку.
+        registry.add(
+            *(
+                (
+                    f'{self.name}_bucket',
+                    labels + (('le', _format_value(bucket)),),
+                    int(value <= bucket),
+                )
+                for bucket in self.buckets
+            ),
+            (f'{self.name}_sum', labels, value),
+            (f'{self.name}_count', labels, 1),
+        )
+
+
+REQUESTS = Counter(
+    'news_http_requests_total',
+    'Обработанные HTTP-запросы.',
+    ('view', 'method', 'status'),
+)
+REQUEST_DURATION = Histogram(
+    'news_http_request_duration_seconds',
+    'Время обработки запроса.',
+    ('view',),
+)
+REQUEST_QUERIES = Histogram(
+    'news_http_request_db_queries',
+    'Число SQL-запросов на один HTTP-запрос.',
+    ('view',),
+    buckets=QUERY_BUCKETS,
+)
+COMMENTS_CREATED = Counter(
+    'news_comments_created_total',
+    'Отправленные комментарии.',
+)
+PAGE_CACHE = Counter(
+    'news_page_cache_requests_total',
+    'Обращения к кэшу страниц для анонимов.',
+    ('result',),
+)
+
+
+class _QueryCounter:
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class MetricsMiddleware(RequestMiddleware):
+    """
+    Считает запросы, их длительность и число SQL по представлениям.
+
+    SQL считается и у асинхронных представлений, которые обращаются
+    к базе из пула потоков.
+    """
+
+    def enter(self, request, stack):
+        queries = _QueryCounter()
+        stack.enter_context(request_execute_wrapper(queries))
+        return queries, time.perf_counter()
+
+    def finish(self, request, response, state):
+        queries, start = state
+        duration = time.perf_counter() - start
+        match = request.resolver_match
+        view = match.view_name if match else 'unresolved'
+        method = request.method if request.method in KNOWN_METHODS else 'other'
+        REQUESTS.inc(view=view, method=method, status=response.status_code)
+        REQUEST_DURATION.observe(duration, view=view)
+        REQUEST_QUERIES.observe(queries.count, view=view)
+        return response
@@ -0,0 +1,31 @@
+# Generated by Django 3.2.15 on 2026-10-18 16:40
+
+from django.db import migrations, models
+
+
+def approve_existing_comments(apps, schema_editor):
+    """Комментарии, написанные до модерации, уже были опубликованы."""
+    Comment = apps.get_model('news', 'Comment')
+    Comment.objects.update(status='approved')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0006_badword'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='status',
+            field=models.CharField(choices=[('pending', 'На модерации'), ('approved', 'Опубликован'), ('rejected', 'Отклонён')], default='pending', max_length=16),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['status', 'id'], name='comment_status_idx'),
+        ),
+        migrations.RunPython(
+            approve_existing_comments, migrations.RunPython.noop
+        ),
+    ]
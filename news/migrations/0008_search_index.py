@@ -0,0 +1,86 @@
+# Generated by Django 3.2.15 on 2026-10-18 17:40
+
+from django.db import migrations
+
+# Полнотекстовый индекс SQLite FTS5. Таблицы хранят копию текста с «ё»,
+# заменённой на «е», и синхронизируются триггерами, поэтому индекс
+# не отстаёт ни при bulk_create, ни при QuerySet.update().
+# В индекс комментариев попадают только опубликованные комментарии.
+NORMALIZE = "replace(replace({}, 'ё', 'е'), 'Ё', 'Е')"
+
+CREATE_SQL = [
+    "CREATE VIRTUAL TABLE news_news_fts USING fts5("
+    "title, text, tokenize = 'unicode61 remove_diacritics 2')",
+    "CREATE VIRTUAL TABLE news_comment_fts USING fts5("
+    "text, tokenize = 'unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER news_news_fts_insert AFTER INSERT ON news_news BEGIN "
+    "INSERT INTO news_news_fts (rowid, title, text) VALUES (new.id, {}, {}); "
+    "END".format(
+        NORMALIZE.format('new.title'), NORMALIZE.format('new.text')
+    ),
+    "CREATE TRIGGER news_news_fts_delete AFTER DELETE ON news_news BEGIN "
+    "DELETE FROM news_news_fts WHERE rowid = old.id; "
+    "END",
+    "CREATE TRIGGER news_news_fts_update AFTER UPDATE OF title, text "
+    "ON news_news BEGIN "
+    "DELETE FROM news_news_fts WHERE rowid = old.id; "
+    "INSERT INTO news_news_fts (rowid, title, text) VALUES (new.id, {}, {}); "
+    "END".format(
+        NORMALIZE.format('new.title'), NORMALIZE.format('new.text')
+    ),
+    "CREATE TRIGGER news_comment_fts_insert AFTER INSERT ON news_comment "
+    "WHEN new.status = 'approved' BEGIN "
+    "INSERT INTO news_comment_fts (rowid, text) VALUES (new.id, {}); "
+    "END".format(NORMALIZE.format('new.text')),
+    "CREATE TRIGGER news_comment_fts_delete AFTER DELETE ON news_comment "
+    "BEGIN "
+    "DELETE FROM news_comment_fts WHERE rowid = old.id; "
+    "END",
+    "CREATE TRIGGER news_comment_fts_update AFTER UPDATE OF text, status "
+    "ON news_comment BEGIN "
+    "DELETE FROM news_comment_fts WHERE rowid = old.id; "
+    "INSERT INTO news_comment_fts (rowid, text) "
+    "SELECT new.id, {} WHERE new.status = 'approved'; "
+    "END".format(NORMALIZE.format('new.text')),
+    "INSERT INTO news_news_fts (rowid, title, text) "
+    "SELECT id, {}, {} FROM news_news".format(
+        NORMALIZE.format('title'), NORMALIZE.format('text')
+    ),
+    "INSERT INTO news_comment_fts (rowid, text) "
+    "SELECT id, {} FROM news_comment WHERE status = 'approved'".format(
+        NORMALIZE.format('text')
+    ),
+]
+
+DROP_SQL = [
+    'DROP TRIGGER IF EXISTS news_comment_fts_update',
+    'DROP TRIGGER IF EXISTS news_comment_fts_delete',
+    'DROP TRIGGER IF EXISTS news_comment_fts_insert',
+    'DROP TRIGGER IF EXISTS news_news_fts_update',
+    'DROP TRIGGER IF EXISTS news_news_fts_delete',
+    'DROP TRIGGER IF EXISTS news_news_fts_insert',
+    'DROP TABLE IF EXISTS news_comment_fts',
+    'DROP TABLE IF EXISTS news_news_fts',
+]
+
+
+def run_on_sqlite(statements):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0007_comment_status'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run_on_sqlite(CREATE_SQL), run_on_sqlite(DROP_SQL)
+        ),
+    ]
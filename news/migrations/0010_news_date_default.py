@@ -0,0 +1,24 @@
+# Generated by Django 3.2.15 on 2026-10-18 17:47
+
+import datetime
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0009_comment_author_created_idx'),
+    ]
+
+    # Значение по умолчанию подставляет Python, в схеме базы оно
+    # не хранится. SQLite пересоздал бы таблицу ради AlterField
+    # и потерял бы триггеры полнотекстового индекса из 0008.
+    operations = [
+        migrations.SeparateDatabaseAndState(state_operations=[
+            migrations.AlterField(
+                model_name='news',
+                name='date',
+                field=models.DateField(default=datetime.datetime.today),
+            ),
+        ]),
+    ]
@@ -2,23 +2,83 @@ from datetime import datetime
 
 from django.conf import settings
 from django.db import models
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+
+def _comment_total():
+    """Подзапрос с числом опубликованных комментариев к новости."""
+    comments = Comment.objects.filter(
+        news=OuterRef('pk'), status=Comment.Status.APPROVED
+    ).order_by().values('news').annotate(
+        total=Count('pk')
+    ).values('total')
+    return Coalesce(Subquery(comments), 0)
+
+
+class NewsQuerySet(models.QuerySet):
+
+    def change_comment_count(self, delta):
+        """
+        Атомарно сдвигает счётчик комментариев на delta.
+
+        Ниже нуля счётчик не опускается, даже если он успел разойтись
+        с таблицей комментариев: такие расхождения чинит recount_comments.
+        """
+        return self.update(
+            comment_count=Greatest(F('comment_count') + delta, 0),
+            modified=timezone.now(),
+        )
+
+    def touch(self):
+        """Отмечает новости изменёнными, например после правки комментария."""
+        return self.update(modified=timezone.now())
+
+    def with_actual_comment_count(self):
+        """Добавляет к новостям фактическое число комментариев."""
+        return self.annotate(actual_comment_count=_comment_total())
+
+    def recount_comments(self):
+        """Пересчитывает счётчики по таблице комментариев."""
+        return self.update(
+            comment_count=_comment_total(), modified=timezone.now()
+        )
 
 
 class News(models.Model):
     title = models.CharField(max_length=50)
     text = models.TextField()
     date = models.DateField(default=datetime.today)
+    # Число опубликованных комментариев, см. Comment.Status.APPROVED.
+    comment_count = models.PositiveIntegerField(default=0, editable=False)
+    modified = models.DateTimeField(auto_now=True)
+
+    objects = NewsQuerySet.as_manager()
 
     class Meta:
         ordering = ('-date',)
+        indexes = (
+            models.Index(fields=('-date', '-id'), name='news_date_id_idx'),
+        )
         verbose_name_plural = 'Новости'
         verbose_name = 'Новость'
 
     def __str__(self):
         return self.title
 
+    @property
+    def has_comments(self):
+        return self.comment_count > 0
+
 
 class Comment(models.Model):
+
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'На модерации'
+        APPROVED = 'approved', 'Опубликован'
+        REJECTED = 'rejected', 'Отклонён'
+
     news = models.ForeignKey(
         News,
         on_delete=models.CASCADE
@@ -29,9 +89,35 @@ class Comment(models.Model):
     )
     text = models.TextField()
     created = models.DateTimeField(auto_now_add=True)
+    status = models.CharField(
+        max_length=16,
+        choices=Status.choices,
+        default=Status.PENDING,
+    )
 
     class Meta:
         ordering = ('created',)
+        indexes = (
+            models.Index(
+                fields=('news', 'created'), name='comment_news_created_idx'
+            ),
+            models.Index(fields=('status', 'id'), name='comment_status_idx'),
+            models.Index(
+                fields=('author', 'created'), name='comment_author_created_idx'
+            ),
+        )
 
     def __str__(self):
         return self.text[:50]
+
+
+class BadWord(models.Model):
+    word = models.CharField('Слово', max_length=100, unique=True)
+
+    class Meta:
+        ordering = ('word',)
+        verbose_name = 'Запрещённое слово'
+        verbose_name_plural = 'Запрещённые слова'
+
+    def __str__(self):
+        return self.word
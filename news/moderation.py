@@ -0,0 +1,207 @@
+"""
+Поиск запрещённых слов в тексте комментариев.
+
+Список слов компилируется один раз в автомат Ахо — Корасик, после чего
+проверка текста занимает один проход по нему независимо от длины списка.
+Сам список хранится в базе и правится в админке; процесс узнаёт о правках
+по версии в кэше default и пересобирает автомат только после них.
+Чтобы правку увидели все воркеры, CACHES должен указывать на общий для них
+бэкенд: Redis, Memcached или FileBasedCache. С LocMemCache из
+yanews/settings.py версия своя у каждого процесса, и остальные воркеры
+перечитают список только после перезапуска.
+"""
+import re
+import threading
+import time
+import uuid
+from collections import deque
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+
+BAD_WORDS_VERSION_KEY = 'moderation:bad_words:version'
+
+# Пороги фоновой проверки комментариев.
+MAX_LINKS = 2
+MAX_REPEATED_CHARS = 10
+MAX_UPPERCASE_RATIO = 0.7
+MIN_LETTERS_FOR_CASE_CHECK = 20
+LINK_RE = re.compile(r'(?:https?://|www\.)\S+', re.IGNORECASE)
+REPEATED_CHARS_RE = re.compile(r'(.)\1{%d,}' % MAX_REPEATED_CHARS)
+
+# Латинские буквы и цифры, которыми подменяют похожие русские буквы.
+LOOKALIKES = str.maketrans({
+    'a': 'а', 'b': 'в', 'c': 'с', 'e': 'е', 'h': 'н', 'k': 'к', 'm': 'м',
+    'o': 'о', 'p': 'р', 't': 'т', 'x': 'х', 'y': 'у', '0': 'о', '3': 'з',
+    'ё': 'е',
+})
+
+# Окончания, которые отрезаются от запрещённых слов, чтобы ловить
+# их падежные формы: «редиска» находит и «редиской», и «редиски».
+ENDINGS = sorted(
+    (
+        'ами', 'ями', 'ого', 'его', 'ому', 'ему', 'ыми', 'ими',
+        'ой', 'ей', 'ий', 'ый', 'ая', 'яя', 'ое', 'ее', 'ам', 'ям',
+        'ах', 'ях', 'ом', 'ем', 'ов', 'ев', 'ью',
+        'а', 'я', 'о', 'е', 'ы', 'и', 'у', 'ю', 'й', 'ь',
+    ),
+    key=len,
+    reverse=True,
+)
+MIN_STEM_LENGTH = 4
+
+
+def normalize(text):
+    """Приводит текст к виду, в котором ищутся запрещённые слова."""
+    return text.lower().translate(LOOKALIKES)
+
+
+def stem(word):
+    """Отрезает окончание, если после этого остаётся достаточно букв."""
+    for ending in ENDINGS:
+        if (
+            word.endswith(ending)
+            and len(word) - len(ending) >= MIN_STEM_LENGTH
+        ):
+            return word[:-len(ending)]
+    return word
+
+
+class BadWordsMatcher:
+    """Автомат Ахо — Корасик по основам запрещённых слов."""
+
+    def __init__(self, words):
+        self.words = tuple(words)
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [None]
+        for word in self.words:
+            pattern = stem(normalize(word.strip()))
+            if pattern:
+                self._add(pattern, word)
+        self._build_links()
+
+    def __len__(self):
+        return len(self.words)
+
+    def _add(self, pattern, word):
+        state = 0
+        for char in pattern:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(None)
+            state = next_state
+        if self._output[state] is None:
+            self._output[state] = word
+
+    def _build_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                if self._output[next_state] is None:
+                    self._output[next_state] = (
+                        self._output[self._fail[next_state]]
+                    )
+
+    def search(self, text):
+        """Возвращает первое найденное запрещённое слово или None."""
+        goto, fail, output = self._goto, self._fail, self._output
+        state = 0
+        for char in normalize(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state] is not None:
+                return output[state]
+        return None
+
+
+def moderate_text(text, matcher):
+    """
+    Полная проверка текста комментария в фоновом воркере.
+
+    Возвращает причину отказа или None, если комментарий можно
+    публиковать. Функция не ходит в базу, поэтому её можно выполнять
+    в пуле процессов.
+    """
+    if matcher.search(text) is not None:
+        return 'запрещённые слова'
+    if len(LINK_RE.findall(text)) > MAX_LINKS:
+        return 'слишком много ссылок'
+    if REPEATED_CHARS_RE.search(text):
+        return 'повторяющиеся символы'
+    letters = [char for char in text if char.isalpha()]
+    if len(letters) >= MIN_LETTERS_FOR_CASE_CHECK:
+        uppercase = sum(char.isupper() for char in letters)
+        if uppercase / len(letters) > MAX_UPPERCASE_RATIO:
+            return 'текст набран заглавными буквами'
+    return None
+
+
+class _CompiledBadWords:
+    """Автомат текущего процесса и версия списка, из которой он собран."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.matcher = None
+        self.version = None
+        self.checked_at = 0.0
+
+
+_compiled = _CompiledBadWords()
+
+
+def _current_version():
+    version = cache.get(BAD_WORDS_VERSION_KEY)
+    if version is None:
+        cache.add(BAD_WORDS_VERSION_KEY, uuid.uuid4().hex, None)
+        version = cache.get(BAD_WORDS_VERSION_KEY)
+    return version
+
+
+def get_bad_words_matcher():
+    """
+    Автомат по словам из базы.
+
+    Версия списка в кэше default сверяется не чаще, чем раз
+    в BAD_WORDS_CHECK_INTERVAL секунд, а слова перечитываются из базы
+    только если она изменилась.
+    """
+    now = time.monotonic()
+    matcher = _compiled.matcher
+    if (
+        matcher is not None
+        and now - _compiled.checked_at < settings.BAD_WORDS_CHECK_INTERVAL
+    ):
+        return matcher
+    with _compiled.lock:
+        version = _current_version()
+        if _compiled.matcher is None or version != _compiled.version:
+            BadWord = apps.get_model('news', 'BadWord')
+            _compiled.matcher = BadWordsMatcher(
+                BadWord.objects.values_list('word', flat=True)
+            )
+            _compiled.version = version
+        _compiled.checked_at = now
+        return _compiled.matcher
+
+
+def bad_words_changed():
+    """
+    Меняет версию списка слов в кэше default.
+
+    Другие воркеры увидят новую версию, только если кэш у них общий.
+    """
+    cache.set(BAD_WORDS_VERSION_KEY, uuid.uuid4().hex, None)
+    _compiled.checked_at = 0.0
@@ -0,0 +1,114 @@
+import base64
+import binascii
+import datetime
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+
+
+class InvalidCursor(ValueError):
+    """Курсор не удалось разобрать."""
+
+
+class CursorEncoder(DjangoJSONEncoder):
+    """Сохраняет время целиком, включая микросекунды."""
+
+    def default(self, o):
+        if isinstance(o, (datetime.date, datetime.time)):
+            return o.isoformat()
+        return super().default(o)
+
+
+class KeysetPage:
+    """Страница, полученная по курсору."""
+
+    def __init__(self, object_list, next_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+
+class KeysetPaginator:
+    """
+    Постраничный вывод по ключу вместо OFFSET.
+
+    Курсор хранит значения полей сортировки последнего объекта страницы,
+    поэтому следующая страница выбирается условием по индексу и стоит
+    одинаково на любой глубине. Последнее поле сортировки должно быть
+    уникальным, обычно это id.
+    """
+
+    def __init__(self, queryset, ordering, per_page):
+        self.queryset = queryset
+        self.ordering = tuple(ordering)
+        self.per_page = per_page
+        self.fields = [name.lstrip('-') for name in self.ordering]
+
+    def page(self, cursor=None):
+        queryset = self.queryset.order_by(*self.ordering)
+        if cursor:
+            queryset = queryset.filter(self._after(self.decode(cursor)))
+        object_list = list(queryset[:self.per_page + 1])
+        next_cursor = None
+        if len(object_list) > self.per_page:
+            object_list = object_list[:self.per_page]
+            next_cursor = self.encode(object_list[-1])
+        return KeysetPage(object_list, next_cursor)
+
+    def encode(self, obj):
+        """Упаковывает ключ объекта в непрозрачную строку для URL."""
+        values = [getattr(obj, name) for name in self.fields]
+        raw = json.dumps(values, cls=CursorEncoder).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    def decode(self, cursor):
+        """Разбирает курсор обратно в значения полей сортировки."""
+        try:
+            raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            values = json.loads(raw)
+        except (binascii.Error, ValueError) as error:
+            raise InvalidCursor(cursor) from error
+        if not isinstance(values, list) or len(values) != len(self.fields):
+            raise InvalidCursor(cursor)
+        opts = self.queryset.model._meta
+        try:
+            values = [
+                opts.get_field(name).to_python(value)
+                for name, value in zip(self.fields, values)
+            ]
+        except (TypeError, ValidationError) as error:
+            raise InvalidCursor(cursor) from error
+        if None in values:
+            raise InvalidCursor(cursor)
+        return values
+
+    def _after(self, values):
+        """
+        Условие «строго после курсора» для составного ключа.
+
+        Отдельное нестрогое условие по первому полю дублирует уже
+        входящее в OR, но позволяет базе начать обход индекса сразу
+        с нужного места вместо сканирования всей таблицы.
+        """
+        first = self.ordering[0]
+        bound = 'lte' if first.startswith('-') else 'gte'
+        condition = Q()
+        for index, name in enumerate(self.ordering):
+            field = self.fields[index]
+            lookup = 'lt' if name.startswith('-') else 'gt'
+            step = Q(**{f'{field}__{lookup}': values[index]})
+            for previous, value in zip(self.fields[:index], values):
+                step &= Q(**{previous: value})
+            condition |= step
+        return Q(**{f'{self.fields[0]}__{bound}': values[0]}) & condition
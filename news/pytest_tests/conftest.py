@@ -1,9 +1,11 @@
+import importlib
 from datetime import datetime, timedelta
 
 import pytest
 from django.conf import settings
+from django.core.cache import cache
 from django.test.client import Client
-from django.urls import reverse
+from django.urls import clear_url_caches, reverse
 from django.utils import timezone
 
 from news.models import Comment, News
@@ -14,6 +16,32 @@ def enable_db_for_all_tests(db):
     """Все тесты используют базу."""
 
 
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """Кэш не переживает тест: id объектов в базе повторяются."""
+    cache.clear()
+    yield
+    cache.clear()
+
+
+def reload_urls():
+    # Корневой URLconf тоже перечитывается: вложенные резолверы
+    # запоминают маршруты news.urls при первом обращении.
+    for module in ('news.urls', settings.ROOT_URLCONF):
+        importlib.reload(importlib.import_module(module))
+    clear_url_caches()
+
+
+@pytest.fixture
+def async_views(settings):
+    """Маршруты главной и новости ведут на асинхронные представления."""
+    settings.NEWS_ASYNC_VIEWS = True
+    reload_urls()
+    yield
+    settings.NEWS_ASYNC_VIEWS = False
+    reload_urls()
+
+
 @pytest.fixture
 def author(django_user_model):
     return django_user_model.objects.create(username='Автор')
@@ -63,7 +91,9 @@ def comment(news_one, author):
         news=news_one,
         text='Текст комментария',
         author=author,
+        status=Comment.Status.APPROVED,
     )
+    News.objects.filter(pk=news_one.pk).recount_comments()
     return comment
 
 
@@ -74,9 +104,11 @@ def comment_multiple(news_one, author):
         comment = Comment.objects.create(
             news=news_one,
             text=f'Tекст {index}',
-            author=author,)
+            author=author,
+            status=Comment.Status.APPROVED,)
         comment.created = now + timedelta(days=index)
         comment.save()
+    News.objects.filter(pk=news_one.pk).recount_comments()
 
 
 @pytest.fixture
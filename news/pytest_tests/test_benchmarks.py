@@ -0,0 +1,126 @@
+# В файле test_benchmarks.py:
+# Микробенчмарки, запуск: pytest -m benchmark --benchmark-json=results.json,
+# сравнение с базой: python -m benchmarks.compare results.json.
+# + Проверка текста комментария на запрещённые слова.
+# + Отрисовка home.html и detail.html с N комментариями, с прогретым
+# и с пустым кэшем блоков комментариев.
+# + get_queryset и get_object представлений новостей и комментариев.
+
+from datetime import timedelta
+
+import pytest
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.template.loader import render_to_string
+from django.test import RequestFactory
+from django.utils import timezone
+
+from news.forms import BAD_WORDS, CommentForm
+from news.models import Comment, News
+from news.views import (
+    CommentDelete, CommentUpdate, NewsComment, NewsDetail, NewsList,
+)
+
+pytestmark = pytest.mark.benchmark
+
+CLEAN_TEXTS = {
+    'short': 'Отличная новость, спасибо!',
+    'long': 'Городские власти открыли новый парк у реки. ' * 100,
+    'bad_word': f'Какой же ты {BAD_WORDS[0]}, автор',
+}
+
+
+@pytest.fixture
+def news_with_comments(author, request):
+    news = News.objects.create(title='Новость', text='Текст новости')
+    now = timezone.now()
+    Comment.objects.bulk_create(
+        Comment(
+            news=news,
+            author=author,
+            text=f'Комментарий {index}\nвторая строка',
+            status=Comment.Status.APPROVED,
+            created=now + timedelta(minutes=index),
+        )
+        for index in range(request.param)
+    )
+    News.objects.filter(pk=news.pk).recount_comments()
+    news.refresh_from_db()
+    return news
+
+
+def make_view(view_class, user=None, **kwargs):
+    request = RequestFactory().get('/')
+    request.user = user or AnonymousUser()
+    view = view_class()
+    view.setup(request, **kwargs)
+    return view
+
+
+@pytest.mark.parametrize('kind', CLEAN_TEXTS)
+def test_clean_text(microbenchmark, kind):
+    form = CommentForm()
+    form.cleaned_data = {'text': CLEAN_TEXTS[kind]}
+
+    def clean():
+        try:
+            form.clean_text()
+        except ValidationError:
+            pass
+
+    microbenchmark(clean)
+
+
+@pytest.mark.usefixtures('news_multiple')
+def test_render_home(microbenchmark):
+    view = make_view(NewsList)
+    view.object_list = view.get_queryset()
+    context = view.get_context_data()
+    # Новости выбираются один раз: замеряется только шаблон.
+    context['object_list'] = context['news_list'] = list(
+        context['object_list']
+    )
+    microbenchmark(
+        lambda: render_to_string(view.template_name, context, view.request)
+    )
+
+
+@pytest.mark.parametrize('news_with_comments', (10, 50), indirect=True)
+@pytest.mark.parametrize('fragment_cache', ('warm', 'cold'))
+def test_render_detail(microbenchmark, news_with_comments, fragment_cache):
+    view = make_view(NewsDetail, pk=news_with_comments.pk)
+    view.object = view.get_object()
+    context = view.get_context_data(object=view.object)
+
+    def render():
+        if fragment_cache == 'cold':
+            cache.clear()
+        render_to_string(view.template_name, context, view.request)
+
+    microbenchmark(render)
+
+
+@pytest.mark.parametrize('news_with_comments', (50,), indirect=True)
+@pytest.mark.parametrize('view_class, method', (
+    (NewsList, 'get_queryset'),
+    (NewsDetail, 'get_object'),
+    (NewsComment, 'get_object'),
+    (CommentUpdate, 'get_queryset'),
+    (CommentUpdate, 'get_object'),
+    (CommentDelete, 'get_object'),
+), ids=lambda value: getattr(value, '__name__', value))
+def test_view_lookups(microbenchmark, news_with_comments, author, view_class,
+                      method):
+    comment = news_with_comments.comment_set.last()
+    pk = comment.pk if view_class.model is Comment else news_with_comments.pk
+    view = make_view(view_class, user=author, pk=pk)
+    lookup = getattr(view, method)
+
+    def run():
+        result = lookup()
+        # Queryset вычисляется, чтобы замер включал запрос к базе.
+        if method == 'get_queryset':
+            list(result)
+
+    microbenchmark(run)
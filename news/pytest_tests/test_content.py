@@ -6,12 +6,45 @@
 # + в хронологическом порядке: старые в начале списка, новые — в конце.
 # + Анонимному пользователю недоступна форма для отправки
 # комментария на странице отдельной новости, а авторизованному доступна.
+# + Число запросов к базе на главной странице не зависит
+# от количества комментариев.
+# + Архив по курсору отдаёт все новости без повторов и пропусков.
+# + Комментарии к новости выводятся страницами фиксированным
+# числом запросов.
+# + Поиск находит новости и опубликованные комментарии по формам слов,
+# а без полнотекстового индекса — по вхождению в заголовок и текст.
+# + Асинхронные варианты главной и страницы новости отдают те же страницы
+# и под ASGI обрабатывают одновременные запросы параллельно.
+# + Выгрузка отдаёт новости с комментариями в JSONL, CSV и gzip
+# двумя запросами к базе при любом числе новостей; gzip=0 выключает сжатие.
+
+import asyncio
+import csv
+import gzip
+import io
+import json
+import threading
+import time
+from datetime import date
 
 import pytest
 from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import AsyncClient, AsyncRequestFactory
 from django.urls import reverse
 
+from news.async_views import AsyncNewsDetailView, AsyncNewsList
+from news.exporting import NewsExport
 from news.forms import CommentForm
+from news.models import Comment, News
+from news.views import NewsList
+
+# Сколько одновременных запросов и насколько замедлено представление.
+CONCURRENT_REQUESTS = 4
+SLOW_VIEW_DELAY = 0.2
 
 
 @pytest.mark.usefixtures('news_multiple')
@@ -31,6 +64,53 @@ def test_news_sorting_on_home_page(client):
     assert all_dates == sorted_dates
 
 
+def test_archive_walks_all_news_by_cursor(client, settings):
+    """Проход по архиву курсорами видит каждую новость ровно один раз."""
+    settings.NEWS_COUNT_ON_ARCHIVE_PAGE = 3
+    News.objects.bulk_create(
+        News(title=f'Новость {index}', text='Текст', date=date(2022, 1, 1))
+        for index in range(5)
+    )
+    News.objects.bulk_create(
+        News(title=f'Старая {index}', text='Текст', date=date(2021, 1, 1))
+        for index in range(3)
+    )
+    url = reverse('news:archive')
+    seen = []
+    cursor = None
+    while True:
+        response = client.get(url, {'cursor': cursor} if cursor else {})
+        page = response.context['page']
+        seen.extend((news.date, news.pk) for news in page)
+        if not page.has_next:
+            break
+        cursor = page.next_cursor
+    assert len(seen) == News.objects.count()
+    assert seen == sorted(seen, reverse=True)
+
+
+@pytest.mark.parametrize('comments_count', (0, 1, 50))
+@pytest.mark.usefixtures('news_multiple')
+def test_home_page_queries_do_not_depend_on_comments(
+        client, home_url, author, django_assert_num_queries, comments_count):
+    """Комментарии на главной считаются одним запросом."""
+    news = News.objects.first()
+    Comment.objects.bulk_create(
+        Comment(
+            news=news, author=author, text=f'Текст {index}',
+            status=Comment.Status.APPROVED,
+        )
+        for index in range(comments_count)
+    )
+    News.objects.filter(pk=news.pk).recount_comments()
+    # Один запрос за валидаторами ETag и один за самими новостями.
+    with django_assert_num_queries(2):
+        response = client.get(home_url)
+    news_on_page = response.context['object_list'][0]
+    assert news_on_page.comment_count == comments_count
+    assert news_on_page.has_comments == bool(comments_count)
+
+
 @pytest.mark.usefixtures('comment_multiple')
 def test_comments_sorting_on_news_page(author_client, detail_url, news_one):
     """Проверка сортировки комментариев по дате создания."""
@@ -42,6 +122,46 @@ def test_comments_sorting_on_news_page(author_client, detail_url, news_one):
     assert all_timestamps == sorted_timestamps
 
 
+@pytest.mark.parametrize('comments_count', (1, 120))
+def test_detail_comments_are_paginated(
+        client, detail_url, news_one, author, settings,
+        django_assert_num_queries, comments_count):
+    """На странице новости только одна страница комментариев."""
+    settings.COMMENTS_COUNT_ON_NEWS_PAGE = 50
+    Comment.objects.bulk_create(
+        Comment(
+            news=news_one, author=author, text=f'Текст {index}',
+            status=Comment.Status.APPROVED,
+        )
+        for index in range(comments_count)
+    )
+    News.objects.filter(pk=news_one.pk).recount_comments()
+    # Валидаторы ETag, новость и страница комментариев с авторами.
+    with django_assert_num_queries(3):
+        response = client.get(detail_url)
+    page = response.context['comments_page']
+    assert len(page) == min(comments_count, 50)
+    assert page.has_next == (comments_count > 50)
+
+
+@pytest.mark.usefixtures('comment_multiple')
+def test_detail_comments_cursor_walks_in_order(
+        client, detail_url, settings):
+    """Курсор проходит все комментарии в хронологическом порядке."""
+    settings.COMMENTS_COUNT_ON_NEWS_PAGE = 3
+    seen = []
+    cursor = None
+    while True:
+        response = client.get(detail_url, {'cursor': cursor} if cursor else {})
+        page = response.context['comments_page']
+        seen.extend((comment.created, comment.pk) for comment in page)
+        if not page.has_next:
+            break
+        cursor = page.next_cursor
+    assert len(seen) == Comment.objects.count()
+    assert seen == sorted(seen)
+
+
 def test_anonymous_client_has_no_form(client, detail_url):
     response = client.get(detail_url)
     assert 'form' not in response.context
@@ -51,3 +171,163 @@ def test_author_has_form_for_comment(author_client, detail_url):
     response = author_client.get(detail_url)
     assert 'form' in response.context
     assert isinstance(response.context['form'], CommentForm)
+
+
+def test_search_finds_word_forms_with_highlight(client, author):
+    """Поиск находит разные формы слова и подсвечивает их."""
+    news = News.objects.create(
+        title='Ёлки в городе', text='На площади поставили <b>ёлку</b>.'
+    )
+    News.objects.create(title='Другое', text='Про погоду')
+    Comment.objects.create(
+        news=news, author=author, text='Ёлка красивая',
+        status=Comment.Status.APPROVED,
+    )
+    Comment.objects.create(news=news, author=author, text='Ёлка на модерации')
+    response = client.get(reverse('news:search'), {'q': 'ёлкой'})
+    assert [item.pk for item in response.context['news_results']] == [
+        news.pk
+    ]
+    comments = response.context['comment_results']
+    assert [comment.text for comment in comments] == ['Ёлка красивая']
+    assert '<mark>Елки</mark>' in response.content.decode()
+    response = client.get(reverse('news:search'), {'q': 'площадь'})
+    assert '&lt;b&gt;' in response.content.decode()
+
+
+def test_search_index_follows_updates_and_rebuild(client, news_one):
+    """Индекс следует за правками и перестраивается командой."""
+    url = reverse('news:search')
+    News.objects.filter(pk=news_one.pk).update(text='Сенсационный репортаж')
+    assert client.get(url, {'q': 'репортаж'}).context['news_results']
+    with connection.cursor() as cursor:
+        cursor.execute('DELETE FROM news_news_fts')
+    assert not client.get(url, {'q': 'репортаж'}).context['news_results']
+    call_command('rebuild_search_index')
+    assert client.get(url, {'q': 'репортаж'}).context['news_results']
+
+
+def test_search_without_index_looks_in_text(client, monkeypatch, news_one):
+    """Без полнотекстового индекса поиск идёт по заголовку и тексту."""
+    monkeypatch.setattr('news.search.uses_fts', lambda model: False)
+    News.objects.filter(pk=news_one.pk).update(text='Сенсационный репортаж')
+    response = client.get(reverse('news:search'), {'q': 'репортаж'})
+    assert [item.pk for item in response.context['news_results']] == [
+        news_one.pk
+    ]
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.usefixtures('comment')
+def test_async_views_render_same_pages(client, home_url, detail_url, news_one):
+    """Запросы к базе идут из пула потоков, поэтому данные закоммичены."""
+    factory = AsyncRequestFactory()
+
+    async def render(view, url, **kwargs):
+        request = factory.get(url)
+        request.user = AnonymousUser()
+        handler = view.as_view()
+        assert asyncio.iscoroutinefunction(handler)
+        return await handler(request, **kwargs)
+
+    for view, url, kwargs in (
+        (AsyncNewsList, home_url, {}),
+        (AsyncNewsDetailView, detail_url, {'pk': news_one.pk}),
+    ):
+        response = asyncio.run(render(view, url, **kwargs))
+        assert response.status_code == 200
+        cache.clear()
+        assert response.content == client.get(url).content
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.usefixtures('async_views')
+def test_async_views_serve_requests_concurrently(
+    home_url, monkeypatch, settings
+):
+    """
+    Одновременные запросы к замедленной главной выполняются параллельно.
+
+    Синхронная middleware в цепочке ASGI увела бы их в один поток,
+    и они шли бы по очереди.
+    """
+    settings.NEWS_PAGE_CACHE_TIMEOUT = 0
+    get_queryset = NewsList.get_queryset
+    lock = threading.Lock()
+    running = []
+    overlaps = []
+
+    def slow_get_queryset(view):
+        with lock:
+            running.append(view)
+            overlaps.append(len(running))
+        time.sleep(SLOW_VIEW_DELAY)
+        with lock:
+            running.remove(view)
+        return get_queryset(view)
+
+    monkeypatch.setattr(NewsList, 'get_queryset', slow_get_queryset)
+
+    async def fetch_all():
+        client = AsyncClient()
+        return await asyncio.gather(
+            *(client.get(home_url) for _ in range(CONCURRENT_REQUESTS))
+        )
+
+    responses = asyncio.run(fetch_all())
+    assert [response.status_code for response in responses] == [
+        200
+    ] * CONCURRENT_REQUESTS
+    assert max(overlaps) == CONCURRENT_REQUESTS
+
+
+@pytest.mark.usefixtures('news_multiple', 'comment_multiple')
+def test_export_streams_news_with_comments(admin_client, news_one):
+    url = reverse('news:export')
+    response = admin_client.get(url)
+    assert response.streaming
+    assert 'news.jsonl' in response['Content-Disposition']
+    rows = [
+        json.loads(line)
+        for line in b''.join(response.streaming_content).splitlines()
+    ]
+    assert [row['id'] for row in rows] == sorted(
+        News.objects.values_list('pk', flat=True)
+    )
+    exported = {row['id']: row['comments'] for row in rows}
+    assert [comment['text'] for comment in exported[news_one.pk]] == list(
+        news_one.comment_set.order_by('created').values_list(
+            'text', flat=True
+        )
+    )
+    assert sum(map(len, exported.values())) == 10
+
+    response = admin_client.get(url, {'format': 'csv', 'gzip': '1'})
+    assert response['Content-Type'] == 'application/gzip'
+    text = gzip.decompress(b''.join(response.streaming_content)).decode()
+    csv_rows = list(csv.DictReader(io.StringIO(text)))
+    # Новость без комментариев занимает одну строку с пустым комментарием.
+    assert len(csv_rows) == len(rows) - 1 + 10
+    assert {row['comment_author'] for row in csv_rows} == {'Автор', ''}
+
+    response = admin_client.get(url, {'format': 'csv', 'gzip': '0'})
+    assert response['Content-Type'].startswith('text/csv')
+
+
+@pytest.mark.parametrize('news_count', (1, 30))
+def test_export_queries_do_not_depend_on_size(
+    django_assert_num_queries, author, news_count
+):
+    News.objects.bulk_create(
+        News(title=f'Новость {index}', text='Текст')
+        for index in range(news_count)
+    )
+    Comment.objects.bulk_create(
+        Comment(news=news, author=author, text='Текст')
+        for news in News.objects.all()
+    )
+    export = NewsExport(News.objects.all(), chunk_size=10)
+    with django_assert_num_queries(2):
+        data = b''.join(export)
+    assert data.count(b'\n') == export.news_count == news_count
+    assert export.comments_count == news_count
@@ -0,0 +1,87 @@
+# В файле test_loadtest.py:
+# + Нагрузочный прогон по смеси проходит все маршруты без ошибок
+# и убирает за собой своих пользователей, сессии и комментарии,
+# не трогая уже заведённого пользователя loadtest_0.
+# + Повтор журнала JSONL группирует запросы по представлениям
+# и считает ответы 4xx ошибками.
+# + Некорректная смесь и журнал дают понятную ошибку команды.
+# + Отрицательное число запросов и нулевое число клиентов
+# отклоняются при разборе аргументов.
+
+import json
+from io import StringIO
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.models import Session
+from django.core.management import CommandError, call_command
+
+from news.loadtest import parse_mix
+from news.models import Comment
+
+pytestmark = pytest.mark.django_db(transaction=True)
+
+
+def loadtest(**options):
+    output = StringIO()
+    call_command('loadtest', stdout=output, **options)
+    return {
+        line.split()[0]: line.split()
+        for line in output.getvalue().splitlines()[1:-1]
+    }
+
+
+def test_mix_covers_routes_and_cleans_up(news_one):
+    existing = get_user_model().objects.create(username='loadtest_0')
+    Comment.objects.create(news=news_one, author=existing, text='Свой')
+    comments_before = Comment.objects.count()
+    # Один клиент: SQLite в памяти не любит одновременных писателей.
+    report = loadtest(
+        requests=40, workers=1, mix=parse_mix(
+            'home=1,detail=1,comment=1,edit=1,delete=1'
+        ),
+    )
+    assert set(report) == {'home', 'detail', 'comment', 'edit', 'delete'}
+    assert sum(int(row[1]) for row in report.values()) == 40
+    assert all(row[-1] == '0.0%' for row in report.values())
+    assert list(
+        get_user_model().objects.filter(username__startswith='loadtest_')
+    ) == [existing]
+    assert not Session.objects.exists()
+    assert Comment.objects.count() == comments_before
+
+
+def test_replay_groups_by_view(tmp_path, news_one):
+    log = tmp_path / 'requests.jsonl'
+    log.write_text('\n'.join(json.dumps(record) for record in (
+        {'path': '/'},
+        {'path': f'/news/{news_one.pk}/'},
+        {'path': '/news/0/'},
+        {'path': f'/news/{news_one.pk}/', 'method': 'POST', 'auth': True,
+         'data': {'text': 'Из журнала'}, 'route': 'comment'},
+    )))
+    report = loadtest(replay=str(log), workers=2)
+    assert report['news:home'][1] == '1'
+    assert report['news:detail'][1] == '2'
+    assert report['news:detail'][-1] == '50.0%'
+    assert report['comment'][-1] == '0.0%'
+
+
+def test_invalid_input(tmp_path):
+    with pytest.raises(ValueError):
+        parse_mix('home=1,unknown=2')
+    with pytest.raises(CommandError):
+        loadtest(requests=1)
+    log = tmp_path / 'broken.jsonl'
+    log.write_text('{"method": "GET"}')
+    with pytest.raises(CommandError):
+        loadtest(replay=str(log))
+
+
+@pytest.mark.parametrize('args', (
+    ('--requests', '-1'),
+    ('--workers', '0'),
+))
+def test_rejects_invalid_sizes(args):
+    with pytest.raises(CommandError, match='invalid'):
+        call_command('loadtest', *args)
@@ -5,18 +5,45 @@
 # + он не будет опубликован, а форма вернёт ошибку.
 # Авторизованный пользователь может редактировать или удалять свои комментарии.
 # Авторизованный пользователь не может редактировать или удалять чужие комментарии.
+# + Счётчик комментариев у новости меняется вместе с комментариями.
+# + Команды не принимают нулевые и отрицательные размеры пачек.
+# + Запрещённые слова ловятся в разных формах и с подменой букв.
+# + Список запрещённых слов правится в базе и подхватывается без рестарта.
+# + Новый комментарий ждёт фоновой модерации и виден до неё только автору.
+# + Закэшированный блок комментария сбрасывается при правке и удалении,
+# в том числе в обход представлений.
+# + Страницы для анонимов кэшируются и сбрасываются при новых комментариях,
+# а ключ страницы учитывает только параметры, которые читает страница.
+# + Импорт новостей читает JSON и JSONL, пропускает ошибки и дубли.
+# + Синтетические данные воспроизводятся по seed, счётчики и поиск
+# + согласованы с комментариями, а повторная загрузка того же seed запрещена.
 
+import json
+from datetime import date
 from http import HTTPStatus
 
+import pytest
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import CommandError, call_command
+from django.urls import reverse
+from django.views import View
 from pytest_django.asserts import assertFormError, assertRedirects
 
-from news.forms import BAD_WORDS, WARNING
-from news.models import Comment
+from news.cache import comment_fragment_key
+from news.forms import BAD_WORDS, WARNING, CommentForm
+from news.models import BadWord, Comment, News
+from news.search import search_comments
+from news.views import AnonymousPageCacheMixin
 
 NEW_COMMENT_TEXT = 'Совсем новый текст комментария'
 form_data = {'text': 'Новый текст комментария'}
 
 
+def moderate():
+    call_command('moderate_comments', once=True, executor='thread')
+
+
 def test_anonymous_cant_create_comment(client, detail_url):
     """Анонимный пользователь не может отправить комментарий."""
     comments_count_before = Comment.objects.count()
@@ -52,6 +79,37 @@ def test_user_cant_use_bad_words(author_client, detail_url):
     )
 
 
+@pytest.mark.parametrize(
+    'text',
+    (
+        'Ну ты и НЕГОДЯЙ!',
+        'Какой же он негодяем оказался',
+        'Опять эти редиски',
+        'Слово с подменой: peдиcка',
+    ),
+)
+def test_bad_words_forms_and_lookalikes_are_rejected(
+        author_client, detail_url, text):
+    """Запрещённые слова ловятся в любой форме и с латинскими буквами."""
+    response = author_client.post(detail_url, data={'text': text})
+    assertFormError(response, form='form', field='text', errors=WARNING)
+    assert not Comment.objects.exists()
+
+
+def test_new_bad_word_is_picked_up_without_restart(
+        settings, django_capture_on_commit_callbacks,
+        django_assert_num_queries):
+    """Новое слово из админки сразу работает, а список не перечитывается."""
+    settings.BAD_WORDS_CHECK_INTERVAL = 60
+    text = {'text': 'Совсем распоясался, злыдень'}
+    assert CommentForm(data=text).is_valid()
+    with django_assert_num_queries(0):
+        assert CommentForm(data=text).is_valid()
+    with django_capture_on_commit_callbacks(execute=True):
+        BadWord.objects.create(word='злыдень')
+    assert not CommentForm(data=text).is_valid()
+
+
 def test_author_can_edit_comment(comment,
                                  author, author_client, edit_url, detail_url):
     """Проверим, что редактировать комментарии может только их автор."""
@@ -90,3 +148,241 @@ def test_not_author_cant_delete_comment_of_author_user(not_author_client,
     assert response.status_code == HTTPStatus.NOT_FOUND
     comments_count = Comment.objects.count()
     assert comments_count == comments_count_before
+
+
+def test_comment_count_follows_create_and_delete(
+        author, author_client, detail_url, news_one):
+    """Публикация и удаление комментария меняют счётчик новости."""
+    author_client.post(detail_url, data=form_data)
+    news_one.refresh_from_db()
+    assert news_one.comment_count == 0
+    moderate()
+    news_one.refresh_from_db()
+    assert news_one.comment_count == 1
+    comment = Comment.objects.get()
+    author_client.delete(reverse('news:delete', args=(comment.pk,)))
+    news_one.refresh_from_db()
+    assert news_one.comment_count == 0
+
+
+def test_not_author_delete_keeps_comment_count(
+        not_author_client, delete_url, news_one):
+    """Неудачная попытка удаления не трогает счётчик."""
+    not_author_client.delete(delete_url)
+    news_one.refresh_from_db()
+    assert news_one.comment_count == 1
+
+
+def test_recount_comments_repairs_counters(comment, news_one):
+    """Команда recount_comments чинит разошедшиеся счётчики."""
+    News.objects.filter(pk=news_one.pk).update(comment_count=42)
+    call_command('recount_comments', batch_size=1)
+    news_one.refresh_from_db()
+    assert news_one.comment_count == 1
+
+
+@pytest.mark.parametrize('args', (
+    ('recount_comments', '--batch-size', '0'),
+    ('recount_comments', '--batch-size', '-1'),
+    ('moderate_comments', '--once', '--batch-size', '0'),
+    ('moderate_comments', '--once', '--workers', '0'),
+    ('import_news', 'feed.jsonl', '--batch-size', '0'),
+))
+def test_commands_reject_non_positive_sizes(args):
+    with pytest.raises(CommandError, match='invalid positive value'):
+        call_command(*args)
+
+
+def test_comment_fragment_is_shared_and_invalidated_on_edit(
+        comment, client, author_client, detail_url, edit_url,
+        django_capture_on_commit_callbacks):
+    """Блок комментария общий для всех и обновляется после правки."""
+    client.get(detail_url)
+    assert cache.get(comment_fragment_key(comment.pk)) is not None
+    response = author_client.get(detail_url)
+    assert edit_url in response.content.decode()
+    with django_capture_on_commit_callbacks(execute=True):
+        author_client.post(edit_url, data={'text': NEW_COMMENT_TEXT})
+    assert cache.get(comment_fragment_key(comment.pk)) is None
+    with django_capture_on_commit_callbacks(execute=True):
+        moderate()
+    response = client.get(detail_url)
+    content = response.content.decode()
+    assert NEW_COMMENT_TEXT in content
+    assert edit_url not in content
+
+
+def test_comment_fragment_is_invalidated_on_delete(
+        comment, client, author_client, detail_url, delete_url,
+        django_capture_on_commit_callbacks):
+    """Удаление комментария убирает его блок из кэша."""
+    client.get(detail_url)
+    with django_capture_on_commit_callbacks(execute=True):
+        author_client.delete(delete_url)
+    assert cache.get(comment_fragment_key(comment.pk)) is None
+
+
+def test_comment_fragment_is_invalidated_on_any_save(
+        comment, client, detail_url, django_capture_on_commit_callbacks):
+    """Правка в обход представлений, например в админке, тоже видна."""
+    client.get(detail_url)
+    comment.text = NEW_COMMENT_TEXT
+    with django_capture_on_commit_callbacks(execute=True):
+        comment.save()
+    assert NEW_COMMENT_TEXT in client.get(detail_url).content.decode()
+
+
+def test_anonymous_pages_are_cached_and_purged(
+        author_client, client, detail_url, home_url,
+        django_capture_on_commit_callbacks):
+    """Анонимы получают страницы из кэша, пока комментарии не изменятся."""
+    for url in (home_url, detail_url):
+        assert client.get(url)['X-Page-Cache'] == 'MISS'
+        assert client.get(url)['X-Page-Cache'] == 'HIT'
+    assert 'X-Page-Cache' not in author_client.get(detail_url)
+    with django_capture_on_commit_callbacks(execute=True):
+        author_client.post(detail_url, data=form_data)
+        moderate()
+    for url in (home_url, detail_url):
+        response = client.get(url)
+        assert response['X-Page-Cache'] == 'MISS'
+    assert form_data['text'] in response.content.decode()
+
+
+def test_page_cache_key_ignores_unknown_parameters(client, detail_url):
+    """Лишние GET-параметры не заводят новых страниц в кэше."""
+    assert client.get(detail_url)['X-Page-Cache'] == 'MISS'
+    for number in range(3):
+        response = client.get(detail_url, {'x': number})
+        assert response['X-Page-Cache'] == 'HIT'
+    response = client.get(detail_url, {'cursor': 'abc', 'x': 1})
+    assert response['X-Page-Cache'] == 'MISS'
+
+
+def test_page_cache_scope_is_required(rf):
+    """Представление без группы страниц кэша настроено неверно."""
+    view = type('View', (AnonymousPageCacheMixin, View), {})
+    with pytest.raises(ImproperlyConfigured):
+        view.as_view()(rf.get('/'))
+
+
+def test_pending_comment_is_visible_only_to_author(
+        author_client, not_author_client, client, detail_url):
+    """До модерации комментарий видит только его автор."""
+    author_client.post(detail_url, data=form_data)
+    assert Comment.objects.get().status == Comment.Status.PENDING
+    response = author_client.get(detail_url)
+    assert form_data['text'] in response.content.decode()
+    assert 'На модерации' in response.content.decode()
+    for other_client in (not_author_client, client):
+        response = other_client.get(detail_url)
+        assert form_data['text'] not in response.content.decode()
+
+
+@pytest.mark.parametrize('executor', ('thread', 'process'))
+def test_moderation_worker_approves_and_rejects(
+        author, news_one, executor):
+    """Воркер публикует обычные комментарии и отклоняет спам."""
+    texts = {
+        'Спасибо за новость!': Comment.Status.APPROVED,
+        'Скидки www.a.ru www.b.ru www.c.ru': Comment.Status.REJECTED,
+        'ПОКУПАЙТЕ СЛОНОВ ПРЯМО СЕЙЧАС': Comment.Status.REJECTED,
+        'Урааааааааааааааа': Comment.Status.REJECTED,
+    }
+    for text in texts:
+        Comment.objects.create(news=news_one, author=author, text=text)
+    call_command(
+        'moderate_comments', once=True, executor=executor, batch_size=3
+    )
+    for text, status in texts.items():
+        assert Comment.objects.get(text=text).status == status
+    news_one.refresh_from_db()
+    assert news_one.comment_count == 1
+
+
+def test_edited_comment_goes_back_to_moderation(
+        comment, author_client, edit_url, news_one):
+    """Правка опубликованного комментария снимает его с публикации."""
+    author_client.post(edit_url, data={'text': NEW_COMMENT_TEXT})
+    comment.refresh_from_db()
+    news_one.refresh_from_db()
+    assert comment.status == Comment.Status.PENDING
+    assert news_one.comment_count == 0
+    moderate()
+    news_one.refresh_from_db()
+    assert news_one.comment_count == 1
+
+
+def test_news_fixture_loads():
+    """Фикстура из README по-прежнему загружается."""
+    call_command('loaddata', 'news.json', verbosity=0)
+    assert News.objects.filter(modified__isnull=False).count() == 19
+
+
+def test_import_news_reads_fixture_and_skips_duplicates(settings):
+    """Фикстура загружается импортом, а повторный импорт не дублирует."""
+    path = settings.BASE_DIR / 'news' / 'fixtures' / 'news.json'
+    call_command('import_news', str(path), batch_size=7, verbosity=0)
+    assert News.objects.count() == 19
+    call_command('import_news', str(path), verbosity=0)
+    assert News.objects.count() == 19
+
+
+def test_import_news_validates_jsonl(tmp_path, news_one):
+    rows = [
+        {'title': 'Из ленты', 'text': 'Текст', 'date': '2023-01-02'},
+        {'title': 'Из ленты', 'text': 'Повтор', 'date': '2023-01-02'},
+        {'title': 'Из ленты', 'text': 'Другой день', 'date': '2023-01-03'},
+        {'title': news_one.title, 'text': 'Уже есть',
+         'date': news_one.date.isoformat()},
+        {'title': 'З' * 51, 'text': 'Длинный заголовок'},
+        {'title': 'Без текста'},
+        {'title': 'Плохая дата', 'text': 'Текст', 'date': '2023-13-01'},
+        ['не', 'объект'],
+    ]
+    path = tmp_path / 'feed.jsonl'
+    path.write_text(
+        '\n'.join(json.dumps(row, ensure_ascii=False) for row in rows),
+        encoding='utf-8',
+    )
+    call_command('import_news', str(path), batch_size=2, verbosity=0)
+    imported = News.objects.exclude(pk=news_one.pk)
+    assert sorted(imported.values_list('date', 'text')) == [
+        (date(2023, 1, 2), 'Текст'),
+        (date(2023, 1, 3), 'Другой день'),
+    ]
+
+
+def seed(seed_value=0):
+    call_command(
+        'seed_news', users=3, news=5, comments=60, seed=seed_value,
+        until=date(2026, 1, 31), batch_size=7, verbosity=0,
+    )
+    return (
+        list(News.objects.order_by('pk').values_list('title', 'text', 'date')),
+        list(Comment.objects.order_by('pk').values_list(
+            'news__title', 'author__username', 'text', 'created', 'status'
+        )),
+    )
+
+
+def test_seed_news_is_deterministic(django_user_model):
+    data = seed()
+    assert len(data[0]) == 5
+    assert len(data[1]) == 60
+    assert all(news_date <= date(2026, 1, 31) for _, _, news_date in data[0])
+    with pytest.raises(CommandError):
+        seed()
+    Comment.objects.all().delete()
+    News.objects.all().delete()
+    django_user_model.objects.all().delete()
+    assert seed() == data
+
+
+def test_seeded_comments_are_counted_and_searchable():
+    seed()
+    for news in News.objects.with_actual_comment_count():
+        assert news.comment_count == news.actual_comment_count
+    approved = Comment.objects.filter(status=Comment.Status.APPROVED)
+    word = approved.first().text.split()[-1].strip('.')
+    assert search_comments(word, limit=100)
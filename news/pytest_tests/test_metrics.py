@@ -0,0 +1,115 @@
+# В файле test_metrics.py:
+# + /metrics отдаёт число запросов, время ответа и число SQL
+# по именам представлений.
+# + SQL асинхронных представлений тоже попадает в метрики.
+# + Считаются отправленные комментарии и обращения к кэшу страниц.
+# + /metrics отвечает только адресам из METRICS_ALLOWED_IPS.
+# + Метрики воркеров складываются через общий каталог, а значения,
+# унаследованные при fork, не учитываются дважды.
+# + Файл нового процесса с тем же pid не затирает файл завершившегося.
+
+import asyncio
+import multiprocessing
+
+import pytest
+from django.test import AsyncClient
+from django.urls import reverse
+
+from news.metrics import COMMENTS_CREATED, registry
+
+
+@pytest.fixture(autouse=True)
+def clean_registry(settings):
+    settings.METRICS_DIR = None
+    registry.clear()
+    yield
+    registry.clear()
+
+
+def get_metrics(client):
+    response = client.get(reverse('news:metrics'))
+    assert response['Content-Type'].startswith('text/plain; version=0.0.4')
+    return response.content.decode()
+
+
+def test_requests_are_counted_by_view(client, home_url, detail_url):
+    client.get(home_url)
+    client.get(detail_url)
+    client.get(detail_url)
+    metrics = get_metrics(client)
+    assert (
+        'news_http_requests_total{view="news:detail",method="GET",'
+        'status="200"} 2'
+    ) in metrics
+    assert (
+        'news_http_request_duration_seconds_count{view="news:home"} 1'
+    ) in metrics
+    # Валидаторы ETag и новости: не больше двух SQL на главную.
+    assert (
+        'news_http_request_db_queries_bucket{view="news:home",le="2"} 1'
+    ) in metrics
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.usefixtures('async_views')
+def test_async_view_queries_are_counted(client, home_url):
+    response = asyncio.run(AsyncClient().get(home_url))
+    assert response.status_code == 200
+    metrics = get_metrics(client)
+    assert (
+        'news_http_request_db_queries_count{view="news:home"} 1'
+    ) in metrics
+    # SQL из пула потоков тоже посчитан.
+    assert (
+        'news_http_request_db_queries_bucket{view="news:home",le="0"} 0'
+    ) in metrics
+
+
+def test_comments_and_page_cache_are_counted(
+    client, author_client, home_url, detail_url
+):
+    author_client.post(detail_url, data={'text': 'Новый комментарий'})
+    client.get(home_url)
+    client.get(home_url)
+    metrics = get_metrics(client)
+    assert 'news_comments_created_total 1' in metrics
+    assert 'news_page_cache_requests_total{result="miss"} 1' in metrics
+    assert 'news_page_cache_requests_total{result="hit"} 1' in metrics
+
+
+def test_metrics_are_hidden_from_other_addresses(client, settings):
+    url = reverse('news:metrics')
+    assert client.get(url, REMOTE_ADDR='203.0.113.5').status_code == 404
+    settings.METRICS_ALLOWED_IPS = ['203.0.113.5']
+    assert client.get(url, REMOTE_ADDR='203.0.113.5').status_code == 200
+
+
+def count_comment_in_child():
+    COMMENTS_CREATED.inc()
+    registry.flush()
+
+
+def test_workers_share_metrics_through_directory(client, settings, tmp_path):
+    settings.METRICS_DIR = str(tmp_path)
+    COMMENTS_CREATED.inc(5)
+    context = multiprocessing.get_context('fork')
+    for _ in range(2):
+        worker = context.Process(target=count_comment_in_child)
+        worker.start()
+        worker.join()
+        assert worker.exitcode == 0
+    assert len(list(tmp_path.glob('metrics-*.json'))) >= 2
+    # 5 своих и по одному от каждого воркера, без унаследованных пяти.
+    assert 'news_comments_created_total 7' in get_metrics(client)
+
+
+def test_reused_pid_keeps_dead_worker_file(client, settings, tmp_path):
+    settings.METRICS_DIR = str(tmp_path)
+    COMMENTS_CREATED.inc(2)
+    registry.flush()
+    # Новый процесс с тем же pid, например воркер после перезапуска.
+    registry._reset()
+    COMMENTS_CREATED.inc()
+    registry.flush()
+    assert len(list(tmp_path.glob('metrics-*.json'))) == 2
+    assert 'news_comments_created_total 3' in get_metrics(client)
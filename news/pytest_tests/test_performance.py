@@ -0,0 +1,190 @@
+# В файле test_performance.py:
+# + Каждая страница укладывается в бюджет запросов к базе и времени
+# ответа при 10, 10 000 и 1 000 000 комментариев.
+# + Бюджеты одинаковы для всех объёмов: рост числа запросов с объёмом
+# данных означает N+1, рост времени — потерянный индекс.
+# Объём 1 000 000 помечен slow и запускается отдельно: pytest -m slow.
+# Поиск проверяется по редкому слову: слово из каждой записи ранжируется
+# за время, пропорциональное числу совпадений, при любых индексах.
+
+import time
+from datetime import date, timedelta
+from http import HTTPStatus
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test.client import Client
+from django.urls import reverse
+from django.utils import timezone
+
+from news.models import Comment, News
+from news.search import rebuild_index
+
+BATCH_SIZE = 10000
+# Новостей больше, чем помещается на главную, но не больше 10 000.
+MIN_NEWS, MAX_NEWS = 20, 10000
+COMMENTS_PER_NEWS = 100
+# Из нескольких замеров берётся лучший: он меньше всего зависит от шума.
+TIMINGS = 3
+
+SCALES = (
+    10,
+    10_000,
+    pytest.param(1_000_000, marks=pytest.mark.slow),
+)
+
+# Страница: (клиент, запросов не больше, миллисекунд не больше).
+BUDGETS = {
+    'home': (('anonymous', 2, 100), ('author', 4, 100)),
+    'archive': (('anonymous', 1, 100),),
+    'search': (('anonymous', 3, 200),),
+    'detail': (('anonymous', 3, 200), ('author', 5, 200)),
+    'edit': (('author', 3, 100),),
+    'delete': (('author', 3, 100),),
+    'login': (('anonymous', 0, 50),),
+    'signup': (('anonymous', 0, 50),),
+}
+
+
+def insert_rows(sql, rows):
+    """Вставляет строки пачками, не создавая объектов моделей."""
+    batch = []
+    with connection.cursor() as cursor:
+        for row in rows:
+            batch.append(row)
+            if len(batch) == BATCH_SIZE:
+                cursor.executemany(sql, batch)
+                batch = []
+        if batch:
+            cursor.executemany(sql, batch)
+
+
+def create_dataset(comments_count):
+    """
+    Новости и опубликованные комментарии к ним.
+
+    Половина комментариев приходится на самую свежую новость: она
+    на главной, и её страница — худший случай для страницы новости.
+    """
+    author = get_user_model().objects.create(username='Нагрузка')
+    news_count = min(
+        MAX_NEWS, max(MIN_NEWS, comments_count // COMMENTS_PER_NEWS)
+    )
+    today = date.today()
+    now = timezone.now()
+    insert_rows(
+        'INSERT INTO news_news (title, text, date, comment_count, modified) '
+        'VALUES (%s, %s, %s, 0, %s)',
+        (
+            (
+                f'Новость {index}' if index else 'Главная новость',
+                'Текст новости',
+                today - timedelta(index),
+                now,
+            )
+            for index in range(news_count)
+        ),
+    )
+    news_ids = list(
+        News.objects.order_by('-date').values_list('pk', flat=True)
+    )
+    hot_news_id = news_ids[0]
+    insert_rows(
+        'INSERT INTO news_comment (news_id, author_id, text, created, status) '
+        'VALUES (%s, %s, %s, %s, %s)',
+        (
+            (
+                hot_news_id if index % 2 else news_ids[index % news_count],
+                author.pk,
+                f'Комментарий {index}',
+                now - timedelta(seconds=index),
+                Comment.Status.APPROVED,
+            )
+            for index in range(comments_count)
+        ),
+    )
+    News.objects.recount_comments()
+    return {
+        'author': author,
+        'news': News.objects.get(pk=hot_news_id),
+        'comment': Comment.objects.filter(news_id=hot_news_id).first(),
+    }
+
+
+def drop_dataset():
+    with connection.cursor() as cursor:
+        # Сессии остаются от force_login клиентов автора.
+        for table in (
+            'news_comment', 'news_news', 'django_session', 'auth_user'
+        ):
+            cursor.execute(f'DELETE FROM {table}')
+    rebuild_index()
+
+
+@pytest.fixture(scope='module', params=SCALES, ids=lambda scale: str(scale))
+def dataset(request, django_db_setup, django_db_blocker):
+    """Данные одного объёма на все проверки модуля: генерация не дешёвая."""
+    with django_db_blocker.unblock():
+        data = create_dataset(request.param)
+        yield data
+        drop_dataset()
+
+
+@pytest.fixture
+def clients(dataset):
+    author = Client()
+    author.force_login(dataset['author'])
+    return {'anonymous': Client(), 'author': author}
+
+
+@pytest.fixture
+def urls(dataset):
+    return {
+        'home': reverse('news:home'),
+        'archive': reverse('news:archive'),
+        'search': reverse('news:search') + '?q=главная',
+        'detail': reverse('news:detail', args=(dataset['news'].pk,)),
+        'edit': reverse('news:edit', args=(dataset['comment'].pk,)),
+        'delete': reverse('news:delete', args=(dataset['comment'].pk,)),
+        'login': reverse('users:login'),
+        'signup': reverse('users:signup'),
+    }
+
+
+@pytest.fixture(autouse=True)
+def no_page_cache(settings):
+    """Замеряется отрисовка страницы, а не отдача её из кэша."""
+    settings.NEWS_PAGE_CACHE_TIMEOUT = 0
+
+
+@pytest.mark.parametrize(
+    'page, client_name, max_queries, max_ms',
+    [
+        (page, *budget)
+        for page, budgets in BUDGETS.items()
+        for budget in budgets
+    ],
+)
+def test_page_budget(
+    django_assert_max_num_queries, clients, urls,
+    page, client_name, max_queries, max_ms,
+):
+    client = clients[client_name]
+    url = urls[page]
+    # Первый запрос прогревает сессию, шаблоны и автомат запрещённых слов.
+    client.get(url)
+    cache.clear()
+    with django_assert_max_num_queries(max_queries):
+        response = client.get(url)
+    assert response.status_code == HTTPStatus.OK
+    timings = []
+    for _ in range(TIMINGS):
+        cache.clear()
+        start = time.perf_counter()
+        client.get(url)
+        timings.append((time.perf_counter() - start) * 1000)
+    assert min(timings) <= max_ms, (
+        f'{page}: {min(timings):.1f} мс при бюджете {max_ms} мс'
+    )
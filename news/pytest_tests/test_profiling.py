@@ -0,0 +1,57 @@
+# В файле test_profiling.py:
+# + Профилирование выключено по умолчанию.
+# + Включённое профилирование отдаёт Server-Timing с временем SQL,
+# шаблона и представления и числом запросов.
+# + Медленные запросы попадают в журнал с самыми долгими SQL,
+# а их профиль cProfile сохраняется в каталог.
+# + Страницы с профилированием по-прежнему кэшируются.
+
+import logging
+import pstats
+
+import pytest
+
+SERVER_TIMING = 'Server-Timing'
+
+
+@pytest.fixture
+def profiling(settings):
+    settings.PROFILING_ENABLED = True
+    return settings
+
+
+def test_profiling_is_off_by_default(client, home_url):
+    assert SERVER_TIMING not in client.get(home_url)
+
+
+@pytest.mark.usefixtures('profiling', 'comment')
+def test_server_timing_header(client, detail_url):
+    header = client.get(detail_url)[SERVER_TIMING]
+    metrics = dict(
+        (part.split(';')[0], part) for part in header.split(', ')
+    )
+    assert set(metrics) == {'total', 'view', 'template', 'sql'}
+    # Валидаторы ETag, новость и страница комментариев.
+    assert 'desc="3 queries"' in metrics['sql']
+
+
+@pytest.mark.usefixtures('news_one')
+def test_slow_request_is_reported(client, home_url, profiling, tmp_path,
+                                  caplog):
+    profiling.PROFILING_SLOW_REQUEST = 0
+    profiling.PROFILING_DUMP_DIR = str(tmp_path)
+    with caplog.at_level(logging.WARNING, logger='yanews.profiling'):
+        client.get(home_url)
+    [record] = caplog.records
+    assert 'Медленный запрос GET /' in record.getMessage()
+    assert 'FROM "news_news"' in record.getMessage()
+    [dump] = tmp_path.glob('*.prof')
+    assert pstats.Stats(str(dump)).total_calls > 0
+
+
+@pytest.mark.usefixtures('profiling', 'news_one')
+def test_profiled_pages_are_cached(client, home_url):
+    assert client.get(home_url)['X-Page-Cache'] == 'MISS'
+    response = client.get(home_url)
+    assert response['X-Page-Cache'] == 'HIT'
+    assert 'desc="0 queries"' in response[SERVER_TIMING]
@@ -0,0 +1,111 @@
+# В файле test_query_plans.py:
+# + Ни один запрос страниц новостей и комментариев не читает таблицу
+# целиком: для каждого SELECT проверяется EXPLAIN QUERY PLAN.
+
+import re
+from contextlib import contextmanager
+
+import pytest
+from django.db import connection
+from django.urls import reverse
+
+from news.models import Comment, News
+from news.pagination import KeysetPaginator
+
+pytestmark = pytest.mark.skipif(
+    connection.vendor != 'sqlite', reason='План запроса в формате SQLite.'
+)
+
+# «SCAN news_news» без «USING INDEX» — чтение всей таблицы.
+# Старые версии SQLite пишут «SCAN TABLE news_news».
+FULL_SCAN_RE = re.compile(r'^SCAN (?:TABLE )?(\w+)(?!.*\b(?:USING|VIRTUAL)\b)')
+# Список запрещённых слов нужен автомату целиком.
+ALLOWED_SCANS = {'news_badword'}
+
+CLIENT = pytest.lazy_fixture('client')
+AUTHOR = pytest.lazy_fixture('author_client')
+
+
+@contextmanager
+def captured_selects():
+    """Собирает SQL и параметры всех SELECT, выполненных внутри блока."""
+    queries = []
+
+    def wrapper(execute, sql, params, many, context):
+        if not many and sql.lstrip().upper().startswith('SELECT'):
+            queries.append((sql, params))
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(wrapper):
+        yield queries
+
+
+def full_scans(queries):
+    scans = []
+    with connection.cursor() as cursor:
+        for sql, params in queries:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            for *_, detail in cursor.fetchall():
+                match = FULL_SCAN_RE.match(detail)
+                if match and match.group(1) not in ALLOWED_SCANS:
+                    scans.append(f'{detail}: {sql}')
+    return scans
+
+
+@pytest.fixture
+def news_with_comments(news_multiple, comment_multiple, news_one, author):
+    Comment.objects.create(news=news_one, author=author, text='Ждёт проверки')
+    return news_one
+
+
+@pytest.fixture
+def archive_next_url():
+    paginator = KeysetPaginator(News.objects.all(), ('-date', '-id'), 1)
+    cursor = paginator.page().next_cursor
+    return f'{reverse("news:archive")}?cursor={cursor}'
+
+
+@pytest.fixture
+def comments_next_url(news_with_comments, detail_url):
+    paginator = KeysetPaginator(
+        news_with_comments.comment_set.all(), ('created', 'id'), 1
+    )
+    return f'{detail_url}?cursor={paginator.page().next_cursor}'
+
+
+@pytest.mark.usefixtures('news_with_comments')
+@pytest.mark.parametrize(
+    'url, parametrized_client',
+    (
+        (pytest.lazy_fixture('home_url'), CLIENT),
+        (pytest.lazy_fixture('home_url'), AUTHOR),
+        ('/archive/', CLIENT),
+        (pytest.lazy_fixture('archive_next_url'), CLIENT),
+        ('/search/?q=новость', CLIENT),
+        (pytest.lazy_fixture('detail_url'), CLIENT),
+        (pytest.lazy_fixture('detail_url'), AUTHOR),
+        (pytest.lazy_fixture('comments_next_url'), AUTHOR),
+        (pytest.lazy_fixture('edit_url'), AUTHOR),
+        (pytest.lazy_fixture('delete_url'), AUTHOR),
+    ),
+)
+def test_get_pages_use_indexes(url, parametrized_client):
+    with captured_selects() as queries:
+        parametrized_client.get(url)
+    assert queries
+    assert full_scans(queries) == []
+
+
+@pytest.mark.usefixtures('news_with_comments')
+def test_comment_changes_use_indexes(author_client, detail_url, edit_url):
+    with captured_selects() as queries:
+        author_client.post(detail_url, data={'text': 'Новый комментарий'})
+        author_client.post(edit_url, data={'text': 'Правка'})
+    assert full_scans(queries) == []
+
+
+def test_full_scan_is_detected(news_one):
+    """Проверка сама ловит запрос без подходящего индекса."""
+    with captured_selects() as queries:
+        list(News.objects.order_by().filter(text__startswith='Просто'))
+    assert len(full_scans(queries)) == 1
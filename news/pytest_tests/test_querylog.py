@@ -0,0 +1,106 @@
+# В файле test_querylog.py:
+# + Отпечаток SQL не зависит от литералов, параметров и длины списков IN.
+# + При заданном QUERY_LOG_DIR запросы страниц складываются по отпечаткам
+# в файл процесса, а без него статистика не собирается.
+# + query_report складывает файлы воркеров, не учитывая дважды
+# унаследованное при fork, и печатает самые дорогие отпечатки
+# с примером параметров.
+
+import multiprocessing
+from io import StringIO
+
+import pytest
+from django.core.management import CommandError, call_command
+
+from yanews.querylog import fingerprint, query_stats, read_stats
+
+FILTER_SQL = 'SELECT "news_news"."id" FROM "news_news" WHERE '
+
+
+@pytest.fixture(autouse=True)
+def clean_stats(settings, tmp_path):
+    settings.QUERY_LOG_DIR = str(tmp_path)
+    settings.QUERY_LOG_FLUSH_INTERVAL = 0
+    query_stats.clear()
+    yield
+    query_stats.clear()
+
+
+@pytest.mark.parametrize('first, second', (
+    (
+        FILTER_SQL + '"news_news"."id" = %s',
+        FILTER_SQL + '"news_news"."id" = 7',
+    ),
+    (FILTER_SQL + "title = 'Новость'", FILTER_SQL + "title = 'It''s'"),
+    (
+        FILTER_SQL + '"news_news"."id" IN (%s, %s, %s)',
+        FILTER_SQL + '"news_news"."id" IN (%s)',
+    ),
+    (
+        'INSERT INTO "news_news" ("title", "text") VALUES (%s, %s), (%s, %s)',
+        'INSERT INTO "news_news" ("title", "text")\n  VALUES (%s, %s)',
+    ),
+))
+def test_fingerprint_strips_literals(first, second):
+    assert fingerprint(first) == fingerprint(second)
+
+
+def test_fingerprint_keeps_shape():
+    assert fingerprint(FILTER_SQL + '"news_news"."id" = 1 LIMIT 21') == (
+        FILTER_SQL + '"news_news"."id" = ? LIMIT ?'
+    )
+    assert fingerprint('SELECT * FROM t1') == 'SELECT * FROM t1'
+
+
+@pytest.mark.usefixtures('comment')
+def test_requests_are_aggregated(author_client, detail_url, news_one,
+                                 tmp_path):
+    for _ in range(3):
+        author_client.get(detail_url)
+    stats = read_stats(tmp_path)
+    # Сессия, пользователь, новость, комментарии: каждый отпечаток
+    # выполнялся по разу за запрос.
+    assert len(stats) >= 4
+    assert {entry[0] for entry in stats.values()} == {3}
+    assert all(entry[1] >= entry[2] > 0 for entry in stats.values())
+    assert f'({news_one.pk},' in ' '.join(
+        entry[3] for entry in stats.values()
+    )
+
+
+def test_disabled_without_directory(client, home_url, settings):
+    settings.QUERY_LOG_DIR = None
+    client.get(home_url)
+    assert not query_stats.queries
+
+
+def run_query_in_child(sql):
+    query_stats.add(sql, [1], False, 0.5)
+    query_stats.flush()
+
+
+def test_report_merges_workers(tmp_path):
+    query_stats.add(FILTER_SQL + 'id = %s', [3], False, 0.25)
+    query_stats.add(FILTER_SQL + 'id = %s', [4], False, 0.75)
+    query_stats.flush()
+    context = multiprocessing.get_context('fork')
+    for sql in (FILTER_SQL + 'id = 5', 'SELECT 1'):
+        worker = context.Process(target=run_query_in_child, args=(sql,))
+        worker.start()
+        worker.join()
+        assert worker.exitcode == 0
+    assert len(list(tmp_path.glob('queries-*.json'))) == 3
+    stdout = StringIO()
+    call_command('query_report', top=1, stdout=stdout)
+    output = stdout.getvalue()
+    # Свои два выполнения и одно из воркера, без унаследованных.
+    assert '  1          3      1500.0  75.0%      500.00      750.0' in output
+    assert FILTER_SQL + 'id = ?' in output
+    assert 'параметры: (4,)' in output
+    assert 'SELECT ?' not in output
+    assert 'Отпечатков: 2, выполнений: 4' in output
+
+
+def test_report_without_stats(tmp_path):
+    with pytest.raises(CommandError):
+        call_command('query_report', dir=str(tmp_path / 'missing'))
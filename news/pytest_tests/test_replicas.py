@@ -0,0 +1,184 @@
+# В файле test_replicas.py:
+# + Без реплик всё читается из основной базы и кука закрепления не ставится.
+# + Запросы на чтение новостей и комментариев идут на реплику,
+# а пользователи и сессии — в основную базу.
+# + Запросы, меняющие данные, и клиенты с кукой закрепления читают
+# из основной базы; вне запроса реплики не используются.
+# + Запись в приложение news ставит куку закрепления на REPLICA_PIN_SECONDS.
+# + С двумя файлами SQLite автор сразу видит свой комментарий, хотя
+# реплика ещё отстаёт, а без куки страница читается с реплики.
+# + После сброса кэша страниц аноним получает и кэширует страницу
+# из основной базы, даже если реплика ещё отстаёт.
+# + Middleware проекта под ASGI асинхронные и не уводят запрос в поток.
+
+import asyncio
+import os
+import subprocess
+import sys
+from http import HTTPStatus
+
+import pytest
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.http import HttpResponse
+from django.test import AsyncRequestFactory, RequestFactory
+from django.utils.module_loading import import_string
+
+from news.models import News
+from yanews.routers import PrimaryReplicaRouter, ReplicaPinMiddleware
+
+REPLICA = 'replica0'
+
+router = PrimaryReplicaRouter()
+
+# Выполняется через manage.py shell на основной базе и одной реплике.
+SCENARIO = '''
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client
+from django.urls import reverse
+
+from news.models import News
+
+author = get_user_model().objects.create(username='Автор')
+news = News.objects.create(title='Новость', text='Текст')
+call_command('sync_replicas', verbosity=0)
+client = Client(HTTP_HOST='localhost')
+client.force_login(author)
+url = reverse('news:detail', args=(news.pk,))
+response = client.post(url, data={'text': 'Свежий комментарий'})
+print('pin' if 'pin_primary' in response.cookies else 'no pin')
+print('pinned' if 'Свежий' in client.get(url).content.decode() else 'stale')
+del client.cookies['pin_primary']
+print('pinned' if 'Свежий' in client.get(url).content.decode() else 'stale')
+'''
+
+# Аноним открывает главную, затем появляется новость, а реплика отстаёт.
+PURGE_SCENARIO = '''
+from django.core.management import call_command
+from django.test import Client
+
+from news.models import News
+
+News.objects.create(title='Старая новость', text='Текст')
+call_command('sync_replicas', verbosity=0)
+client = Client(HTTP_HOST='localhost')
+client.get('/')
+News.objects.create(title='Свежая новость', text='Текст')
+for _ in range(2):
+    response = client.get('/')
+    print(
+        response['X-Page-Cache'],
+        'fresh' if 'Свежая' in response.content.decode() else 'stale',
+    )
+'''
+
+
+@pytest.fixture
+def replicas(settings):
+    settings.READ_REPLICAS = [REPLICA]
+    return settings
+
+
+def route_request(request, model=News):
+    """Прогоняет запрос через middleware и запоминает базу для чтения."""
+    databases = []
+
+    def view(request):
+        databases.append(router.db_for_read(model))
+        return HttpResponse()
+
+    response = ReplicaPinMiddleware(view)(request)
+    return databases[0], response
+
+
+def test_without_replicas_reads_go_to_primary(author_client, detail_url):
+    assert route_request(RequestFactory().get('/'))[0] == 'default'
+    response = author_client.post(detail_url, data={'text': 'Комментарий'})
+    assert response.status_code == HTTPStatus.FOUND
+    assert settings.REPLICA_PIN_COOKIE not in response.cookies
+
+
+@pytest.mark.usefixtures('replicas')
+def test_reads_go_to_replica():
+    assert route_request(RequestFactory().get('/'))[0] == REPLICA
+    assert route_request(
+        RequestFactory().get('/'), get_user_model()
+    )[0] == 'default'
+
+
+@pytest.mark.usefixtures('replicas')
+def test_unsafe_and_pinned_requests_read_primary():
+    factory = RequestFactory()
+    assert route_request(factory.post('/'))[0] == 'default'
+    factory.cookies[settings.REPLICA_PIN_COOKIE] = '1'
+    assert route_request(factory.get('/'))[0] == 'default'
+    assert router.db_for_read(News) == 'default'
+
+
+def test_write_pins_client_to_primary(replicas, author_client, detail_url):
+    # Реплика в тесте — сама основная база под другим именем.
+    replicas.READ_REPLICAS = ['default']
+    response = author_client.post(detail_url, data={'text': 'Комментарий'})
+    pin = response.cookies[settings.REPLICA_PIN_COOKIE]
+    assert pin['max-age'] == settings.REPLICA_PIN_SECONDS
+    assert pin['httponly']
+    response = author_client.get(detail_url)
+    assert settings.REPLICA_PIN_COOKIE not in response.cookies
+
+
+@pytest.mark.parametrize('path', (
+    'yanews.profiling.ProfilingMiddleware',
+    'yanews.querylog.QueryLogMiddleware',
+    'news.metrics.MetricsMiddleware',
+    'yanews.routers.ReplicaPinMiddleware',
+))
+def test_middleware_stays_async_under_asgi(path, replicas, tmp_path):
+    replicas.PROFILING_ENABLED = True
+    replicas.QUERY_LOG_DIR = str(tmp_path)
+
+    async def view(request):
+        return HttpResponse()
+
+    middleware = import_string(path)(view)
+    assert asyncio.iscoroutinefunction(middleware)
+    response = asyncio.run(middleware(AsyncRequestFactory().get('/')))
+    assert response.status_code == HTTPStatus.OK
+    # Синхронный вызов под WSGI работает как прежде.
+    middleware = import_string(path)(lambda request: HttpResponse())
+    assert not asyncio.iscoroutinefunction(middleware)
+    assert middleware(RequestFactory().get('/')).status_code == HTTPStatus.OK
+
+
+def test_read_your_writes_with_sqlite_replica(tmp_path):
+    environment = {
+        'DATABASE_NAME': str(tmp_path / 'primary.sqlite3'),
+        'DATABASE_REPLICAS': str(tmp_path / 'replica.sqlite3'),
+    }
+    for command in (['migrate'], ['shell', '-c', SCENARIO]):
+        result = subprocess.run(
+            [sys.executable, 'manage.py', *command, '-v', '0'],
+            cwd=settings.BASE_DIR,
+            env={**os.environ, **environment},
+            capture_output=True,
+            text=True,
+        )
+        assert result.returncode == 0, result.stderr
+    assert result.stdout.split('\n')[:3] == ['pin', 'pinned', 'stale']
+
+
+def test_purged_pages_are_cached_from_primary(tmp_path):
+    environment = {
+        'DATABASE_NAME': str(tmp_path / 'primary.sqlite3'),
+        'DATABASE_REPLICAS': str(tmp_path / 'replica.sqlite3'),
+    }
+    for command in (['migrate'], ['shell', '-c', PURGE_SCENARIO]):
+        result = subprocess.run(
+            [sys.executable, 'manage.py', *command, '-v', '0'],
+            cwd=settings.BASE_DIR,
+            env={**os.environ, **environment},
+            capture_output=True,
+            text=True,
+        )
+        assert result.returncode == 0, result.stderr
+    assert result.stdout.split('\n')[:2] == ['MISS fresh', 'HIT fresh']
@@ -7,13 +7,20 @@
 # + Авторизованный пользователь не может зайти на страницы редактирования
 # + или удаления чужих комментариев (возвращается ошибка 404).
 # + Страницы регистрации пользователей, входа в учётную запись и выхода из неё доступны анонимным пользователям.
+# + Выгрузка новостей доступна только сотрудникам.
+# + Свой комментарий на модерации, его удаление и отклонение меняют ETag
+# страницы новости у автора.
 
 from http import HTTPStatus
 
 import pytest
 from pytest_django.asserts import assertRedirects
+from django.core.cache import cache
+from django.core.management import call_command
 from django.urls import reverse
 
+from news.models import Comment
+
 CLIENT = pytest.lazy_fixture('client')
 AUTHOR = pytest.lazy_fixture('author_client')
 NOT_AUTHOR = pytest.lazy_fixture('not_author_client')
@@ -66,6 +73,65 @@ def test_home_availability_for_anonymous_user(client, home_url):
     assert response.status_code == HTTPStatus.OK
 
 
+def test_archive_availability_for_anonymous_user(client, news_one):
+    """Архив новостей доступен анонимному пользователю."""
+    response = client.get(reverse('news:archive'))
+    assert response.status_code == HTTPStatus.OK
+
+
+def test_archive_with_broken_cursor_is_not_found(client):
+    """Испорченный курсор архива даёт 404, а не ошибку сервера."""
+    response = client.get(reverse('news:archive'), {'cursor': 'не курсор'})
+    assert response.status_code == HTTPStatus.NOT_FOUND
+
+
+@pytest.mark.parametrize('use_page_cache', (False, True))
+@pytest.mark.parametrize('reverse_url', (HOME_URL, DETAIL_URL))
+def test_unchanged_page_is_not_modified(
+        client, reverse_url, use_page_cache,
+        django_assert_max_num_queries):
+    """Неизменившаяся страница отдаёт 304 не больше чем за один запрос."""
+    etag = client.get(reverse_url)['ETag']
+    if not use_page_cache:
+        cache.clear()
+    with django_assert_max_num_queries(1):
+        response = client.get(reverse_url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+
+
+def test_news_page_etag_changes_with_new_comment(
+        author_client, client, detail_url, django_capture_on_commit_callbacks):
+    """Опубликованный комментарий меняет ETag страницы новости."""
+    etag = client.get(detail_url)['ETag']
+    with django_capture_on_commit_callbacks(execute=True):
+        author_client.post(detail_url, data={'text': 'Новый комментарий'})
+        call_command('moderate_comments', once=True, executor='thread')
+    response = client.get(detail_url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == HTTPStatus.OK
+    assert response['ETag'] != etag
+
+
+@pytest.mark.parametrize('change', ('post', 'delete', 'reject'))
+def test_author_page_etag_follows_pending_comments(
+        author_client, detail_url, change):
+    """Свой комментарий на модерации меняет ETag страницы у автора."""
+    text = 'Мой комментарий www.a.ru www.b.ru www.c.ru'
+    if change != 'post':
+        author_client.post(detail_url, data={'text': text})
+    etag = author_client.get(detail_url)['ETag']
+    if change == 'post':
+        author_client.post(detail_url, data={'text': text})
+    elif change == 'delete':
+        author_client.post(
+            reverse('news:delete', args=(Comment.objects.get().pk,))
+        )
+    else:
+        call_command('moderate_comments', once=True, executor='thread')
+    response = author_client.get(detail_url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == HTTPStatus.OK
+    assert (text in response.content.decode()) == (change == 'post')
+
+
 def test_news_pages_availability_for_anonymous_user(client, detail_url):
     """Страница отдельной новости доступна анонимному пользователю."""
     response = client.get(detail_url)
@@ -116,3 +182,15 @@ def test_edit_delete_for_not_author_user(not_author_client, comment, page):
     url = reverse(page, args=(comment.pk,))
     response = not_author_client.get(url)
     assert response.status_code == HTTPStatus.NOT_FOUND
+
+
+def test_export_is_for_staff_only(
+    client, author_client, admin_client, user_login_url
+):
+    """Аноним отправляется на вход, обычный пользователь получает 403."""
+    url = reverse('news:export')
+    assertRedirects(client.get(url), f'{user_login_url}?next={url}')
+    assert author_client.get(url).status_code == HTTPStatus.FORBIDDEN
+    assert admin_client.get(url).status_code == HTTPStatus.OK
+    response = admin_client.get(url, {'format': 'xml'})
+    assert response.status_code == HTTPStatus.NOT_FOUND
@@ -0,0 +1,42 @@
+# В файле test_sqlite.py:
+# + Новое соединение SQLite получает прагмы из SQLITE_PRAGMAS,
+# и они не попадают в подсчёт SQL-запросов.
+# + Профиль production включает WAL и держит соединения открытыми.
+
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+
+
+def test_new_connection_gets_pragmas(settings):
+    settings.SQLITE_PRAGMAS = {'busy_timeout': 1234, 'cache_size': -2048}
+    connection = connections.create_connection('default')
+    try:
+        with CaptureQueriesContext(connection) as queries:
+            with connection.cursor() as cursor:
+                cursor.execute('PRAGMA busy_timeout')
+                assert cursor.fetchone() == (1234,)
+                cursor.execute('PRAGMA cache_size')
+                assert cursor.fetchone() == (-2048,)
+        assert len(queries) == 2
+    finally:
+        connection.close()
+
+
+def test_production_profile_enables_wal(settings, tmp_path):
+    profile = settings.SQLITE_PROFILES['production']
+    settings.SQLITE_PRAGMAS = profile['PRAGMAS']
+    wrapper = connections['default']
+    connection = type(wrapper)(
+        {**wrapper.settings_dict, 'NAME': str(tmp_path / 'wal.sqlite3')},
+        'file',
+    )
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            assert cursor.fetchone() == ('wal',)
+            cursor.execute('PRAGMA synchronous')
+            # 1 — NORMAL.
+            assert cursor.fetchone() == (1,)
+    finally:
+        connection.close()
+    assert profile['CONN_MAX_AGE'] > 0
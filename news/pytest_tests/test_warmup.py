@@ -0,0 +1,101 @@
+# В файле test_warmup.py:
+# + Прогрев компилирует все шаблоны каталога templates/ в кэш
+# кэширующего загрузчика.
+# + Настройки yanews.settings_production выключают DEBUG, кэшируют
+# шаблоны и прогревают воркер при загрузке yanews.wsgi: соединение
+# с базой открыто до первого запроса, а первый запрос не импортирует
+# ленивые модули.
+# + Без SECRET_KEY в окружении настройки production не загружаются,
+# а кэш у них общий для воркеров.
+
+import importlib
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.template import engines
+
+from yanews.warmup import template_names, warm_up
+
+PRODUCTION_SETTINGS = 'yanews.settings_production'
+
+SCENARIO = '''
+import json
+import sys
+
+from django.conf import settings
+from django.db import connection
+from django.test import Client
+
+from yanews.wsgi import application
+
+before = set(sys.modules)
+connected = connection.connection is not None
+response = Client(HTTP_HOST='localhost').get('/')
+print(json.dumps({
+    'debug': settings.DEBUG,
+    'conn_max_age': connection.settings_dict['CONN_MAX_AGE'],
+    'connected': connected,
+    'status': response.status_code,
+    'imported': sorted(set(sys.modules) - before),
+}))
+'''
+
+
+def load_production_settings():
+    sys.modules.pop(PRODUCTION_SETTINGS, None)
+    return importlib.import_module(PRODUCTION_SETTINGS)
+
+
+def test_production_settings_require_secret_key(monkeypatch, tmp_path):
+    monkeypatch.delenv('SECRET_KEY', raising=False)
+    with pytest.raises(ImproperlyConfigured):
+        load_production_settings()
+    monkeypatch.setenv('SECRET_KEY', 'production-key')
+    monkeypatch.setenv('CACHE_DIR', str(tmp_path))
+    production = load_production_settings()
+    assert production.SECRET_KEY == 'production-key'
+    assert production.CACHES['default'] == {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': str(tmp_path),
+    }
+
+
+def test_warm_up_compiles_templates(monkeypatch, settings):
+    monkeypatch.setenv('SECRET_KEY', 'production-key')
+    settings.TEMPLATES = load_production_settings().TEMPLATES
+    warm_up()
+    loader = engines['django'].engine.template_loaders[0]
+    names = template_names(settings.BASE_DIR / 'templates')
+    assert 'news/detail.html' in names
+    assert set(names) <= set(loader.get_template_cache)
+
+
+def test_production_worker_is_warm_before_first_request(tmp_path):
+    environment = {
+        'CACHE_DIR': str(tmp_path / 'cache'),
+        'DATABASE_NAME': str(tmp_path / 'production.sqlite3'),
+        'DJANGO_SETTINGS_MODULE': PRODUCTION_SETTINGS,
+        'SECRET_KEY': 'production-key',
+    }
+    for command in (['migrate'], ['shell', '-c', SCENARIO]):
+        result = subprocess.run(
+            [sys.executable, 'manage.py', *command, '-v', '0'],
+            cwd=settings.BASE_DIR,
+            env={**os.environ, **environment},
+            capture_output=True,
+            text=True,
+        )
+        assert result.returncode == 0, result.stderr
+    state = json.loads(result.stdout.splitlines()[-1])
+    assert state == {
+        'debug': False,
+        'conn_max_age': 600,
+        'connected': True,
+        'status': 200,
+        'imported': [],
+    }
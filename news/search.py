@@ -0,0 +1,150 @@
+"""
+Полнотекстовый поиск по новостям и комментариям.
+
+На SQLite поиск идёт по индексам FTS5 (см. миграцию 0008_search_index),
+результаты ранжируются по bm25 и снабжаются фрагментами с подсветкой.
+Слова запроса приводятся к основе функцией из NEWS_SEARCH_STEMMER
+и ищутся как префиксы, поэтому «редиской» находит и «редиска».
+"""
+import re
+
+from django.conf import settings
+from django.db import connections, router
+from django.db.models import Q
+from django.utils.html import escape
+from django.utils.module_loading import import_string
+from django.utils.safestring import mark_safe
+
+from .models import Comment, News
+from .moderation import ENDINGS
+
+WORD_RE = re.compile(r'\w+')
+# Служебные символы вокруг найденных слов: их не бывает в тексте, поэтому
+# фрагмент можно безопасно экранировать и только потом подсветить.
+MATCH_START, MATCH_END = '\x02', '\x03'
+SNIPPET_TOKENS = 16
+# Основа для поиска короче, чем для модерации: слово ищется как префикс.
+MIN_STEM_LENGTH = 3
+
+NEWS_SEARCH_SQL = f'''
+    SELECT news_news.*,
+           snippet(news_news_fts, -1, '{MATCH_START}', '{MATCH_END}',
+                   '…', {SNIPPET_TOKENS}) AS snippet
+    FROM news_news_fts
+    JOIN news_news ON news_news.id = news_news_fts.rowid
+    WHERE news_news_fts MATCH %s
+    ORDER BY bm25(news_news_fts, 10.0, 1.0)
+    LIMIT %s
+'''
+
+COMMENT_SEARCH_SQL = f'''
+    SELECT news_comment.*,
+           snippet(news_comment_fts, 0, '{MATCH_START}', '{MATCH_END}',
+                   '…', {SNIPPET_TOKENS}) AS snippet
+    FROM news_comment_fts
+    JOIN news_comment ON news_comment.id = news_comment_fts.rowid
+    WHERE news_comment_fts MATCH %s
+    ORDER BY bm25(news_comment_fts)
+    LIMIT %s
+'''
+
+NORMALIZE = "replace(replace({}, 'ё', 'е'), 'Ё', 'Е')"
+
+REBUILD_SQL = (
+    'DELETE FROM news_news_fts',
+    'DELETE FROM news_comment_fts',
+    'INSERT INTO news_news_fts (rowid, title, text) '
+    'SELECT id, {}, {} FROM news_news'.format(
+        NORMALIZE.format('title'), NORMALIZE.format('text')
+    ),
+    'INSERT INTO news_comment_fts (rowid, text) '
+    "SELECT id, {} FROM news_comment WHERE status = 'approved'".format(
+        NORMALIZE.format('text')
+    ),
+    "INSERT INTO news_news_fts (news_news_fts) VALUES ('optimize')",
+    "INSERT INTO news_comment_fts (news_comment_fts) VALUES ('optimize')",
+)
+
+
+def russian_stem(word):
+    """
+    Основа слова для поиска.
+
+    Отрезается только самое длинное подходящее окончание: если без него
+    остаётся слишком мало букв, слово не укорачивается, чтобы в основе
+    не остался обрывок окончания.
+    """
+    for ending in ENDINGS:
+        if word.endswith(ending):
+            if len(word) - len(ending) >= MIN_STEM_LENGTH:
+                return word[:-len(ending)]
+            return word
+    return word
+
+
+def uses_fts(model):
+    return connections[router.db_for_read(model)].vendor == 'sqlite'
+
+
+def build_match_query(query):
+    """
+    Превращает пользовательский запрос в выражение MATCH для FTS5.
+
+    Все слова обязательны; каждое берётся в кавычки, поэтому синтаксис
+    FTS5 из запроса не проходит.
+    """
+    stemmer = import_string(settings.NEWS_SEARCH_STEMMER)
+    terms = WORD_RE.findall(query.lower().replace('ё', 'е'))
+    return ' '.join(f'"{stemmer(term)}"*' for term in terms)
+
+
+def highlight(snippet):
+    return mark_safe(
+        escape(snippet)
+        .replace(MATCH_START, '<mark>')
+        .replace(MATCH_END, '</mark>')
+    )
+
+
+def _search(model, sql, query, limit):
+    match = build_match_query(query)
+    if not match:
+        return []
+    results = list(model.objects.raw(sql, [match, limit]))
+    for result in results:
+        result.snippet = highlight(result.snippet)
+    return results
+
+
+def search_news(query, limit):
+    """Новости по запросу, самые подходящие первыми."""
+    if not uses_fts(News):
+        return list(
+            News.objects.filter(
+                Q(title__icontains=query) | Q(text__icontains=query)
+            )[:limit]
+        )
+    return _search(News, NEWS_SEARCH_SQL, query, limit)
+
+
+def search_comments(query, limit):
+    """Опубликованные комментарии по запросу вместе с их новостями."""
+    if not uses_fts(Comment):
+        return list(
+            Comment.objects.filter(
+                status=Comment.Status.APPROVED, text__icontains=query
+            ).select_related('news')[:limit]
+        )
+    comments = _search(Comment, COMMENT_SEARCH_SQL, query, limit)
+    news = News.objects.in_bulk({comment.news_id for comment in comments})
+    for comment in comments:
+        comment.news = news[comment.news_id]
+    return comments
+
+
+def rebuild_index():
+    """Перестраивает индексы FTS5 по текущим данным."""
+    connection = connections[router.db_for_write(News)]
+    with connection.cursor() as cursor:
+        for statement in REBUILD_SQL:
+            cursor.execute(statement)
@@ -0,0 +1,342 @@
+"""
+Синтетические пользователи, новости и комментарии для нагрузочных тестов.
+
+Всё выводится из random.Random(seed), поэтому одинаковые seed и until
+дают одну и ту же базу. Тексты собираются из словаря русских слов
+по нескольким шаблонам предложений: их хватает, чтобы поиск и шаблоны
+работали с похожими на настоящие строками. Комментарии распределены
+по новостям по закону Ципфа — несколько «вирусных» новостей собирают
+большую часть обсуждения, — и пишутся в основном в первые часы после
+публикации.
+
+Строки вставляются пачками сырых INSERT в обход ORM: сохранение
+моделей и сигналы на миллионах строк заняли бы часы. Индекс поиска
+при этом поддерживают триггеры FTS5, а счётчики комментариев
+считаются по ходу генерации и записываются в конце.
+"""
+import random
+from contextlib import contextmanager
+from datetime import datetime, time, timedelta
+from itertools import accumulate
+
+from django.contrib.auth import get_user_model
+from django.db import connections, reset_queries, router, transaction
+from django.utils import timezone
+
+from .models import Comment, News
+from .search import rebuild_index, uses_fts
+
+# Пароль, с которым нельзя войти, как у set_unusable_password().
+UNUSABLE_PASSWORD = '!seed'
+USERNAME_PREFIX = 'reader_{seed}_'
+TITLE_MAX_LENGTH = News._meta.get_field('title').max_length
+SENTENCE_POOL_SIZE = 5000
+# Доли комментариев по статусам модерации.
+STATUS_WEIGHTS = (
+    (Comment.Status.APPROVED, 94),
+    (Comment.Status.PENDING, 4),
+    (Comment.Status.REJECTED, 2),
+)
+# Часы публикации новостей по UTC: с 7 до 23 по Москве.
+PUBLISHING_HOURS = (4, 20)
+# Средняя задержка комментария после публикации новости, в часах.
+COMMENT_DELAY_HOURS = 6
+
+# Все подлежащие во множественном числе, а предметы — мужского рода,
+# чтобы слова в предложениях согласовывались.
+SUBJECTS = (
+    'Власти города', 'Чиновники мэрии', 'Депутаты', 'Учёные',
+    'Жители района', 'Разработчики', 'Спортсмены сборной', 'Фермеры',
+    'Студенты', 'Врачи', 'Учителя', 'Метеорологи', 'Строители',
+    'Водители', 'Пенсионеры', 'Сотрудники музея', 'Актёры театра',
+    'Волонтёры', 'Экономисты', 'Полицейские', 'Транспортники',
+    'Предприниматели', 'Архитекторы', 'Болельщики',
+)
+VERBS = (
+    'обсуждают', 'объявили', 'запустили', 'перенесли', 'отменили',
+    'поддержали', 'раскритиковали', 'утвердили', 'открыли', 'закрыли',
+    'представили', 'изучают', 'проверяют', 'обещают', 'готовят',
+    'увеличили', 'сократили', 'модернизируют', 'ремонтируют', 'ищут',
+)
+ADJECTIVES = (
+    'новый', 'крупный', 'городской', 'областной', 'бюджетный',
+    'транспортный', 'научный', 'спортивный', 'летний', 'зимний',
+    'долгожданный', 'спорный', 'экспериментальный', 'масштабный',
+    'народный', 'цифровой', 'исторический', 'федеральный',
+)
+OBJECTS = (
+    'проект', 'закон', 'маршрут', 'фестиваль', 'парк', 'мост',
+    'стадион', 'конкурс', 'тариф', 'бюджет', 'сервис', 'рынок',
+    'вокзал', 'эксперимент', 'ремонт', 'турнир', 'сезон', 'план',
+    'отчёт', 'центр', 'приют', 'график', 'порядок', 'кампус',
+)
+CIRCUMSTANCES = (
+    'на этой неделе', 'в центре города', 'после долгих споров',
+    'к началу лета', 'несмотря на критику', 'по просьбам жителей',
+    'впервые за десять лет', 'до конца года', 'в тестовом режиме',
+    'вопреки прогнозам', 'в соседнем районе', 'уже завтра',
+)
+OPINIONS = (
+    'Давно пора', 'Посмотрим, что из этого выйдет', 'Спасибо за новость',
+    'Сомневаюсь, что это поможет', 'Отличная идея', 'Опять всё затянут',
+    'Интересно, сколько это стоит', 'У нас во дворе то же самое',
+    'Поддерживаю', 'А где подробности', 'Наконец-то хорошие новости',
+    'Не верю', 'Хорошо бы и у нас так', 'Кто-нибудь был на месте',
+)
+
+
+def make_sentence(rnd):
+    """Одно предложение по случайному шаблону."""
+    subject, verb = rnd.choice(SUBJECTS), rnd.choice(VERBS)
+    thing = f'{rnd.choice(ADJECTIVES)} {rnd.choice(OBJECTS)}'
+    circumstance = rnd.choice(CIRCUMSTANCES)
+    template = rnd.randrange(3)
+    if template == 0:
+        return f'{subject} {verb} {thing} {circumstance}.'
+    if template == 1:
+        return (
+            f'{circumstance.capitalize()} {subject.lower()} {verb} {thing}.'
+        )
+    return f'{rnd.choice(OPINIONS)}: {subject.lower()} {verb} {thing}.'
+
+
+def make_title(rnd):
+    title = (
+        f'{rnd.choice(SUBJECTS)} {rnd.choice(VERBS)} '
+        f'{rnd.choice(ADJECTIVES)} {rnd.choice(OBJECTS)}'
+    )
+    if len(title) > TITLE_MAX_LENGTH:
+        title = title[:TITLE_MAX_LENGTH + 1].rsplit(' ', 1)[0]
+    return title
+
+
+class DatasetGenerator:
+    """
+    Заполняет базу синтетическими данными.
+
+    skew — показатель распределения Ципфа: чем он больше, тем сильнее
+    комментарии сосредоточены на немногих новостях.
+    """
+
+    def __init__(self, seed=0, until=None, days=3650, skew=1.1,
+                 batch_size=10000, progress=None):
+        self.seed = seed
+        self.username_prefix = USERNAME_PREFIX.format(seed=seed)
+        self.until = until or timezone.localdate()
+        self.days = days
+        self.skew = skew
+        self.batch_size = batch_size
+        self.progress = progress or (lambda message: None)
+        self.rnd = random.Random(seed)
+        # Конец дня until: позже него в данных ничего не происходит.
+        self.latest = timezone.make_aware(
+            datetime.combine(self.until, time.max)
+        )
+        self.latest_utc = timezone.make_naive(self.latest, timezone.utc)
+        self.connection = connections[router.db_for_write(News)]
+        self.sentences = [
+            make_sentence(self.rnd) for _ in range(SENTENCE_POOL_SIZE)
+        ]
+
+    def text(self, low, high):
+        return ' '.join(
+            self.rnd.choices(self.sentences, k=self.rnd.randint(low, high))
+        )
+
+    def random_date(self):
+        # Свежих новостей больше, чем старых.
+        back = int(self.rnd.triangular(0, self.days, 0))
+        return self.until - timedelta(days=back)
+
+    def insert(self, sql, rows):
+        """Выполняет sql для строк пачками по batch_size."""
+        with self.connection.cursor() as cursor:
+            for offset in range(0, len(rows), self.batch_size):
+                cursor.executemany(sql, rows[offset:offset + self.batch_size])
+                # При DEBUG Django копил бы тексты всех запросов.
+                reset_queries()
+
+    def adapt_datetime(self, value):
+        return self.connection.ops.adapt_datetimefield_value(value)
+
+    def create_users(self, count):
+        """Создаёт пользователей и возвращает их id."""
+        user_model = get_user_model()
+        usernames = [
+            f'{self.username_prefix}{index}' for index in range(count)
+        ]
+        joined = self.adapt_datetime(self.latest)
+        self.insert(
+            f'INSERT INTO {user_model._meta.db_table} (password, username, '
+            'first_name, last_name, email, is_superuser, is_staff, '
+            'is_active, date_joined) '
+            "VALUES (%s, %s, '', '', '', 0, 0, 1, %s)",
+            [(UNUSABLE_PASSWORD, username, joined) for username in usernames],
+        )
+        self.progress(f'Пользователей: {count}.')
+        return list(
+            user_model.objects.using(self.connection.alias)
+            .filter(username__startswith=self.username_prefix)
+            .values_list('pk', flat=True)
+        )
+
+    def create_news(self, count):
+        """Создаёт новости и возвращает пары (id, дата)."""
+        last_pk = self.last_news_pk()
+        modified = self.adapt_datetime(self.latest)
+        for offset in range(0, count, self.batch_size):
+            rows = [
+                (
+                    make_title(self.rnd),
+                    self.text(3, 8),
+                    self.connection.ops.adapt_datefield_value(
+                        self.random_date()
+                    ),
+                    modified,
+                )
+                for _ in range(offset, min(count, offset + self.batch_size))
+            ]
+            self.insert(
+                f'INSERT INTO {News._meta.db_table} (title, text, date, '
+                'comment_count, modified) VALUES (%s, %s, %s, 0, %s)',
+                rows,
+            )
+            self.progress(f'Новостей: {offset + len(rows)}.')
+        return list(
+            News.objects.using(self.connection.alias)
+            .filter(pk__gt=last_pk)
+            .order_by('pk')
+            .values_list('pk', 'date')
+        )
+
+    def last_news_pk(self):
+        news = (
+            News.objects.using(self.connection.alias)
+            .order_by('-pk')
+            .values_list('pk', flat=True)
+            .first()
+        )
+        return news or 0
+
+    def comment_created(self, news_date):
+        """
+        Время комментария в UTC в том виде, в каком его хранит Django.
+
+        Строка собирается напрямую: make_aware и адаптер бэкенда
+        на миллионах строк заняли бы больше времени, чем сама вставка.
+        """
+        published = datetime.combine(
+            news_date, time(hour=self.rnd.randrange(*PUBLISHING_HOURS))
+        )
+        delay = timedelta(
+            hours=self.rnd.expovariate(1 / COMMENT_DELAY_HOURS)
+        )
+        return str(min(published + delay, self.latest_utc))
+
+    def create_comments(self, count, news, user_ids):
+        """
+        Создаёт комментарии и обновляет счётчики у новостей.
+
+        Возвращает число опубликованных комментариев.
+        """
+        if not count:
+            return 0
+        # Вирусными становятся случайные новости, а не первые по id.
+        order = list(range(len(news)))
+        self.rnd.shuffle(order)
+        weights = [0.0] * len(news)
+        for rank, index in enumerate(order, start=1):
+            weights[index] = rank ** -self.skew
+        cumulative = list(accumulate(weights))
+        statuses, status_weights = zip(*STATUS_WEIGHTS)
+        approved = [0] * len(news)
+        for offset in range(0, count, self.batch_size):
+            size = min(self.batch_size, count - offset)
+            targets = self.rnd.choices(
+                range(len(news)), cum_weights=cumulative, k=size
+            )
+            rows = []
+            for index, status in zip(
+                targets, self.rnd.choices(statuses, status_weights, k=size)
+            ):
+                news_pk, news_date = news[index]
+                if status == Comment.Status.APPROVED:
+                    approved[index] += 1
+                rows.append((
+                    news_pk,
+                    self.rnd.choice(user_ids),
+                    self.text(1, 3),
+                    self.comment_created(news_date),
+                    status,
+                ))
+            self.insert(
+                f'INSERT INTO {Comment._meta.db_table} (news_id, author_id, '
+                'text, created, status) VALUES (%s, %s, %s, %s, %s)',
+                rows,
+            )
+            self.progress(f'Комментариев: {offset + size}.')
+        self.insert(
+            f'UPDATE {News._meta.db_table} SET comment_count = %s '
+            'WHERE id = %s',
+            [
+                (total, news[index][0])
+                for index, total in enumerate(approved) if total
+            ],
+        )
+        return sum(approved)
+
+    @contextmanager
+    def deferred_indexes(self, model, rows):
+        """
+        Снимает индексы и триггеры таблицы на время вставки rows строк.
+
+        Построить индекс по заполненной таблице быстрее, чем обновлять
+        его при каждой вставке, а триггеры FTS5 заменяет перестройка
+        индекса поиска. Вызывается внутри транзакции, поэтому при ошибке
+        схема откатывается вместе с данными.
+        """
+        if (
+            self.connection.vendor != 'sqlite'
+            or model.objects.using(self.connection.alias).count() > rows
+        ):
+            # Перестройка по большой таблице дороже вставки немногих строк.
+            yield
+            return
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT type, name, sql FROM sqlite_master '
+                "WHERE tbl_name = %s AND type IN ('index', 'trigger') "
+                'AND sql IS NOT NULL',
+                [model._meta.db_table],
+            )
+            saved = cursor.fetchall()
+            for kind, name, _ in saved:
+                cursor.execute(
+                    f'DROP {kind.upper()} '
+                    f'{self.connection.ops.quote_name(name)}'
+                )
+        yield
+        self.progress('Строим индексы.')
+        with self.connection.cursor() as cursor:
+            for _, _, sql in saved:
+                cursor.execute(sql)
+        if uses_fts(model):
+            rebuild_index()
+
+    def generate(self, users, news, comments):
+        """
+        Создаёт данные одной транзакцией.
+
+        Возвращает число опубликованных комментариев.
+        """
+        with transaction.atomic(using=self.connection.alias):
+            user_ids = self.create_users(users)
+            created_news = self.create_news(news)
+            if comments and not (user_ids and created_news):
+                raise ValueError(
+                    'Для комментариев нужны пользователи и новости.'
+                )
+            with self.deferred_indexes(Comment, comments):
+                return self.create_comments(
+                    comments, created_news, user_ids
+                )
@@ -0,0 +1,55 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .cache import (
+    HOME_PAGE_SCOPE, invalidate_comment_fragment, news_page_scope,
+    purge_pages
+)
+from .models import BadWord, Comment, News
+from .moderation import bad_words_changed
+
+
+def purge_news_pages(news_pk):
+    """
+    Сбрасывает главную и страницу новости после фиксации транзакции.
+
+    Иначе читатель успел бы закэшировать страницу со старыми данными
+    между сбросом и фиксацией.
+    """
+    transaction.on_commit(
+        lambda: purge_pages(HOME_PAGE_SCOPE, news_page_scope(news_pk))
+    )
+
+
+@receiver(pre_save, sender=News)
+def fill_modified_on_raw_save(sender, instance, raw, **kwargs):
+    """
+    Сохранение из loaddata идёт в обход auto_now.
+
+    Фикстуры, выгруженные до появления поля modified, иначе не загрузятся.
+    """
+    if raw and instance.modified is None:
+        instance.modified = timezone.now()
+
+
+@receiver(post_save, sender=News)
+@receiver(post_delete, sender=News)
+def news_changed(sender, instance, **kwargs):
+    purge_news_pages(instance.pk)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def comment_changed(sender, instance, **kwargs):
+    """Правка из любого места, в том числе из админки, сбрасывает блок."""
+    purge_news_pages(instance.news_id)
+    pk = instance.pk
+    transaction.on_commit(lambda: invalidate_comment_fragment(pk))
+
+
+@receiver(post_save, sender=BadWord)
+@receiver(post_delete, sender=BadWord)
+def bad_word_changed(sender, instance, **kwargs):
+    transaction.on_commit(bad_words_changed)
@@ -5,6 +5,7 @@
 # Анонимному пользователю не видна форма для отправки комментария на странице отдельной новости, а авторизованному видна.
 
 from django.conf import settings
+from django.core.cache import cache
 from django.test import TestCase
 from django.urls import reverse
 from django.contrib.auth import get_user_model
@@ -36,6 +37,11 @@ class TestHomePage(TestCase):
             for index in range(settings.NEWS_COUNT_ON_HOME_PAGE + 1)
         )
 
+    def setUp(self):
+        # Страницы для анонимов кэшируются целиком: сбрасываем кэш,
+        # чтобы каждый тест получал ответ с контекстом шаблона.
+        cache.clear()
+
     def test_news_count(self):
         # Проверяем, что на странице Home именно 10 новостей.
         # Загружаем главную страницу.
@@ -83,6 +89,9 @@ class TestDetailPage(TestCase):
             # И сохраняем эти изменения.
             comment.save()
 
+    def setUp(self):
+        cache.clear()
+
     def test_comments_order(self):
         response = self.client.get(self.detail_url)
         # Проверяем, что объект новости находится в словаре контекста
@@ -1,12 +1,24 @@
+from django.conf import settings
 from django.urls import path
 
-from news import views
+from news import async_views, views
 
 app_name = 'news'
 
+if settings.NEWS_ASYNC_VIEWS:
+    home_view = async_views.AsyncNewsList
+    detail_view = async_views.AsyncNewsDetailView
+else:
+    home_view = views.NewsList
+    detail_view = views.NewsDetailView
+
 urlpatterns = [
-    path('', views.NewsList.as_view(), name='home'),
-    path('news/<int:pk>/', views.NewsDetailView.as_view(), name='detail'),
+    path('', home_view.as_view(), name='home'),
+    path('archive/', views.NewsArchive.as_view(), name='archive'),
+    path('search/', views.NewsSearch.as_view(), name='search'),
+    path('export/', views.NewsExportDownload.as_view(), name='export'),
+    path('metrics/', views.Metrics.as_view(), name='metrics'),
+    path('news/<int:pk>/', detail_view.as_view(), name='detail'),
     path(
         'delete_comment/<int:pk>/',
         views.CommentDelete.as_view(),
@@ -1,39 +1,248 @@
+from http import HTTPStatus
+
 from django.conf import settings
-from django.contrib.auth.mixins import LoginRequiredMixin
+from django.contrib.auth.mixins import (
+    LoginRequiredMixin, UserPassesTestMixin
+)
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.db.models import Q
+from django.http import Http404, HttpResponse, HttpResponseRedirect
 from django.shortcuts import get_object_or_404
 from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.decorators import method_decorator
+from django.utils.http import parse_http_date_safe
 from django.views import generic
 
+from yanews.routers import read_from_primary
+
+from .cache import (
+    HOME_PAGE_SCOPE, news_page_scope, page_cache_key, recently_purged
+)
+from .conditional import (
+    conditional_page, home_page_validators, news_page_validators
+)
+from .exporting import FORMATS, export_response
 from .forms import CommentForm
+from .metrics import COMMENTS_CREATED, PAGE_CACHE, registry
 from .models import Comment, News
+from .pagination import InvalidCursor, KeysetPage, KeysetPaginator
+from .search import search_comments, search_news
+
+
+class AnonymousPageCacheMixin:
+    """
+    Кэш готовых страниц для анонимных читателей.
+
+    Запрос без сессионной куки заведомо анонимный, поэтому его можно
+    отдать из кэша, не обращаясь ни к сессиям, ни к новостям.
+    Страницы сбрасываются сигналами при изменении новостей и комментариев.
+    Ключ страницы строится по пути и GET-параметрам из page_cache_params.
+    """
+    page_cache_scope = None
+    page_cache_params = ()
+
+    def get_page_cache_scope(self):
+        if self.page_cache_scope is None:
+            raise ImproperlyConfigured(
+                f'{type(self).__name__}: задайте page_cache_scope '
+                f'или переопределите get_page_cache_scope().'
+            )
+        return self.page_cache_scope
+
+    def page_cache_allowed(self, request):
+        return (
+            request.method == 'GET'
+            and settings.NEWS_PAGE_CACHE_TIMEOUT
+            and settings.SESSION_COOKIE_NAME not in request.COOKIES
+        )
 
+    def dispatch(self, request, *args, **kwargs):
+        if not self.page_cache_allowed(request):
+            return super().dispatch(request, *args, **kwargs)
+        scope = self.get_page_cache_scope()
+        key = page_cache_key(scope, request, self.page_cache_params)
+        response = cache.get(key)
+        if response is not None:
+            PAGE_CACHE.inc(result='hit')
+            response['X-Page-Cache'] = 'HIT'
+            return get_conditional_response(
+                request,
+                etag=response.get('ETag'),
+                last_modified=parse_http_date_safe(
+                    response.get('Last-Modified', '')
+                ),
+                response=response,
+            )
+        PAGE_CACHE.inc(result='miss')
+        if settings.READ_REPLICAS and recently_purged(scope):
+            # Отстающая реплика вернула бы страницу до сброса,
+            # и она снова попала бы в кэш.
+            read_from_primary()
+        response = super().dispatch(request, *args, **kwargs)
+        patch_vary_headers(response, ('Cookie',))
+        response['X-Page-Cache'] = 'MISS'
+        if response.status_code == HTTPStatus.OK and not response.cookies:
+            timeout = settings.NEWS_PAGE_CACHE_TIMEOUT
+            if callable(getattr(response, 'render', None)):
+                response.add_post_render_callback(
+                    lambda rendered: cache.set(key, rendered, timeout)
+                )
+            else:
+                cache.set(key, response, timeout)
+        return response
 
-class NewsList(generic.ListView):
+
+@method_decorator(conditional_page(home_page_validators), name='get')
+class NewsList(AnonymousPageCacheMixin, generic.ListView):
     """Список новостей."""
     model = News
     template_name = 'news/home.html'
+    page_cache_scope = HOME_PAGE_SCOPE
 
     def get_queryset(self):
         """
         Выводим только несколько последних новостей.
 
         Их количество определяется в настройках проекта.
+        Количество комментариев берётся из счётчика в самой новости.
         """
-        return self.model.objects.prefetch_related(
-            'comment_set'
-        )[:settings.NEWS_COUNT_ON_HOME_PAGE]
+        return self.model.objects.all()[:settings.NEWS_COUNT_ON_HOME_PAGE]
+
+
+class NewsArchive(generic.TemplateView):
+    """
+    Архив всех новостей.
+
+    Страницы выбираются по курсору из (date, id), а не через OFFSET,
+    поэтому глубокие страницы открываются так же быстро, как первая.
+    """
+    template_name = 'news/archive.html'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        paginator = KeysetPaginator(
+            News.objects.all(),
+            ordering=('-date', '-id'),
+            per_page=settings.NEWS_COUNT_ON_ARCHIVE_PAGE,
+        )
+        try:
+            page = paginator.page(self.request.GET.get('cursor'))
+        except InvalidCursor:
+            raise Http404('Некорректный курсор страницы.')
+        context['page'] = page
+        context['object_list'] = page.object_list
+        return context
+
+
+class NewsSearch(generic.TemplateView):
+    """Поиск по новостям и опубликованным комментариям."""
+    template_name = 'news/search.html'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        query = self.request.GET.get('q', '').strip()
+        context['query'] = query
+        if query:
+            limit = settings.SEARCH_RESULTS_LIMIT
+            context['news_results'] = search_news(query, limit)
+            context['comment_results'] = search_comments(query, limit)
+        return context
+
+
+class NewsExportDownload(UserPassesTestMixin, generic.View):
+    """Выгрузка всех новостей с комментариями для сотрудников."""
+
+    def test_func(self):
+        return self.request.user.is_staff
+
+    def get(self, request, *args, **kwargs):
+        fmt = request.GET.get('format', 'jsonl')
+        if fmt not in FORMATS:
+            raise Http404
+        return export_response(
+            News.objects.all(),
+            fmt,
+            compress=request.GET.get('gzip') in ('1', 'true'),
+        )
+
 
+class Metrics(generic.View):
+    """Метрики для Prometheus, только для адресов из METRICS_ALLOWED_IPS."""
 
-class NewsDetail(generic.DetailView):
+    def get(self, request, *args, **kwargs):
+        if request.META.get('REMOTE_ADDR') not in settings.METRICS_ALLOWED_IPS:
+            raise Http404
+        return HttpResponse(
+            registry.render(),
+            content_type='text/plain; version=0.0.4; charset=utf-8',
+        )
+
+
+class NewsCommentsMixin:
+    """
+    Страница комментариев к новости для шаблона detail.html.
+
+    Комментарии выбираются по курсору из (created, id), а авторы
+    подгружаются только для комментариев текущей страницы.
+    Показываются опубликованные комментарии, а автору ещё и его
+    комментарии, ждущие модерации.
+    """
+
+    def get_comments_queryset(self):
+        user = self.request.user
+        visible = Q(status=Comment.Status.APPROVED)
+        if user.is_authenticated:
+            visible |= Q(author=user, status=Comment.Status.PENDING)
+        return self.object.comment_set.filter(
+            visible
+        ).select_related('author')
+
+    def get_comments_page(self):
+        if (
+            not self.object.has_comments
+            and not self.request.user.is_authenticated
+        ):
+            return KeysetPage([], None)
+        paginator = KeysetPaginator(
+            self.get_comments_queryset(),
+            ordering=('created', 'id'),
+            per_page=settings.COMMENTS_COUNT_ON_NEWS_PAGE,
+        )
+        try:
+            return paginator.page(self.request.GET.get('cursor'))
+        except InvalidCursor:
+            raise Http404('Некорректный курсор страницы.')
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['comments_page'] = self.get_comments_page()
+        context['comment_fragment_timeout'] = (
+            settings.COMMENT_FRAGMENT_TIMEOUT
+        )
+        context['comment_fragment_version'] = (
+            settings.COMMENT_FRAGMENT_VERSION
+        )
+        return context
+
+
+@method_decorator(conditional_page(news_page_validators), name='get')
+class NewsDetail(
+        AnonymousPageCacheMixin,
+        NewsCommentsMixin,
+        generic.DetailView
+):
     model = News
     template_name = 'news/detail.html'
+    page_cache_params = ('cursor',)
+
+    def get_page_cache_scope(self):
+        return news_page_scope(self.kwargs['pk'])
 
     def get_object(self, queryset=None):
-        obj = get_object_or_404(
-            self.model.objects.prefetch_related('comment_set__author'),
-            pk=self.kwargs['pk']
-        )
-        return obj
+        return get_object_or_404(self.model, pk=self.kwargs['pk'])
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -44,6 +253,7 @@ class NewsDetail(generic.DetailView):
 
 class NewsComment(
         LoginRequiredMixin,
+        NewsCommentsMixin,
         generic.detail.SingleObjectMixin,
         generic.FormView
 ):
@@ -56,10 +266,22 @@ class NewsComment(
         return super().post(request, *args, **kwargs)
 
     def form_valid(self, form):
+        """
+        Сохраняем комментарий в очередь модерации.
+
+        Тяжёлые проверки выполняет команда moderate_comments, а счётчик
+        новости растёт, когда комментарий будет опубликован. Новость всё
+        равно отмечается изменённой: автор уже видит свой комментарий,
+        и закэшированная у него страница устарела.
+        """
         comment = form.save(commit=False)
         comment.news = self.object
         comment.author = self.request.user
-        comment.save()
+        comment.status = Comment.Status.PENDING
+        with transaction.atomic():
+            comment.save()
+            News.objects.filter(pk=self.object.pk).touch()
+        COMMENTS_CREATED.inc()
         return super().form_valid(form)
 
     def get_success_url(self):
@@ -90,7 +312,9 @@ class CommentBase(LoginRequiredMixin):
 
     def get_queryset(self):
         """Пользователь может работать только со своими комментариями."""
-        return self.model.objects.filter(author=self.request.user)
+        return self.model.objects.filter(
+            author=self.request.user
+        ).select_related('news')
 
 
 class CommentUpdate(CommentBase, generic.UpdateView):
@@ -98,7 +322,48 @@ class CommentUpdate(CommentBase, generic.UpdateView):
     template_name = 'news/edit.html'
     form_class = CommentForm
 
+    def form_valid(self, form):
+        """Исправленный комментарий заново уходит на модерацию."""
+        with transaction.atomic():
+            was_approved = self.get_queryset().select_for_update().filter(
+                pk=self.object.pk, status=Comment.Status.APPROVED
+            ).exists()
+            form.instance.status = Comment.Status.PENDING
+            response = super().form_valid(form)
+            news = News.objects.filter(pk=self.object.news_id)
+            if was_approved:
+                news.change_comment_count(-1)
+            else:
+                news.touch()
+        return response
+
 
 class CommentDelete(CommentBase, generic.DeleteView):
     """Удаление комментария."""
     template_name = 'news/delete.html'
+
+    def delete(self, request, *args, **kwargs):
+        """
+        Удаляем комментарий и уменьшаем счётчик в одной транзакции.
+
+        Статус перечитывается под блокировкой строки, а счётчик меняется,
+        только если опубликованный комментарий действительно удалён этим
+        запросом: ни повторное удаление, ни одновременная модерация его
+        не испортят.
+        """
+        self.object = self.get_object()
+        success_url = self.get_success_url()
+        with transaction.atomic():
+            comment = self.get_queryset().select_for_update().filter(
+                pk=self.object.pk
+            )
+            status = comment.values_list('status', flat=True).first()
+            _, deleted = comment.delete()
+            deleted_count = deleted.get(self.model._meta.label, 0)
+            news = News.objects.filter(pk=self.object.news_id)
+            if deleted_count and status == Comment.Status.APPROVED:
+                news.change_comment_count(-deleted_count)
+            elif deleted_count:
+                # Счётчик не меняется, но страница автора стала другой.
+                news.touch()
+        return HttpResponseRedirect(success_url)
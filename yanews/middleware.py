@@ -0,0 +1,78 @@
+"""
+Основа для middleware проекта, работающих и под WSGI, и под ASGI.
+
+В Django 3.2 синхронная middleware в цепочке ASGI уводит весь запрос
+в единственный поток thread_sensitive, и асинхронные представления
+выполняются по одному. RequestMiddleware поддерживает оба режима:
+под ASGI её __call__ — корутина, и цепочка остаётся асинхронной.
+
+SQL запроса под ASGI выполняется не в потоке middleware, а в потоках
+sync_to_async, и connection.execute_wrapper его не видит. Обёртка из
+request_execute_wrapper действует на весь контекст запроса: asgiref
+переносит contextvars в потоки sync_to_async, а движок yanews.sqlite
+вызывает обёртки текущего контекста для каждого SQL.
+"""
+import asyncio
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from functools import partial
+
+_execute_wrappers = ContextVar('request_execute_wrappers', default=())
+
+
+def run_request_wrappers(execute, sql, params, many, context):
+    """Обёртка соединения: вызывает обёртки текущего запроса."""
+    for wrapper in reversed(_execute_wrappers.get()):
+        execute = partial(wrapper, execute)
+    return execute(sql, params, many, context)
+
+
+@contextmanager
+def request_execute_wrapper(wrapper):
+    """Как connection.execute_wrapper, но для SQL всех баз и потоков."""
+    token = _execute_wrappers.set((*_execute_wrappers.get(), wrapper))
+    try:
+        yield
+    finally:
+        _execute_wrappers.reset(token)
+
+
+class RequestMiddleware:
+    """
+    Middleware, которая оборачивает обработку запроса.
+
+    Наследник переопределяет enter(request, stack) — подготовка перед
+    запросом, контексты кладутся в stack и закрываются сразу после
+    ответа, — и finish(request, response, state), где state — то,
+    что вернул enter.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = asyncio.iscoroutinefunction(get_response)
+        if self.is_async:
+            # Так обработчик Django 3.2 распознаёт асинхронную
+            # middleware, как и MiddlewareMixin.
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def enter(self, request, stack):
+        return None
+
+    def finish(self, request, response, state):
+        return response
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        with ExitStack() as stack:
+            state = self.enter(request, stack)
+            response = self.get_response(request)
+        return self.finish(request, response, state)
+
+    async def __acall__(self, request):
+        with ExitStack() as stack:
+            state = self.enter(request, stack)
+            response = await self.get_response(request)
+        return self.finish(request, response, state)
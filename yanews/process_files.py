@@ -0,0 +1,99 @@
+"""
+Данные процесса в собственном файле общего каталога.
+
+Метрики (news/metrics.py) и статистика SQL (yanews/querylog.py) копятся
+в памяти каждого процесса и не чаще раза в заданный интервал
+сбрасываются в файл процесса, а читатель складывает файлы всех
+процессов. ProcessFile делает общую часть: имя файла по pid и времени
+старта процесса, сброс данных, унаследованных при fork, атомарную запись
+через временный файл и последний сброс при выходе.
+"""
+import atexit
+import os
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+
+
+class ProcessFile:
+    """
+    Основа для данных процесса, которые выгружаются в каталог.
+
+    Наследник задаёт prefix имени файла, имена настроек каталога
+    и интервала сброса, а также _clear_data() и _dump(). Данные меняются
+    под self.lock после вызова _check_fork().
+    """
+    prefix = None
+    directory_setting = None
+    interval_setting = None
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.flushed_at = time.monotonic()
+        self._reset()
+        atexit.register(self.flush)
+
+    @property
+    def directory(self):
+        return getattr(settings, self.directory_setting)
+
+    def _reset(self):
+        self.pid = os.getpid()
+        # Время старта в имени файла: pid повторяются после перезапуска,
+        # и новый процесс не должен затереть файл завершившегося.
+        self.started = time.time_ns()
+        self._clear_data()
+
+    def _check_fork(self):
+        if os.getpid() != self.pid:
+            # Данные мастера воркер унаследовал при fork:
+            # они уже учтены в файле мастера.
+            self._reset()
+
+    def _clear_data(self):
+        raise NotImplementedError
+
+    def _dump(self):
+        """Данные процесса в виде текста для файла; None — не писать."""
+        raise NotImplementedError
+
+    def path(self):
+        return (
+            Path(self.directory)
+            / f'{self.prefix}{self.pid}-{self.started}.json'
+        )
+
+    def paths(self):
+        """Файлы всех процессов в каталоге."""
+        return Path(self.directory).glob(f'{self.prefix}*.json')
+
+    def maybe_flush(self):
+        if (
+            self.directory
+            and time.monotonic() - self.flushed_at
+            >= getattr(settings, self.interval_setting)
+        ):
+            self.flush()
+
+    def flush(self):
+        """Записывает данные процесса в его файл атомарно."""
+        if not self.directory:
+            return
+        with self.lock:
+            self.flushed_at = time.monotonic()
+            if os.getpid() != self.pid:
+                return
+            data = self._dump()
+            if data is None:
+                return
+            path = self.path()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = path.with_suffix(f'.{threading.get_ident()}.tmp')
+        temporary.write_text(data, encoding='utf-8')
+        os.replace(temporary, path)
+
+    def clear(self):
+        with self.lock:
+            self._clear_data()
@@ -0,0 +1,158 @@
+"""
+Профилирование запросов: время SQL, шаблонов и представления.
+
+Middleware включается настройкой PROFILING_ENABLED и отдаёт разбивку
+в заголовке Server-Timing, который видно во вкладке Network браузера.
+Запросы дольше PROFILING_SLOW_REQUEST секунд записываются в журнал
+вместе с самыми медленными SQL, а если задан PROFILING_DUMP_DIR,
+туда же сохраняется профиль cProfile для snakeviz или pstats.
+
+Время шаблона измеряется только для TemplateResponse: обычный render()
+выполняется внутри представления и попадает во время view. SQL, который
+выполняется при отрисовке ленивых querysets, входит и в sql, и в template.
+SQL асинхронных представлений из пула потоков news.async_views тоже
+учитывается. Профиль cProfile под ASGI не снимается: он видит только
+поток event loop, где вперемешку выполняются все запросы.
+"""
+import cProfile
+import heapq
+import logging
+import re
+import time
+from itertools import count
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from .middleware import RequestMiddleware, request_execute_wrapper
+
+logger = logging.getLogger(__name__)
+
+SLUG_RE = re.compile(r'[^\w-]+')
+
+
+class RequestProfile:
+    """Замеры одного запроса."""
+
+    def __init__(self, slowest_limit):
+        self.slowest_limit = slowest_limit
+        self.started = time.perf_counter()
+        self.finished = None
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+        self.view_time = None
+        self._render_started = None
+        # Куча из (длительность, порядковый номер, SQL) самых медленных.
+        self.slowest = []
+        self._order = count()
+
+    def execute_wrapper(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            self.sql_count += 1
+            self.sql_time += duration
+            item = (duration, next(self._order), sql)
+            if len(self.slowest) < self.slowest_limit:
+                heapq.heappush(self.slowest, item)
+            else:
+                heapq.heappushpop(self.slowest, item)
+
+    def render_started(self):
+        self._render_started = time.perf_counter()
+        self.view_time = self._render_started - self.started
+
+    def render_finished(self, response):
+        self.template_time += time.perf_counter() - self._render_started
+
+    def finish(self):
+        self.finished = time.perf_counter()
+        if self.view_time is None:
+            self.view_time = self.total
+
+    @property
+    def total(self):
+        return (self.finished or time.perf_counter()) - self.started
+
+    def slowest_statements(self):
+        """Самые медленные SQL: от долгих к быстрым, с временем в мс."""
+        return [
+            (duration * 1000, sql)
+            for duration, _, sql in sorted(self.slowest, reverse=True)
+        ]
+
+    def server_timing(self):
+        metrics = (
+            ('total', self.total, None),
+            ('view', self.view_time, None),
+            ('template', self.template_time, None),
+            ('sql', self.sql_time, f'{self.sql_count} queries'),
+        )
+        return ', '.join(
+            f'{name};dur={duration * 1000:.1f}'
+            + (f';desc="{description}"' if description else '')
+            for name, duration, description in metrics
+        )
+
+
+class ProfilingMiddleware(RequestMiddleware):
+    """Замеряет запросы; ставится первым в MIDDLEWARE."""
+
+    def __init__(self, get_response):
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+        self.threshold = settings.PROFILING_SLOW_REQUEST
+        self.dump_dir = None if self.is_async else settings.PROFILING_DUMP_DIR
+        if self.dump_dir:
+            Path(self.dump_dir).mkdir(parents=True, exist_ok=True)
+
+    def enter(self, request, stack):
+        profile = RequestProfile(settings.PROFILING_SLOWEST_SQL)
+        request.profile = profile
+        profiler = cProfile.Profile() if self.dump_dir else None
+        stack.enter_context(request_execute_wrapper(profile.execute_wrapper))
+        if profiler is not None:
+            profiler.enable()
+            stack.callback(profiler.disable)
+        return profile, profiler
+
+    def finish(self, request, response, state):
+        profile, profiler = state
+        profile.finish()
+        response['Server-Timing'] = profile.server_timing()
+        if profile.total >= self.threshold:
+            self.report(request, profile, profiler)
+        return response
+
+    def process_template_response(self, request, response):
+        # Эта middleware первая в списке, поэтому её хук вызывается
+        # последним, непосредственно перед отрисовкой шаблона.
+        request.profile.render_started()
+        response.add_post_render_callback(request.profile.render_finished)
+        return response
+
+    def report(self, request, profile, profiler):
+        statements = '\n'.join(
+            f'  {duration:.1f} мс: {sql}'
+            for duration, sql in profile.slowest_statements()
+        )
+        message = (
+            f'Медленный запрос {request.method} {request.path}: '
+            f'{profile.server_timing()}'
+        )
+        if profiler is not None:
+            path = Path(self.dump_dir) / '{}-{}-{}.prof'.format(
+                time.time_ns() // 1000,
+                request.method,
+                SLUG_RE.sub('_', request.path).strip('_') or 'root',
+            )
+            profiler.dump_stats(path)
+            message += f'\nПрофиль: {path}'
+        if statements:
+            message += f'\nСамые медленные SQL:\n{statements}'
+        logger.warning(message)
@@ -0,0 +1,138 @@
+"""
+Журнал SQL по отпечаткам запросов.
+
+Middleware включается настройкой QUERY_LOG_DIR. Каждый SQL сводится
+к отпечатку: литералы и параметры заменяются на ?, списки значений
+в IN и строки VALUES схлопываются, пробелы нормализуются. По отпечатку
+копятся число выполнений, суммарное и наибольшее время, а также
+параметры самого медленного выполнения как пример.
+
+Статистика копится в памяти процесса и не чаще раза
+в QUERY_LOG_FLUSH_INTERVAL секунд сбрасывается в собственный файл
+процесса в QUERY_LOG_DIR. Команда query_report складывает файлы всех
+воркеров, в том числе уже завершившихся, и печатает самые дорогие
+отпечатки. Каталог очищается вручную, когда статистика больше не нужна.
+"""
+import json
+import re
+import time
+from functools import lru_cache
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from .middleware import RequestMiddleware, request_execute_wrapper
+from .process_files import ProcessFile
+
+FILE_PREFIX = 'queries-'
+# Длина примера параметров в файле; длинные тексты обрезаются.
+EXAMPLE_LENGTH = 300
+
+STRING_RE = re.compile(r"'(?:[^']|'')*'")
+NUMBER_RE = re.compile(r'(?<![\w".])\d+(?:\.\d+)?\b')
+PLACEHOLDER_RE = re.compile(r'%s|\?')
+VALUE_LIST_RE = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+REPEATED_LIST_RE = re.compile(r'\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+')
+SPACE_RE = re.compile(r'\s+')
+
+
+@lru_cache(maxsize=2048)
+def fingerprint(sql):
+    """Форма запроса без литералов: одинакова для любых параметров."""
+    sql = STRING_RE.sub('?', sql)
+    sql = NUMBER_RE.sub('?', sql)
+    sql = PLACEHOLDER_RE.sub('?', sql)
+    sql = VALUE_LIST_RE.sub('(...)', sql)
+    sql = REPEATED_LIST_RE.sub('(...)', sql)
+    return SPACE_RE.sub(' ', sql).strip()
+
+
+def example(params, many):
+    if many:
+        # Для executemany params может быть итератором: его не трогаем.
+        return '<executemany>'
+    text = repr(tuple(params) if isinstance(params, list) else params)
+    if len(text) > EXAMPLE_LENGTH:
+        text = text[:EXAMPLE_LENGTH - 3] + '...'
+    return text
+
+
+class QueryStats(ProcessFile):
+    """Статистика процесса по отпечаткам и её выгрузка в каталог."""
+    prefix = FILE_PREFIX
+    directory_setting = 'QUERY_LOG_DIR'
+    interval_setting = 'QUERY_LOG_FLUSH_INTERVAL'
+
+    def __init__(self):
+        # Отпечаток -> [число, суммарное время, наибольшее время, пример].
+        self.queries = {}
+        super().__init__()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.add(sql, params, many, time.perf_counter() - start)
+
+    def add(self, sql, params, many, duration):
+        key = fingerprint(sql)
+        with self.lock:
+            self._check_fork()
+            entry = self.queries.get(key)
+            if entry is None:
+                self.queries[key] = [
+                    1, duration, duration, example(params, many)
+                ]
+                return
+            entry[0] += 1
+            entry[1] += duration
+            if duration > entry[2]:
+                entry[2] = duration
+                entry[3] = example(params, many)
+
+    def _clear_data(self):
+        self.queries.clear()
+
+    def _dump(self):
+        if not self.queries:
+            return None
+        return json.dumps(self.queries, ensure_ascii=False)
+
+
+def read_stats(directory):
+    """Сумма статистики из файлов всех процессов в каталоге."""
+    merged = {}
+    for path in Path(directory).glob(f'{FILE_PREFIX}*.json'):
+        try:
+            data = json.loads(path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            continue
+        for key, (count, total, longest, params) in data.items():
+            entry = merged.setdefault(key, [0, 0.0, 0.0, params])
+            entry[0] += count
+            entry[1] += total
+            if longest > entry[2]:
+                entry[2] = longest
+                entry[3] = params
+    return merged
+
+
+query_stats = QueryStats()
+
+
+class QueryLogMiddleware(RequestMiddleware):
+    """Собирает статистику SQL всех баз по отпечаткам."""
+
+    def __init__(self, get_response):
+        if not settings.QUERY_LOG_DIR:
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+
+    def enter(self, request, stack):
+        stack.enter_context(request_execute_wrapper(query_stats))
+
+    def finish(self, request, response, state):
+        query_stats.maybe_flush()
+        return response
@@ -0,0 +1,113 @@
+"""
+Чтение новостей и комментариев с реплик, запись — в основную базу.
+
+Реплики перечислены в настройке READ_REPLICAS. Читать с реплики можно
+только внутри запроса, который пропустила ReplicaPinMiddleware:
+команды, воркер модерации и сигналы всегда работают с основной базой.
+Запрос закрепляется за основной базой, если его метод меняет данные
+(отправка, правка и удаление комментария перечитывают то, что потом
+изменят), или если у клиента есть кука REPLICA_PIN_COOKIE. Её ставит
+запрос, записавший что-то в приложение news, на REPLICA_PIN_SECONDS
+секунд: так автор сразу видит свой комментарий, даже если реплика
+ещё отстаёт. Окно должно быть больше задержки репликации.
+
+Пользователи и сессии всегда читаются из основной базы: иначе после
+входа на сайт отстающая реплика не нашла бы новую сессию. Кэш страниц
+для анонимов в течение REPLICA_PIN_SECONDS после сброса заполняется
+из основной базы, см. read_from_primary().
+"""
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+from .middleware import RequestMiddleware
+
+ROUTED_APPS = frozenset(('news',))
+SAFE_METHODS = frozenset(('GET', 'HEAD', 'OPTIONS'))
+
+_request_state = ContextVar('replica_request_state', default=None)
+
+
+class RoutingState:
+    """Куда читает текущий запрос и писал ли он в приложение news."""
+
+    def __init__(self, replica):
+        # None — читать из основной базы.
+        self.replica = replica
+        self.wrote = False
+
+
+class PrimaryReplicaRouter:
+
+    def _routed(self, model):
+        return model._meta.app_label in ROUTED_APPS
+
+    def db_for_read(self, model, **hints):
+        state = _request_state.get()
+        if state is None or not self._routed(model):
+            return DEFAULT_DB_ALIAS
+        return state.replica or DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        state = _request_state.get()
+        if state is not None and self._routed(model):
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики — копии основной базы, связи между ними допустимы.
+        databases = {DEFAULT_DB_ALIAS, *settings.READ_REPLICAS}
+        if {obj1._state.db, obj2._state.db} <= databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, **hints):
+        # Схема приходит на реплики вместе с данными.
+        if db in settings.READ_REPLICAS:
+            return False
+        return None
+
+
+def read_from_primary():
+    """Переводит чтение до конца текущего запроса на основную базу."""
+    state = _request_state.get()
+    if state is not None:
+        state.replica = None
+
+
+def pinned_to_primary(request):
+    return (
+        request.method not in SAFE_METHODS
+        or settings.REPLICA_PIN_COOKIE in request.COOKIES
+    )
+
+
+class ReplicaPinMiddleware(RequestMiddleware):
+    """
+    Выбирает базу для чтения на время запроса.
+
+    Состояние хранится в ContextVar, поэтому под ASGI его видят и потоки
+    sync_to_async, в которых работают представления.
+    """
+
+    def enter(self, request, stack):
+        replicas = settings.READ_REPLICAS
+        state = RoutingState(
+            None if not replicas or pinned_to_primary(request)
+            else random.choice(replicas)
+        )
+        stack.callback(_request_state.reset, _request_state.set(state))
+        return state
+
+    def finish(self, request, response, state):
+        if state.wrote and settings.READ_REPLICAS:
+            response.set_cookie(
+                settings.REPLICA_PIN_COOKIE,
+                '1',
+                max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 
 from django.urls import reverse_lazy
@@ -21,6 +22,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'yanews.profiling.ProfilingMiddleware',
+    'yanews.querylog.QueryLogMiddleware',
+    'news.metrics.MetricsMiddleware',
+    'yanews.routers.ReplicaPinMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -53,8 +58,67 @@ WSGI_APPLICATION = 'yanews.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'ENGINE': 'yanews.sqlite',
+        'NAME': os.environ.get('DATABASE_NAME', BASE_DIR / 'db.sqlite3'),
+    }
+}
+
+# Реплики для чтения новостей, см. yanews/routers.py. Локально это
+# файлы SQLite через запятую, которые наполняет команда sync_replicas.
+READ_REPLICAS = []
+for index, name in enumerate(
+    filter(None, os.environ.get('DATABASE_REPLICAS', '').split(','))
+):
+    alias = f'replica{index}'
+    DATABASES[alias] = {
+        'ENGINE': 'yanews.sqlite',
+        'NAME': name,
+        'TEST': {'MIRROR': 'default'},
+    }
+    READ_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['yanews.routers.PrimaryReplicaRouter']
+
+# Профиль SQLite выбирается переменной окружения SQLITE_PROFILE.
+# В production журнал WAL не даёт читателям и писателю ждать друг друга,
+# занятая база ожидается busy_timeout миллисекунд вместо ошибки
+# «database is locked», а соединения живут между запросами.
+# Прагмы выполняет движок yanews.sqlite.
+SQLITE_PROFILES = {
+    'default': {
+        'PRAGMAS': {},
+        'CONN_MAX_AGE': 0,
+    },
+    'production': {
+        'PRAGMAS': {
+            'journal_mode': 'WAL',
+            # С WAL транзакция не теряет целостность при сбое,
+            # а fsync идёт только на контрольных точках.
+            'synchronous': 'NORMAL',
+            'busy_timeout': 5000,
+            'mmap_size': 256 * 1024 * 1024,
+            # Отрицательное значение — размер в КиБ, здесь 64 МиБ.
+            'cache_size': -64 * 1024,
+        },
+        'CONN_MAX_AGE': 600,
+    },
+}
+SQLITE_PROFILE = os.environ.get('SQLITE_PROFILE', 'default')
+SQLITE_PRAGMAS = SQLITE_PROFILES[SQLITE_PROFILE]['PRAGMAS']
+for database in DATABASES.values():
+    database['CONN_MAX_AGE'] = SQLITE_PROFILES[SQLITE_PROFILE]['CONN_MAX_AGE']
+
+# После записи клиент столько секунд читает из основной базы.
+REPLICA_PIN_COOKIE = 'pin_primary'
+REPLICA_PIN_SECONDS = 10
+
+# Кэш в памяти процесса годится для разработки с одним процессом.
+# Сброс страничного кэша и версия списка запрещённых слов доходят
+# до других воркеров только через общий бэкенд: Redis, Memcached
+# или FileBasedCache.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
     }
 }
 
@@ -80,3 +144,53 @@ LOGIN_URL = reverse_lazy('users:login')
 LOGIN_REDIRECT_URL = reverse_lazy('news:home')
 
 NEWS_COUNT_ON_HOME_PAGE = 10
+
+NEWS_COUNT_ON_ARCHIVE_PAGE = 20
+
+COMMENTS_COUNT_ON_NEWS_PAGE = 50
+
+# Отрисованные блоки комментариев кэшируются по id комментария.
+# Увеличьте версию, если поменяли разметку блока в detail.html.
+COMMENT_FRAGMENT_TIMEOUT = 60 * 60 * 24
+COMMENT_FRAGMENT_VERSION = 1
+
+# Главная и страницы новостей для анонимных читателей кэшируются целиком.
+# 0 выключает страничный кэш.
+NEWS_PAGE_CACHE_TIMEOUT = 60 * 5
+
+# Как часто воркер сверяет версию списка запрещённых слов в кэше default.
+BAD_WORDS_CHECK_INTERVAL = 5
+
+# Функция, приводящая слово поискового запроса к основе.
+NEWS_SEARCH_STEMMER = 'news.search.russian_stem'
+SEARCH_RESULTS_LIMIT = 20
+
+# Под ASGI (см. yanews/asgi.py) главная и страницы новостей обслуживаются
+# асинхронными представлениями, а база — пулом из стольких потоков.
+NEWS_ASYNC_VIEWS = os.environ.get('NEWS_ASYNC_VIEWS') == '1'
+NEWS_ASYNC_DB_THREADS = 8
+
+# Профилирование запросов, см. yanews/profiling.py.
+PROFILING_ENABLED = os.environ.get('PROFILING') == '1'
+PROFILING_SLOWEST_SQL = 5
+# Запросы дольше стольких секунд попадают в журнал.
+PROFILING_SLOW_REQUEST = 0.5
+# Каталог для профилей cProfile медленных запросов; None — не сохранять.
+PROFILING_DUMP_DIR = os.environ.get('PROFILING_DUMP_DIR')
+
+# Каталог, через который воркеры складывают метрики для /metrics;
+# None — метрики только своего процесса.
+METRICS_DIR = os.environ.get('METRICS_DIR')
+METRICS_FLUSH_INTERVAL = 1.0
+# Адреса, которым отдаётся /metrics, через запятую; остальным — 404.
+METRICS_ALLOWED_IPS = os.environ.get(
+    'METRICS_ALLOWED_IPS', '127.0.0.1,::1'
+).split(',')
+
+# Каталог для статистики SQL по отпечаткам, см. yanews/querylog.py;
+# None — статистика не собирается.
+QUERY_LOG_DIR = os.environ.get('QUERY_LOG_DIR')
+QUERY_LOG_FLUSH_INTERVAL = 10.0
+
+# Прогревать воркер при загрузке приложения, см. yanews/warmup.py.
+WARM_UP_ON_START = False
@@ -0,0 +1,69 @@
+"""
+Настройки для работы под нагрузкой.
+
+Выбираются переменной окружения:
+    DJANGO_SETTINGS_MODULE=yanews.settings_production gunicorn yanews.wsgi
+
+Отличия от yanews/settings.py: DEBUG выключен, поэтому соединения
+не копят журнал SQL в connection.queries; SECRET_KEY обязателен
+в окружении; кэш общий для всех воркеров; шаблоны компилируются один
+раз на процесс кэширующим загрузчиком; SQLite по умолчанию работает
+в профиле production; воркер прогревается при старте, см. yanews/warmup.py.
+"""
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+
+from .settings import *  # noqa: F401,F403
+from .settings import DATABASES, SQLITE_PROFILES, TEMPLATES
+
+DEBUG = False
+
+try:
+    SECRET_KEY = os.environ['SECRET_KEY']
+except KeyError:
+    raise ImproperlyConfigured('Задайте SECRET_KEY в окружении.') from None
+
+ALLOWED_HOSTS = os.environ.get(
+    'ALLOWED_HOSTS', 'localhost,127.0.0.1'
+).split(',')
+
+# Сброс страничного кэша и версия списка запрещённых слов должны
+# доходить до всех воркеров, поэтому кэш не в памяти процесса,
+# а в общем каталоге CACHE_DIR.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('CACHE_DIR', '/var/tmp/yanews-cache'),
+    }
+}
+
+TEMPLATES = [
+    {
+        **TEMPLATES[0],
+        # Загрузчики заданы явно, а с ними APP_DIRS не совместим.
+        'APP_DIRS': False,
+        'OPTIONS': {
+            **TEMPLATES[0]['OPTIONS'],
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
+        },
+    },
+]
+
+SQLITE_PROFILE = os.environ.get('SQLITE_PROFILE', 'production')
+SQLITE_PRAGMAS = SQLITE_PROFILES[SQLITE_PROFILE]['PRAGMAS']
+# Копии, чтобы не менять словари модуля yanews.settings.
+DATABASES = {
+    alias: {
+        **database,
+        'CONN_MAX_AGE': SQLITE_PROFILES[SQLITE_PROFILE]['CONN_MAX_AGE'],
+    }
+    for alias, database in DATABASES.items()
+}
+
+WARM_UP_ON_START = os.environ.get('WARM_UP_ON_START', '1') == '1'
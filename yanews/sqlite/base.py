@@ -0,0 +1,25 @@
+"""
+Движок SQLite с прагмами из SQLITE_PRAGMAS.
+
+Прагмы выполняются в обход курсора Django, поэтому не попадают
+ни в connection.queries, ни в подсчёт запросов в тестах. Кроме того,
+каждое соединение вызывает обёртки SQL текущего запроса,
+см. yanews/middleware.py.
+"""
+from django.conf import settings
+from django.db.backends.sqlite3 import base
+
+from yanews.middleware import run_request_wrappers
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.execute_wrappers.append(run_request_wrappers)
+
+    def get_new_connection(self, conn_params):
+        connection = super().get_new_connection(conn_params)
+        for name, value in settings.SQLITE_PRAGMAS.items():
+            connection.execute(f'PRAGMA {name} = {value}')
+        return connection
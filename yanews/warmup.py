@@ -0,0 +1,123 @@
+"""
+Прогрев воркера до первого запроса.
+
+Без прогрева первый запрос каждого воркера платит за импорт URLconf
+и компиляцию регулярных выражений маршрутов, разбор шаблонов и открытие
+соединения с базой, а также за модули, которые Django импортирует
+лениво: контекст-процессоры, хранилище сообщений, сериализатор сессий,
+компилятор SQL, форматы дат языка. warm_up() делает это заранее:
+компилирует все шаблоны из каталогов DIRS настроек TEMPLATES
+(кэширующий загрузчик сохраняет их до конца жизни процесса), заполняет
+резолвер URL, открывает соединения со всеми базами и кэшами, загружает
+переводы и импортирует ленивые модули.
+
+Вызывается из yanews/wsgi.py и yanews/asgi.py, если включён
+WARM_UP_ON_START. Соединения открываются в потоке, который загрузил
+приложение: прогрев БД полезен синхронным воркерам gunicorn и только
+при CONN_MAX_AGE больше нуля, иначе Django закроет соединение в начале
+запроса. С gunicorn --preload прогрев выполнится в мастере до fork,
+и воркеры унаследуют одно соединение на всех, поэтому --preload
+с прогревом не используют.
+"""
+import logging
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+from django.template import engines
+from django.template.backends.django import DjangoTemplates
+from django.urls import URLResolver, get_resolver
+from django.utils import formats, translation
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE_SUFFIXES = ('.html', '.txt')
+# Настройки с путями к классам, которые импортируются по первому запросу.
+LAZY_IMPORT_SETTINGS = ('MESSAGE_STORAGE', 'SESSION_SERIALIZER')
+
+
+def template_names(directory):
+    """Имена шаблонов в каталоге в виде, пригодном для get_template."""
+    directory = Path(directory)
+    return sorted(
+        path.relative_to(directory).as_posix()
+        for path in directory.rglob('*')
+        if path.suffix in TEMPLATE_SUFFIXES and path.is_file()
+    )
+
+
+def compile_templates():
+    compiled = 0
+    for engine in engines.all():
+        if not isinstance(engine, DjangoTemplates):
+            continue
+        # Контекст-процессоры импортируются при первой отрисовке.
+        engine.engine.template_context_processors
+        for directory in engine.engine.dirs:
+            for name in template_names(directory):
+                engine.get_template(name)
+                compiled += 1
+    return compiled
+
+
+def populate_urls(resolver=None):
+    """Заполняет резолвер и вложенные в него; возвращает число маршрутов."""
+    resolver = resolver or get_resolver()
+    # Обращение к reverse_dict компилирует регулярные выражения
+    # маршрутов, но вложенные пространства имён заполняются отдельно.
+    resolver.reverse_dict
+    routes = 0
+    for pattern in resolver.url_patterns:
+        if isinstance(pattern, URLResolver):
+            routes += populate_urls(pattern)
+        else:
+            routes += 1
+    return routes
+
+
+def open_connections():
+    for connection in connections.all():
+        connection.ensure_connection()
+        # Модуль компилятора SQL импортируется при первом запросе к базе.
+        connection.ops.compiler('SQLCompiler')
+    return len(connections.all()) + len(caches.all())
+
+
+def load_translations():
+    with translation.override(settings.LANGUAGE_CODE):
+        formats.get_format('DATETIME_FORMAT')
+
+
+def import_lazy_modules():
+    for name in LAZY_IMPORT_SETTINGS:
+        import_string(getattr(settings, name))
+
+
+def warm_up():
+    """Прогревает процесс; возвращает время этапов в миллисекундах."""
+    timings = {}
+    counts = {}
+    for stage, func in (
+        ('templates', compile_templates),
+        ('urls', populate_urls),
+        ('connections', open_connections),
+        ('translations', load_translations),
+        ('modules', import_lazy_modules),
+    ):
+        start = time.perf_counter()
+        counts[stage] = func()
+        timings[stage] = (time.perf_counter() - start) * 1000
+    logger.info(
+        'Прогрев за %.1f мс: шаблонов %d, маршрутов %d, соединений %d',
+        sum(timings.values()),
+        counts['templates'], counts['urls'], counts['connections'],
+    )
+    return timings
+
+
+def warm_up_on_start():
+    if settings.WARM_UP_ON_START:
+        warm_up()